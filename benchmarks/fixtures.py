@@ -0,0 +1,204 @@
+import json
+import random
+
+
+MANUFACTURERS = (
+    ("Anvil Aerospace", "ANVL"),
+    ("Aegis Dynamics", "AEGS"),
+    ("Drake Interplanetary", "DRAK"),
+    ("Roberts Space Industries", "RSI"),
+    ("Origin Jumpworks", "ORIG"),
+    ("MISC", "MISC"),
+    ("Crusader Industries", "CRUS"),
+    ("Consolidated Outland", "CNOU"),
+)
+SHIP_MODELS = ("Hornet", "Gladius", "Cutlass", "Avenger", "Freelancer", "Constellation", "Caterpillar", "Herald",
+               "Vanguard", "Prospector", "Mercury", "Starfarer", "Reclaimer", "Hammerhead", "Carrack", "Mustang")
+SHIP_VARIANTS = ("", " Black", " Blue", " Red", " Titan", " Warden", " MAX", " DUR", " Taurus", " Aquila")
+FOCUSES = ("Combat", "Transport", "Exploration", "Mining", "Racing", "Medical")
+STATUSES = ("flight-ready", "flight-ready", "in-concept", "hangar-ready")
+
+SYSTEMS = ("Stanton",)
+PLANETS = ("Crusader", "Hurston", "ArcCorp", "microTech")
+MOONS = ("Yela", "Daymar", "Cellin", "Arial", "Aberdeen", "Lyria", "Wala", "Calliope")
+OUTPOSTS = ("Mining Area", "Research Outpost", "Trade Post", "Storage Facility", "Station")
+COMMODITIES = ("Medical Supplies", "Agricium", "Laranite", "Titanium", "Diamond", "Gold", "Hydrogen",
+               "Processed Food", "Distilled Spirits", "Scrap", "Stims", "Widow", "Astatine", "Fluorine")
+RESOURCES = ("Quantanium", "Bexalite", "Taranite", "Borase", "Laranite", "Agricium", "Hephaestanite", "Titanium",
+             "Diamond", "Gold", "Copper", "Beryl", "Quartz", "Corundum", "Tungsten", "Aluminum")
+
+
+def get_ship_names(count):
+    names = []
+    for variant in SHIP_VARIANTS:
+        for model in SHIP_MODELS:
+            names.append((model + variant).strip())
+            if len(names) == count:
+                return names
+    return names + ["Prototype %d" % number for number in range(count - len(names))]
+
+
+def get_ship_matrix(ships_count=160, seed=0):
+    """
+    Returns ship matrix in the format of RSI 'ship-matrix/index' endpoint data.
+    """
+    generator = random.Random(seed)
+    ships = []
+    for number, name in enumerate(get_ship_names(ships_count)):
+        manufacturer_name, manufacturer_code = MANUFACTURERS[number % len(MANUFACTURERS)]
+        ships.append({
+            'id': str(number + 1),
+            'name': name,
+            'focus': generator.choice(FOCUSES),
+            'url': "/pledge/ships/%s" % name.lower().replace(" ", "-"),
+            'production_status': generator.choice(STATUSES),
+            'length': str(generator.randint(10, 250)),
+            'beam': str(generator.randint(5, 80)),
+            'height': str(generator.randint(3, 40)),
+            'size': generator.choice(("small", "medium", "large", "capital")),
+            'mass': str(generator.randint(10000, 5000000)),
+            'cargocapacity': str(generator.choice((0, 2, 32, 46, 96, 576))),
+            'min_crew': str(generator.randint(1, 2)),
+            'max_crew': str(generator.randint(1, 12)),
+            'scm_speed': str(generator.randint(100, 300)),
+            'afterburner_speed': str(generator.randint(900, 1400)),
+            'manufacturer': {'name': manufacturer_name, 'code': manufacturer_code},
+        })
+    return ships
+
+
+def get_ship_prices(ship_matrix, seed=0):
+    generator = random.Random(seed)
+    return [{'name': ship['name'], 'msrp': "{:,}".format(generator.randint(20, 700) * 5)} for ship in ship_matrix]
+
+
+def get_ship_upgrades_page(ship_matrix, seed=0):
+    """
+    Returns HTML page with ship prices embedded the same way as on RSI ship upgrades page.
+    """
+    return "\n".join((
+        "<html><body>",
+        "<script>",
+        "new RSI.ShipUpgrade.MainView({fromShips: %s, toShips: []});" % json.dumps(get_ship_prices(ship_matrix, seed)),
+        "</script>",
+        "</body></html>",
+    ))
+
+
+def get_road_map(releases_count=8, cards_count=25, categories_count=6, seed=0):
+    """
+    Returns response of RSI road map board endpoint.
+    """
+    generator = random.Random(seed)
+    categories = [{'id': str(number + 1), 'name': name} for number, name in
+                  enumerate(("Characters", "Locations", "AI", "Gameplay", "Ships and Vehicles", "Weapons and Items",
+                             "Core Tech", "Arena Commander")[:categories_count])]
+    releases = []
+    for release_number in range(releases_count):
+        cards = []
+        for card_number in range(cards_count):
+            tasks = generator.randint(1, 40)
+            cards.append({
+                'id': str(release_number * cards_count + card_number),
+                'name': "Feature %d.%d" % (release_number, card_number),
+                'description': "Synthetic road map card used by benchmarks. " * generator.randint(1, 3),
+                'category_id': generator.choice(categories)['id'],
+                'completed': generator.randint(0, tasks),
+                'tasks': tasks,
+            })
+        releases.append({'id': str(release_number), 'name': "Alpha 3.%d.0" % release_number,
+                         'description': generator.choice(("Released", "Tentative", "Committed")), 'cards': cards})
+    return {
+        'success': 1,
+        'data': {
+            'releases': releases,
+            'categories': categories,
+            'description': "Live Version: 3.%d.0 PTU Version: 3.%d.0" % (releases_count - 2, releases_count - 1),
+        }
+    }
+
+
+def get_scm_data(locations_count=40, seed=0):
+    """
+    Returns responses of SCM endpoints (containers, locations, commodities, resources and their prices).
+    """
+    generator = random.Random(seed)
+    containers = [{'id': "system-0", 'container_name': SYSTEMS[0], 'container_parent': None}]
+    for planet_number, planet in enumerate(PLANETS):
+        containers.append({'id': "planet-%d" % planet_number, 'container_name': planet, 'container_parent': "system-0"})
+    for moon_number, moon in enumerate(MOONS):
+        containers.append({'id': "moon-%d" % moon_number, 'container_name': moon,
+                           'container_parent': "planet-%d" % (moon_number % len(PLANETS))})
+    locations = [
+        {'id': "location-%d" % number, 'location_name': "%s %s %d" % (MOONS[number % len(MOONS)],
+                                                                       OUTPOSTS[number % len(OUTPOSTS)], number),
+         'location_container': "moon-%d" % (number % len(MOONS))}
+        for number in range(locations_count)
+    ]
+    commodities = [{'id': "commodity-%d" % number, 'commodity_name': name, 'commodity_illegal': name in ("Widow",)}
+                   for number, name in enumerate(COMMODITIES)]
+    resources = [{'id': "resource-%d" % number, 'resource_name': name, 'resource_type': "ore"}
+                 for number, name in enumerate(RESOURCES)]
+    commodity_prices = []
+    for commodity in commodities:
+        base_price = generator.uniform(1, 40)
+        for location in generator.sample(locations, min(12, len(locations))):
+            commodity_prices.append({
+                'id': "commodity-price-%d" % len(commodity_prices),
+                'price_type': generator.choice(("buy", "sell")),
+                'price_location': location['id'],
+                'price_date': "2019-05-01",
+                'price_commodity': commodity['id'],
+                'price_unit_price': round(base_price * generator.uniform(0.7, 1.3), 2),
+            })
+    resource_prices = []
+    for resource in resources:
+        base_price = generator.uniform(1, 90)
+        for location in generator.sample(locations, min(6, len(locations))):
+            resource_prices.append({
+                'id': "resource-price-%d" % len(resource_prices),
+                'price_type': "sell",
+                'price_location': location['id'],
+                'price_date': "2019-05-01",
+                'price_resource': resource['id'],
+                'price_unit_price': round(base_price * generator.uniform(0.8, 1.2), 2),
+            })
+    return {
+        'containers': containers,
+        'locations': locations,
+        'commodities': commodities,
+        'commodity_prices': commodity_prices,
+        'resources': resources,
+        'resource_prices': resource_prices,
+    }
+
+
+def get_member_ship_list(ship_matrix, ships_count=20, seed=0):
+    """
+    Returns content of 'shiplist.json' file exported from RSI hangar, with a few unknown ships.
+    """
+    generator = random.Random(seed)
+    ships = []
+    for number in range(ships_count):
+        ship = generator.choice(ship_matrix)
+        ships.append({
+            'manufacturer': ship['manufacturer']['name'],
+            'name': ship['name'] if number % 10 else "Unknown Ship %d" % number,
+            'lti': generator.random() < 0.4,
+            'package_id': generator.randint(1000000, 9999999),
+        })
+    return ships
+
+
+def iterate_org_fleets(ship_matrix, members_count, ships_per_member=8, seed=0):
+    """
+    Yields (member id, member name, verified ships) of synthetic organization members.
+    """
+    generator = random.Random(seed)
+    for number in range(members_count):
+        ships = []
+        for _ in range(generator.randint(1, 2 * ships_per_member - 1)):
+            ship = generator.choice(ship_matrix)
+            ships.append({'manufacturer': ship['manufacturer']['code'], 'name': ship['name'],
+                          'lti': generator.random() < 0.4, 'package_id': generator.randint(1000000, 9999999)})
+        yield 500000000000000000 + number, "member_%05d" % number, ships
@@ -0,0 +1,291 @@
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+
+from . import fixtures
+from .servers import FixtureServer
+
+
+GUILD_ID = 100000000000000000
+CHANNEL_ID = 200000000000000000
+BOT_USER_ID = 300000000000000000
+MEMBER_ROLE_ID = 400000000000000000
+COMMANDS_PREFIX = ",,"
+
+Member = namedtuple('Member', ['id', 'username'])
+
+SCENARIOS = {
+    'show_fleet': [",,fleet", ",,fleet -p", ",,fleet -m member_00003", ",,fleet -f manufacturer=DRAK",
+                   ",,fleet -r -o manufacturer,name -d"],
+    'trade_route': [",,trade", ",,trade -c 46 -b 5000", ",,trade -s yela -l", ",,trade -c 576 -b 900000 -a daymar"],
+    'road_map': [",,roadmap", ",,roadmap -l", ",,roadmap -c ships", ",,roadmap -f feature", ",,roadmap -s"],
+    'check_ship_info': [",,ship Cutlass Black", ",,ship hornet", ",,ship Gladus", ",,ship drake herald"],
+    'compare_ships': [",,compare Cutlass Black,Freelancer", ",,compare Hornet,Gladius,Avenger Titan",
+                      ",,compare caterpillar,hammerhead"],
+    'update_fleet': None,
+}
+
+
+def configure_settings(base_url, work_directory, mongo_connection_string=None):
+    """
+    Points bot settings at fixture server and temporary files. Has to be called before dastro_bot and
+    base_astro_bot are imported, as they read settings at import time.
+    """
+    import settings
+
+    settings.LOG_FILE = os.path.join(work_directory, "benchmark.log")
+    settings.GUILD_ID = GUILD_ID
+    settings.CHANNELS = {'main': str(CHANNEL_ID), 'lobby': str(CHANNEL_ID), 'recruitment': str(CHANNEL_ID)}
+    settings.MEMBER_ROLES = ['member']
+    settings.GUILDS = {}
+    settings.CHANNEL_MESSAGES_LIMIT = 100000
+    settings.CHANNEL_MESSAGES_PERIOD = 1
+    settings.MONITOR_SOURCES = {}
+    settings.METRICS_PORT = 0
+    settings.SHIP_MATRIX_STORE_FILE = os.path.join(work_directory, "ship_matrix.snapshot")
+    settings.DATABASE_NAME = os.path.join(work_directory, "database.sqlite")
+    settings.REPORT_SHIP_PRICE_LIST = []
+    settings.HTTP_CACHE_FRESHNESS = {}
+    settings.SNAPSHOT_DIRECTORY = os.path.join(work_directory, "snapshots")
+    settings.SNAPSHOT_BACKEND = "mongo" if mongo_connection_string else "file"
+    if mongo_connection_string:
+        settings.MONGO_CONNECTION_STRING = mongo_connection_string
+
+    settings.BASE_URL = base_url
+    settings.SHIP_UPGRADES_URL = base_url + FixtureServer.rsi_paths['ship_upgrades']
+    settings.SHIPS_MATRIX_URL = base_url + FixtureServer.rsi_paths['ship_matrix']
+    settings.GAME_PACKAGES_URL = base_url + FixtureServer.rsi_paths['game_packages']
+    settings.API_INIT_URL = base_url + FixtureServer.rsi_paths['road_map_init']
+    settings.ROAD_MAP_URL = base_url + FixtureServer.rsi_paths['road_map']
+    settings.SQ_ROAD_MAP_URL = base_url + FixtureServer.rsi_paths['sq_road_map']
+    settings.FORUM_SEARCH_URL = base_url + FixtureServer.rsi_paths['forum_search']
+
+    from disco.api.http import HTTPClient
+    from base_astro_bot.trade.data_rat_client import BaseClient
+
+    HTTPClient.BASE_URL = base_url + FixtureServer.discord_prefix
+    BaseClient.base_url = base_url + FixtureServer.scm_prefix
+
+
+def get_percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))]
+
+
+class BenchmarkHarness:
+    """
+    Runs DiscordBot plugin inside a disco client which never connects to Discord. Gateway events are
+    dispatched directly to the client and every REST, CDN, RSI and SCM request goes to local FixtureServer.
+    Latency of a request is measured from dispatching its MESSAGE_CREATE event to the end of the command
+    job, replies are counted as they reach the fixture server.
+    """
+    def __init__(self, members_count, ships_per_member=8, ships_count=160, seed=0, mongo_connection_string=None,
+                 work_directory="benchmark_data", request_timeout=60):
+        self.members_count = members_count
+        self.ships_per_member = ships_per_member
+        self.seed = seed
+        self.request_timeout = request_timeout
+        self.work_directory = os.path.abspath(work_directory)
+        os.makedirs(self.work_directory, exist_ok=True)
+        self.server = FixtureServer(GUILD_ID, CHANNEL_ID, BOT_USER_ID, MEMBER_ROLE_ID, ships_count, seed)
+        self.server.start()
+        configure_settings(self.server.base_url, self.work_directory, mongo_connection_string)
+        self.client = None
+        self.plugin = None
+        self.startup_time = None
+        self._message_ids = iter(range(700000000000000000, 800000000000000000))
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        from disco.bot import Bot, BotConfig
+        from disco.client import Client, ClientConfig
+        from dastro_bot import DiscordBot
+
+        started = time.monotonic()
+        self.client = Client(ClientConfig({'token': "benchmark", 'state': {'sync_guild_members': False}}))
+        bot = Bot(self.client, BotConfig({'commands_prefix': COMMANDS_PREFIX, 'commands_require_mention': False}))
+        self.dispatch('READY', {'v': 6, 'session_id': "benchmark", 'private_channels': [],
+                                'user': self.server.get_user(BOT_USER_ID, "Astro-Bot"),
+                                'guilds': [{'id': str(GUILD_ID), 'unavailable': True}]})
+        self.dispatch('GUILD_CREATE', self.get_guild())
+        bot.add_plugin(DiscordBot)
+        self.plugin = bot.plugins['DiscordBot']
+        self.startup_time = time.monotonic() - started
+        self._watch_dispatcher()
+        self.seed_org()
+
+    def stop(self):
+        if self.plugin is not None:
+            self.plugin.source_monitor.stop()
+            self.plugin.async_loop.close()
+        self.server.stop()
+
+    def dispatch(self, event_name, data):
+        self.client.gw.handle_dispatch({'op': 0, 't': event_name, 'd': data})
+
+    def get_guild(self):
+        return {
+            'id': str(GUILD_ID), 'name': "Benchmark Org", 'owner_id': str(BOT_USER_ID), 'unavailable': False,
+            'roles': self.server.get_roles(), 'channels': [self.server.get_channel(CHANNEL_ID)],
+            'members': [dict(self.server.get_member(BOT_USER_ID), user=self.server.get_user(BOT_USER_ID, "Astro-Bot"))],
+            'emojis': [], 'voice_states': [], 'presences': [], 'member_count': self.members_count + 1,
+        }
+
+    def seed_org(self):
+        """
+        Imports fleets of synthetic organization members straight to the guild database.
+        """
+        importer = self.plugin.guilds.main.fleet_importer
+        ship_matrix = self.server.ship_matrix
+        for member_id, member_name, ships in fixtures.iterate_org_fleets(ship_matrix, self.members_count,
+                                                                           self.ships_per_member, self.seed):
+            importer.import_ships(ships, Member(member_id, member_name))
+
+    @staticmethod
+    def _get_author_id(args):
+        for argument in args:
+            if hasattr(argument, 'author'):
+                return argument.author.id
+            if hasattr(argument, 'username'):
+                return argument.id
+
+    def _watch_dispatcher(self):
+        dispatcher = self.plugin.dispatcher
+        submit = dispatcher.submit
+
+        def submit_and_notify(name, function, *args, **kwargs):
+            done = self._pending.get(self._get_author_id(args))
+
+            def run_and_notify(*job_args, **job_kwargs):
+                try:
+                    return function(*job_args, **job_kwargs)
+                finally:
+                    if done is not None:
+                        done.set()
+
+            return submit(name, run_and_notify, *args, **kwargs)
+
+        dispatcher.submit = submit_and_notify
+
+    def get_message(self, author_id, content, attachments=()):
+        return {
+            'id': str(next(self._message_ids)), 'channel_id': str(CHANNEL_ID), 'guild_id': str(GUILD_ID),
+            'author': self.server.get_user(author_id, "member_%05d" % (author_id % 100000)), 'content': content,
+            'timestamp': "2019-01-01T00:00:00+00:00", 'tts': False, 'mention_everyone': False, 'mentions': [],
+            'mention_roles': [], 'attachments': list(attachments), 'embeds': [], 'pinned': False, 'type': 0,
+        }
+
+    def get_fleet_attachment(self, number):
+        content = json.dumps(fixtures.get_member_ship_list(self.server.ship_matrix, 2 * self.ships_per_member,
+                                                           self.seed + number))
+        url = self.server.add_attachment("shiplist.json", content)
+        return {'id': str(next(self._message_ids)), 'filename': "shiplist.json", 'size': len(content),
+                'url': url, 'proxy_url': url}
+
+    def get_request_messages(self, scenario, count):
+        """
+        Returns MESSAGE_CREATE payloads of the scenario, every request sent by a different org member.
+        """
+        messages = []
+        for number in range(count):
+            author_id = 500000000000000000 + number % max(self.members_count, 1)
+            if SCENARIOS[scenario] is None:
+                messages.append(self.get_message(author_id, "", [self.get_fleet_attachment(number)]))
+            else:
+                commands = SCENARIOS[scenario]
+                messages.append(self.get_message(author_id, commands[number % len(commands)]))
+        return messages
+
+    def _send_request(self, message, done):
+        author_id = int(message['author']['id'])
+        with self._lock:
+            self._pending[author_id] = done
+        started = time.monotonic()
+        self.dispatch('MESSAGE_CREATE', message)
+        finished = done.wait(self.request_timeout)
+        with self._lock:
+            self._pending.pop(author_id, None)
+        if finished:
+            return time.monotonic() - started
+
+    def _wait_for_replies(self, quiet_period=0.2):
+        """
+        Waits until no reply came for 'quiet_period' seconds. Returns arrival time of the last reply.
+        """
+        count = len(self.server.messages)
+        while self.server.wait_for_messages(count + 1, quiet_period):
+            count = len(self.server.messages)
+        if count:
+            return self.server.messages[count - 1][0]
+
+    def run_scenario(self, scenario, requests_count, concurrency=1, warmup=5, trace_memory=False):
+        for message in self.get_request_messages(scenario, warmup):
+            self._send_request(message, threading.Event())
+        self._wait_for_replies()
+
+        messages = self.get_request_messages(scenario, requests_count)
+        replies_before = len(self.server.messages)
+        latencies = []
+        errors = [0]
+        slots = threading.Semaphore(concurrency)
+
+        def send(message):
+            try:
+                latency = self._send_request(message, threading.Event())
+                if latency is None:
+                    errors[0] += 1
+                else:
+                    latencies.append(latency)
+            finally:
+                slots.release()
+
+        if trace_memory:
+            tracemalloc.start()
+        started = time.monotonic()
+        threads = []
+        for message in messages:
+            slots.acquire()
+            thread = threading.Thread(target=send, args=(message,), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        jobs_finished = time.monotonic()
+        last_reply = self._wait_for_replies()
+        wall_time = max(jobs_finished, last_reply or 0) - started
+        traced_peak = None
+        if trace_memory:
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        return {
+            'requests': requests_count,
+            'concurrency': concurrency,
+            'errors': errors[0],
+            'replies': len(self.server.messages) - replies_before,
+            'latency_p50': get_percentile(latencies, 50),
+            'latency_p99': get_percentile(latencies, 99),
+            'latency_max': max(latencies) if latencies else None,
+            'throughput': round(len(latencies) / wall_time, 3) if wall_time else None,
+            'wall_time': wall_time,
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'traced_peak_bytes': traced_peak,
+        }
+
+    def run(self, scenarios, requests_count, concurrency=1, trace_memory=False):
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = self.run_scenario(scenario, requests_count, concurrency, trace_memory=trace_memory)
+        return {
+            'members': self.members_count,
+            'startup_time': self.startup_time,
+            'fixture_requests': self.server.requests_count,
+            'scenarios': results,
+        }
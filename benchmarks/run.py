@@ -0,0 +1,143 @@
+"""
+Offline benchmark of Astro-Bot commands. Every organization size is measured in a separate process
+against local Discord, RSI and SCM stand-ins, results are written as JSON and can be compared with
+results of a previous run:
+
+    python -m benchmarks.run --members 10,100,1000,10000 --output results.json --compare previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from .harness import SCENARIOS
+
+
+COMPARED_KEYS = ('latency_p50', 'latency_p99', 'throughput', 'peak_rss_kb')
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Offline Astro-Bot benchmark.")
+    parser.add_argument('-m', '--members', default="10,100,1000,10000",
+                        help="Comma separated sizes of synthetic organizations.")
+    parser.add_argument('-s', '--scenarios', default=",".join(sorted(SCENARIOS)),
+                        help="Comma separated scenarios: %s." % ", ".join(sorted(SCENARIOS)))
+    parser.add_argument('-n', '--requests', type=int, default=200, help="Requests per scenario.")
+    parser.add_argument('-c', '--concurrency', type=int, default=1, help="Requests in flight at once.")
+    parser.add_argument('--ships-per-member', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mongo', default=None, help="MongoDB connection string used instead of settings.")
+    parser.add_argument('--trace-memory', action='store_true', help="Report peak of Python allocations.")
+    parser.add_argument('-o', '--output', default="benchmark_results.json")
+    parser.add_argument('--compare', default=None, help="Results of previous run to compare with.")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    return parser
+
+
+def run_single(args):
+    from gevent import monkey
+    monkey.patch_all()
+    from .harness import BenchmarkHarness
+
+    members_count = int(args.members)
+    with tempfile.TemporaryDirectory(prefix="astro_bot_benchmark_") as work_directory:
+        harness = BenchmarkHarness(members_count, args.ships_per_member, seed=args.seed,
+                                   mongo_connection_string=args.mongo, work_directory=work_directory)
+        try:
+            harness.start()
+            result = harness.run(args.scenarios.split(","), args.requests,
+                                 max(1, min(args.concurrency, members_count)), args.trace_memory)
+        finally:
+            harness.stop()
+    with open(args.output, "w") as output_file:
+        json.dump(result, output_file)
+
+
+def run_all(args):
+    results = []
+    for members_count in args.members.split(","):
+        output_handle, output = tempfile.mkstemp(prefix="astro_bot_benchmark_", suffix=".json")
+        os.close(output_handle)
+        command = [sys.executable, "-m", "benchmarks.run", "--single", "--members", members_count,
+                   "--scenarios", args.scenarios, "--requests", str(args.requests),
+                   "--concurrency", str(args.concurrency), "--ships-per-member", str(args.ships_per_member),
+                   "--seed", str(args.seed), "--output", output]
+        if args.mongo:
+            command += ["--mongo", args.mongo]
+        if args.trace_memory:
+            command.append("--trace-memory")
+        print("Benchmarking organization of %s members..." % members_count, flush=True)
+        subprocess.check_call(command)
+        with open(output) as output_file:
+            results.append(json.load(output_file))
+        os.remove(output)
+    return {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'ships_per_member': args.ships_per_member,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+
+def get_change(previous, current):
+    if previous and current is not None:
+        return "%+.1f%%" % (100.0 * (current - previous) / previous)
+    return "n/a"
+
+
+def compare(previous, current):
+    """
+    Returns lines describing changes of compared values between two result files.
+    """
+    previous_results = {result['members']: result for result in previous['results']}
+    lines = []
+    for result in current['results']:
+        previous_result = previous_results.get(result['members'])
+        if previous_result is None:
+            continue
+        for scenario, values in sorted(result['scenarios'].items()):
+            previous_values = previous_result['scenarios'].get(scenario)
+            if previous_values is None:
+                continue
+            changes = ", ".join("%s %s" % (key, get_change(previous_values.get(key), values.get(key)))
+                                for key in COMPARED_KEYS)
+            lines.append("%6d members %-16s %s" % (result['members'], scenario, changes))
+    return lines
+
+
+def print_results(results):
+    for result in results['results']:
+        print("%d members (startup %.2fs)" % (result['members'], result['startup_time']))
+        for scenario, values in sorted(result['scenarios'].items()):
+            print("    %-16s p50 %8.4fs  p99 %8.4fs  %8.2f req/s  errors %d  peak RSS %d kB" % (
+                scenario, values['latency_p50'] or 0, values['latency_p99'] or 0, values['throughput'] or 0,
+                values['errors'], values['peak_rss_kb']))
+
+
+def main():
+    args = get_parser().parse_args()
+    if args.single:
+        run_single(args)
+        return
+    results = run_all(args)
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True)
+    print_results(results)
+    if args.compare:
+        with open(args.compare) as previous_file:
+            for line in compare(json.load(previous_file), results):
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
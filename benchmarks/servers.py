@@ -0,0 +1,214 @@
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from . import fixtures
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class FixtureServer:
+    """
+    Local stand-in for Discord REST API and CDN, RSI website and SCM API. Responses are built from synthetic
+    fixtures and carry ETags, so conditional requests of the bot are answered with '304 Not Modified'.
+    Messages posted by the bot are recorded with their arrival time.
+    """
+    discord_prefix = "/api/v7"
+    cdn_prefix = "/attachments/"
+    scm_prefix = "/scm/"
+    rsi_paths = {
+        'ship_matrix': "/ship-matrix/index",
+        'ship_upgrades': "/pledge/ship-upgrades",
+        'game_packages': "/pledge/game-packages",
+        'road_map_init': "/roadmap/board/1-Star-Citizen",
+        'road_map': "/api/roadmap/v1/boards/1",
+        'sq_road_map': "/api/roadmap/v1/boards/2",
+        'forum_search': "/api/spectrum/search/content/extended",
+    }
+    member_path = re.compile(r"/guilds/(\d+)/members/(\d+)$")
+    roles_path = re.compile(r"/guilds/(\d+)/roles$")
+    channel_path = re.compile(r"/channels/(\d+)$")
+    messages_path = re.compile(r"/channels/(\d+)/messages$")
+
+    def __init__(self, guild_id, channel_id, bot_user_id, member_role_id, ships_count=160, seed=0,
+                 host="127.0.0.1", port=0):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.bot_user_id = bot_user_id
+        self.member_role_id = member_role_id
+        self.ship_matrix = fixtures.get_ship_matrix(ships_count, seed)
+        self.rsi_responses = {
+            self.rsi_paths['ship_matrix']: json.dumps({'success': 1, 'data': self.ship_matrix}),
+            self.rsi_paths['ship_upgrades']: fixtures.get_ship_upgrades_page(self.ship_matrix, seed),
+            self.rsi_paths['game_packages']: "<html><body>Game packages</body></html>",
+            self.rsi_paths['road_map_init']: "<html><body>Road map</body></html>",
+            self.rsi_paths['road_map']: json.dumps(fixtures.get_road_map(seed=seed)),
+            self.rsi_paths['sq_road_map']: json.dumps(fixtures.get_road_map(4, 15, 4, seed)),
+            self.rsi_paths['forum_search']: json.dumps({'data': {'hits': {'total': 0, 'hits': []}}}),
+        }
+        self.scm_responses = {endpoint: json.dumps(data) for endpoint, data in fixtures.get_scm_data(seed=seed).items()}
+        self.attachments = {}
+        self.messages = []
+        self.requests_count = 0
+        self._message_ids = itertools.count(900000000000000000)
+        self._condition = threading.Condition()
+        self._server = ThreadingHTTPServer((host, port), self.get_handler_class())
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="Benchmark fixtures", daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_attachment(self, filename, content):
+        """
+        Serves given content as CDN attachment and returns its URL.
+        """
+        path = "%s%d/%d/%s" % (self.cdn_prefix, self.channel_id, len(self.attachments), filename)
+        self.attachments[path] = content.encode()
+        return self.base_url + path
+
+    def get_user(self, user_id, username):
+        return {'id': str(user_id), 'username': username, 'discriminator': "0001", 'avatar': None, 'bot': False}
+
+    def get_roles(self):
+        return [
+            {'id': str(self.guild_id), 'name': "@everyone", 'permissions': 0, 'position': 0, 'color': 0,
+             'hoist': False, 'managed': False, 'mentionable': False},
+            {'id': str(self.member_role_id), 'name': "member", 'permissions': 0, 'position': 1, 'color': 0,
+             'hoist': False, 'managed': False, 'mentionable': False},
+        ]
+
+    def get_member(self, user_id):
+        return {'user': self.get_user(user_id, "member_%s" % user_id), 'roles': [str(self.member_role_id)],
+                'nick': None, 'joined_at': "2019-01-01T00:00:00+00:00", 'deaf': False, 'mute': False}
+
+    def get_channel(self, channel_id):
+        return {'id': str(channel_id), 'type': 0, 'guild_id': str(self.guild_id), 'name': "main", 'position': 0,
+                'permission_overwrites': []}
+
+    def record_message(self, channel_id, body):
+        with self._condition:
+            self.messages.append((time.monotonic(), int(channel_id), len(body)))
+            self._condition.notify_all()
+        return {'id': str(next(self._message_ids)), 'channel_id': str(channel_id), 'type': 0, 'content': "",
+                'author': self.get_user(self.bot_user_id, "Astro-Bot"), 'timestamp': "2019-01-01T00:00:00+00:00",
+                'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+                'embeds': [], 'pinned': False}
+
+    def wait_for_messages(self, count, timeout):
+        """
+        Waits until at least 'count' messages were posted. Returns False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while len(self.messages) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def get_discord_response(self, method, path, body):
+        if method == "GET" and path == "/users/@me":
+            return self.get_user(self.bot_user_id, "Astro-Bot")
+        if method == "GET" and self.roles_path.match(path):
+            return self.get_roles()
+        match = self.member_path.match(path)
+        if method == "GET" and match:
+            return self.get_member(int(match.group(2)))
+        match = self.channel_path.match(path)
+        if method == "GET" and match:
+            return self.get_channel(int(match.group(1)))
+        match = self.messages_path.match(path)
+        if method == "POST" and match:
+            return self.record_message(match.group(1), body)
+
+    def get_handler_class(self):
+        server = self
+
+        class FixtureHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _send(self, status, body=b"", content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_cached(self, content, content_type="application/json", headers=None):
+                body = content.encode() if isinstance(content, str) else content
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                headers = dict(headers or {}, ETag=etag)
+                if self.headers.get('If-None-Match') == etag:
+                    self._send(304, headers=headers)
+                else:
+                    self._send(200, body, content_type, headers)
+
+            def _handle_discord(self, method, path, body):
+                response = server.get_discord_response(method, path[len(server.discord_prefix):], body)
+                if response is None:
+                    self._send(404, b'{"code": 0, "message": "404: Not Found"}')
+                    return
+                self._send(200, json.dumps(response).encode(),
+                           headers={'X-RateLimit-Limit': "1000", 'X-RateLimit-Remaining': "999",
+                                    'X-RateLimit-Reset': str(int(time.time()) + 1),
+                                    'X-RateLimit-Reset-After': "0.001"})
+
+            def _handle(self, method):
+                path = self.path.split("?")[0]
+                body = self._read_body()
+                server.requests_count += 1
+                if path.startswith(server.discord_prefix):
+                    self._handle_discord(method, path, body)
+                elif path in server.attachments:
+                    self._send(200, server.attachments[path])
+                elif path.startswith(server.scm_prefix) and method == "PATCH":
+                    self._send(204)
+                elif path.startswith(server.scm_prefix) and path[len(server.scm_prefix):] in server.scm_responses:
+                    self._send_cached(server.scm_responses[path[len(server.scm_prefix):]])
+                elif path == server.rsi_paths['road_map_init']:
+                    self._send(200, server.rsi_responses[path].encode(), "text/html",
+                               {'Set-Cookie': "Rsi-Token=benchmark; Path=/"})
+                elif path in server.rsi_responses:
+                    content_type = "application/json" if path.startswith("/api/") or \
+                        path == server.rsi_paths['ship_matrix'] else "text/html"
+                    self._send_cached(server.rsi_responses[path], content_type)
+                else:
+                    self._send(404)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+            def log_message(self, message_format, *args):
+                pass
+
+        return FixtureHandler
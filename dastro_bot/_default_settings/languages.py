@@ -16,6 +16,10 @@ Messages = namedtuple('Messages', [
     'something_went_wrong',
     'success',
     'found_nothing',
+    'job_deferred',
+    'reply_attached',
+    'member_fleet_imported',
+    'member_fleet_unchanged',
 ])
 
 Commands = namedtuple('Commands', [
@@ -51,7 +55,11 @@ messages_pl = Messages(
     road_map_not_found="Przykro mi, nic takiego nie znalazłem. Posiadam jednakże wiedzę o poniższych:\n```%s```",
     something_went_wrong="Coś poszło nie tak...",
     success="Udało się!",
-    found_nothing="Przykro mi, lecz nic nie znalazłem."
+    found_nothing="Przykro mi, lecz nic nie znalazłem.",
+    job_deferred="Już się robi, odpowiem za chwilę...",
+    reply_attached="Odpowiedź jest zbyt długa, więc załączam ją jako plik.",
+    member_fleet_imported="%s, zanotowałem zmiany we flocie. Dodane statki: %d, usunięte statki: %d.",
+    member_fleet_unchanged="%s, Twoja flota się nie zmieniła.",
 )
 
 commands_pl = Commands(
@@ -87,7 +95,11 @@ messages_en = Messages(
     road_map_not_found="Sorry, didn't find anything like that. You may try something like:\n```%s```",
     something_went_wrong="Something went wrong...",
     success="Done!",
-    found_nothing="I'm sorry. I found nothing."
+    found_nothing="I'm sorry. I found nothing.",
+    job_deferred="Working on it, I'll reply shortly...",
+    reply_attached="The reply is too long, so I attached it as a file.",
+    member_fleet_imported="%s Your fleet is updated. Ships added: %d, ships removed: %d.",
+    member_fleet_unchanged="%s Your fleet has not changed.",
 )
 
 commands_en = Commands(
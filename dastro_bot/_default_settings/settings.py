@@ -23,16 +23,146 @@ PRIVILEGED_ROLES = [
     'officer',
     'admin'
 ]
+# Multiple guilds
+# Leave GUILDS empty to serve the single guild configured above. Otherwise it maps guild IDs to their
+# configuration. Role names default to the ones above, every guild keeps its fleet in a separate database.
+# GUILD_ID (if listed in GUILDS) or the guild with the lowest ID handles commands sent as direct messages.
+# GUILDS = {
+#     111111111111111111: {
+#         'channels': {'main': '222222222222222222'},
+#         'member_roles': ['member'],
+#         'privileged_roles': ['officer'],
+#         'database_name': "guild_111111111111111111.sqlite",
+#     },
+# }
+# Only the process of MONITOR_SHARD_ID gateway shard announces news (releases, forum, videos, ship prices).
+# It also downloads ship matrix, road maps and trade data, other processes load them from snapshot cache.
+GUILDS = {}
+MONITOR_SHARD_ID = 0
+
 MESSAGE_MAX_CHARACTERS = 2000
 MESSAGE_MAX_SHIPS = 24
+# Replies longer than MESSAGE_MAX_COUNT messages are sent as a single text file attachment
+MESSAGE_MAX_COUNT = 5
+CHANNEL_MESSAGES_LIMIT = 5
+CHANNEL_MESSAGES_PERIOD = 5
+# Sender of a channel stops after CHANNEL_SENDER_IDLE_TIMEOUT seconds without messages
+CHANNEL_SENDER_IDLE_TIMEOUT = 60
+
+# Member roles cache
+ROLES_CACHE_TTL = 600
+ROLES_CACHE_SIZE = 1000
+
+# Shared HTTP session (attachments downloader)
+HTTP_POOL_SIZE = 20
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 30
+ATTACHMENT_DOWNLOAD_TIMEOUT = 10
+ATTACHMENT_MAX_BYTES = 2 * 1024 * 1024
+ATTACHMENT_CHUNK_SIZE = 16 * 1024
+SHIPS_VERIFY_BATCH_SIZE = 50
+
+# Scraped sources cache
+# Seconds for which cached response of given source is used without asking the server (0 - always revalidate)
+HTTP_CACHE_FRESHNESS = {
+    'ships_matrix': 3600,
+    'ship_upgrades': 1800,
+    'game_packages': 3600,
+    'road_map': 0,
+    'sq_road_map': 0,
+    'forum': 0,
+    'scm': 60,
+}
+
+# Monitoring of releases, forum, YouTube channel, ship prices and trade data
+# Every source is polled separately. Interval (seconds) is halved after each change and grows 1.5 times
+# while nothing changes, within given limits. Sources failing MONITOR_FAILURE_THRESHOLD times in a row
+# are paused for MONITOR_BREAKER_RESET seconds.
+MONITOR_REQUEST_TIMEOUT = 30
+MONITOR_FAILURE_THRESHOLD = 3
+MONITOR_BREAKER_RESET = 1200
+MONITOR_SOURCES = {
+    'releases': {'interval': 300, 'min_interval': 120, 'max_interval': 1200, 'timeout': 90},
+    'forum': {'interval': 300, 'min_interval': 120, 'max_interval': 1200, 'timeout': 60},
+    'youtube': {'interval': 300, 'min_interval': 300, 'max_interval': 900, 'timeout': 60},
+    'ship_prices': {'interval': 300, 'min_interval': 300, 'max_interval': 300, 'timeout': 30},
+    'trade': {'interval': 300, 'min_interval': 300, 'max_interval': 1800, 'timeout': 120},
+}
+
+# Startup
+# Ship matrix, road maps, trade and mining data are loaded on first use. Parts listed in WARM_UP_SUBSYSTEMS
+# ('database', 'ship_matrix', 'road_map', 'sq_road_map', 'trade', 'mining') are loaded in background right
+# after start. Until ship matrix is loaded, ship commands are answered from the last ship matrix snapshot.
+WARM_UP_SUBSYSTEMS = ['database', 'ship_matrix', 'road_map', 'trade', 'mining', 'sq_road_map']
+SHIP_PRICES_UPDATE_PERIOD = 7600
+
+# Ship matrix snapshot shared by bot processes (memory mapped). SHIP_MATRIX_STORE_FILE names the current snapshot
+# file, a new one is written next to it whenever ships data changes (only by the MONITOR_SHARD_ID process).
+# Processes check if a new snapshot was published at most every SHIP_MATRIX_STORE_CHECK seconds.
+SHIP_MATRIX_STORE_FILE = "ship_matrix.snapshot"
+SHIP_MATRIX_STORE_CHECK = 5
+
+# Alternative ship names (lower or upper case) recognized in commands and uploaded ship lists
+SHIP_NAME_ALIASES = {
+    'msr': "Mercury Star Runner",
+    'hercules c2': "C2 Hercules",
+    'hercules m2': "M2 Hercules",
+    'hercules a2': "A2 Hercules",
+}
+
+# Ship, prices and compare replies cache
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_MAX_CHARACTERS = 500000
+
+# Command dispatcher
+# Jobs are named after command handlers (with '_update' suffix when called with '-u' flag).
+# Lower priority value is started first, limit caps number of concurrently running jobs of given name.
+DISPATCHER_WORKERS = 4
+DISPATCHER_DEFAULT_PRIORITY = 5
+DISPATCHER_COMMANDS = {
+    'show_help': {'priority': 0},
+    'check_current_releases': {'priority': 1},
+    'update_fleet': {'priority': 7, 'limit': 2},
+    'road_map_update': {'priority': 9, 'limit': 1},
+    'trade_route_update': {'priority': 9, 'limit': 1},
+    'mining_prices_update': {'priority': 9, 'limit': 1},
+}
+
+# Metrics
+# Command, Discord API, database and external requests latencies are served in Prometheus format on
+# http://METRICS_HOST:METRICS_PORT/metrics (port of each gateway shard process is increased by its shard ID).
+# Set METRICS_PORT to 0 to disable the endpoint.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Fraction of commands run under cProfile. Profiles of commands slower than PROFILE_SLOW_COMMAND seconds
+# are saved in PROFILE_DIRECTORY.
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_SLOW_COMMAND = 2.0
+PROFILE_DIRECTORY = "profiles"
 
 # Database manager
 DATABASE_NAME = "database.sqlite"
 DATABASE_DIALECT = 'sqlite:///%s'
+# SQLite databases are used in WAL mode: reads run on a pool of DATABASE_POOL_SIZE connections, while fleet
+# changes are queued to one writer. Changes queued within DATABASE_WRITE_BATCH_DELAY seconds are committed
+# together (at most DATABASE_WRITE_BATCH_SIZE of them). Locked database is retried for DATABASE_BUSY_TIMEOUT s.
+DATABASE_POOL_SIZE = 4
+DATABASE_WRITE_BATCH_SIZE = 64
+DATABASE_WRITE_BATCH_DELAY = 0
+DATABASE_BUSY_TIMEOUT = 10
 
 # MongoDB
 MONGO_CONNECTION_STRING = "mongodb://127.0.0.1:27017"
 
+# Snapshot cache of road maps, ship matrix and trade data. Each refresh saves only changed records. Backend is
+# "mongo" (SNAPSHOT_DATABASE in MongoDB above, shared by all bot processes) or "file" (SNAPSHOT_DIRECTORY, no
+# MongoDB server needed). A full snapshot is saved every SNAPSHOT_CHECKPOINT_INTERVAL snapshots of a source.
+SNAPSHOT_BACKEND = "mongo"
+SNAPSHOT_DATABASE = "snapshots"
+SNAPSHOT_DIRECTORY = "snapshots"
+SNAPSHOT_CHECKPOINT_INTERVAL = 50
+
 # RSI DATA PARSER
 BASE_URL = "https://robertsspaceindustries.com"
 SHIP_DATA_HEADERS = ['manufacturer', 'name', 'price', 'focus', 'production_status', 'length', 'beam', 'height',
@@ -66,3 +196,11 @@ REPORT_SHIP_PRICE_LIST = [
 
 # Trade Assistant
 SCM_TOKEN = "YOURTOKEN"
+# Reported prices are applied in memory at once and saved to snapshot cache after PRICE_REPORTS_FLUSH_DELAY seconds
+PRICE_REPORTS_FLUSH_DELAY = 30
+# Cargo sizes (SCU) of mining ships. Mining prices show value of full cargo of each ship and the first one is used
+# by 'mining --load' when cargo size is not given.
+MINING_CARGO_SIZES = [
+    ("Prospector", 32),
+    ("Mole", 96),
+]
@@ -1,24 +1,105 @@
-import asyncio
+import codecs
+import json
+import queue
+
 import async_timeout
-import aiohttp
 
 
-class DiscordAttachmentHandler:
+class AttachmentTooLarge(Exception):
+    pass
+
+
+class JsonListParser:
+    """
+    Incremental parser of a top-level JSON list. Chunks of raw bytes are fed as they arrive
+    and every complete list item is returned as soon as it is decoded.
+    """
+    whitespace = " \t\n\r\ufeff"
+
     def __init__(self):
-        self.loop = asyncio.get_event_loop()
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self.started = False
+        self.finished = False
 
-    @staticmethod
-    async def fetch_json(session, url):
-        async with async_timeout.timeout(10):
-            async with session.get(url) as response:
-                return await response.json()
+    def _skip_whitespace(self, position):
+        while position < len(self._buffer) and self._buffer[position] in self.whitespace:
+            position += 1
+        return position
+
+    def feed(self, chunk):
+        self._buffer += self._text_decoder.decode(chunk)
+        items = []
+        position = self._skip_whitespace(0)
+        while position < len(self._buffer) and not self.finished:
+            character = self._buffer[position]
+            if not self.started:
+                if character != "[":
+                    raise ValueError("Attachment does not contain JSON list.")
+                self.started = True
+                position += 1
+            elif character == "]":
+                self.finished = True
+                position += 1
+            elif character == ",":
+                position += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(self._buffer, position)
+                except ValueError:
+                    break
+                if end >= len(self._buffer):
+                    break
+                items.append(item)
+                position = end
+            position = self._skip_whitespace(position)
+        self._buffer = self._buffer[position:]
+        return items
 
-    async def get_content(self, url):
-        async with aiohttp.ClientSession() as session:
-            return await self.fetch_json(session, url)
+    def close(self):
+        if not self.finished:
+            raise ValueError("Attachment JSON list is incomplete.")
+
+
+class DiscordAttachmentHandler:
+    def __init__(self, async_loop, timeout=10, max_bytes=2097152, chunk_size=16384, batch_size=50):
+        self.async_loop = async_loop
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def _check_size(self, size):
+        if size and size > self.max_bytes:
+            raise AttachmentTooLarge("Attachment has %d bytes, the limit is %d bytes." % (size, self.max_bytes))
+
+    async def stream_json_list(self, url, put_batch):
+        session = await self.async_loop.get_session()
+        parser = JsonListParser()
+        received_bytes = 0
+        batch = []
+        async with async_timeout.timeout(self.timeout):
+            async with session.get(url) as response:
+                self._check_size(response.content_length)
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    received_bytes += len(chunk)
+                    self._check_size(received_bytes)
+                    batch += parser.feed(chunk)
+                    while len(batch) >= self.batch_size:
+                        put_batch(batch[:self.batch_size])
+                        batch = batch[self.batch_size:]
+        parser.close()
+        if batch:
+            put_batch(batch)
 
-    def get_ship_list(self, file_url, logger):
-        try:
-            return self.loop.run_until_complete(self.get_content(file_url))
-        except asyncio.TimeoutError:
-            logger.error("Could not download attachment. Asyncio timeout error.")
+    def iterate_ship_batches(self, file_url, file_size=None):
+        self._check_size(file_size)
+        batches = queue.Queue()
+        future = self.async_loop.submit(self.stream_json_list(file_url, batches.put))
+        future.add_done_callback(lambda _: batches.put(None))
+        batch = batches.get()
+        while batch is not None:
+            yield batch
+            batch = batches.get()
+        future.result()
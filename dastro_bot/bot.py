@@ -1,63 +1,439 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from http.client import HTTPException
+
 from disco.bot import Plugin
+import pafy
+from pymongo import MongoClient
+from tabulate import tabulate
 
 from base_astro_bot import BaseBot
-
-from .attachments_downloader import DiscordAttachmentHandler
+from base_astro_bot.utils import MyLogger
+
+from .async_loop import AsyncLoopThread
+from .attachments_downloader import DiscordAttachmentHandler, AttachmentTooLarge
+from .cached_sources import CachedRsiDataParser, CachedTradeAssistant
+from .command_registry import get_command_registry
+from .database_pool import PooledDatabaseManager
+from .dispatcher import CommandDispatcher, dispatched
+from .guilds import GuildRegistry
+from .http_cache import HttpCache
+from .lazy_loader import LazyLoader
+from .message_sender import MessageSender
+from .metrics import CommandProfiler, MetricsRegistry, MetricsServer
+from .monitor import MonitoredSource, SourceMonitor
+from .price_updates import PriceUpdater
+from .response_cache import ResponseCache
+from .road_map_index import get_road_map_index
+from .ship_matrix_store import ShipMatrixStore
+from .snapshot_store import FileSnapshotBackend, MongoSnapshotBackend, SnapshotStore
+from .trade_index import IndexedTradeAssistant
+import settings
 from settings import additional_commands
 
 
 class DiscordBot(BaseBot, Plugin):
+    roles_cache_ttl = settings.ROLES_CACHE_TTL
+    roles_cache_size = settings.ROLES_CACHE_SIZE
+    announcing_sources = ('forum', 'youtube', 'ship_prices')
+    instrumented_api_methods = ('guilds_members_get', 'guilds_roles_list', 'channels_get', 'channels_messages_create',
+                                'users_me_get')
+    instrumented_database_methods = ('delete_member', 'delete_discord_user', 'add_and_get_member', 'get_all_members',
+                                     'update_member_ships', 'add_one_ship', 'remove_one_ship', 'get_all_ships',
+                                     'get_member_by_name', 'get_member_by_discord_id', 'get_ships_by_member_id',
+                                     'get_ships_by_member_name', 'get_all_ships_dicts', 'get_ships_dicts_by_member_id',
+                                     'get_ships_dicts_by_member_name', 'get_ships_summary', 'update_versions',
+                                     'save_rsi_data', 'get_rsi_data', 'save_road_map', 'get_road_map',
+                                     'save_trade_data', 'get_trade_data', 'thread_is_new', 'rsi_video_is_new')
+
     def __init__(self, bot, config):
+        # BaseBot.__init__ is not called, as it downloads all data before the bot can answer anything.
+        # Its attributes are set here with data sources which load their data on first use (see LazyLoader),
+        # clients (database_manager, mongo, bot_user) are lazy properties.
+        started = time.monotonic()
         Plugin.__init__(self, bot, config)
-        self.attachments_handler = DiscordAttachmentHandler()
-        BaseBot.__init__(self)
+        self._guild_scope = threading.local()
+        self.logger = MyLogger(log_file_name=settings.LOG_FILE, logger_name=settings.LOGGER_NAME, prefix="[BOT]")
+        self.metrics = MetricsRegistry(settings.METRICS_BUCKETS)
+        self.metrics.instrument(self.client.api, 'discord_api', 'method', self.instrumented_api_methods)
+        self.lazy = LazyLoader(self.logger, self.metrics)
+        self.async_loop = AsyncLoopThread(pool_size=settings.HTTP_POOL_SIZE,
+                                          dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL,
+                                          keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT)
+        self.guilds = GuildRegistry.from_settings(settings.GUILDS, self.guild_id, settings.CHANNELS,
+                                                  self.member_roles_names, self.privileged_roles_names,
+                                                  self.roles_cache_ttl, self.roles_cache_size)
+        self.guild_id = self.guilds.main.guild_id
+        self.main_channel_id = self.guilds.main.main_channel_id
+        self.member_roles_names = self.guilds.main.member_roles_names
+        self.privileged_roles_names = self.guilds.main.privileged_roles_names
+        self.guilds.bind(self.logger, self._get_guild_database)
+        self.response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_MAX_CHARACTERS)
+        self.snapshot_store = SnapshotStore(self.get_snapshot_backend(), self.logger,
+                                            settings.SNAPSHOT_CHECKPOINT_INTERVAL)
+        self.http_cache = HttpCache(settings.HTTP_CACHE_FRESHNESS, metrics=self.metrics)
+        self.ship_matrix_store = ShipMatrixStore(settings.SHIP_MATRIX_STORE_FILE, settings.SHIP_MATRIX_STORE_CHECK)
+        self.rsi_data = CachedRsiDataParser(self.http_cache, self.async_loop, self.ship_matrix_store,
+                                            settings.SHIP_PRICES_UPDATE_PERIOD, settings.LOG_FILE,
+                                            lambda: self.main_database_manager, self.lazy.timed,
+                                            self.snapshot_store, fetch_sources=self.announces)
+        self.report_ship_price_list = settings.REPORT_SHIP_PRICE_LIST
+        self.trade = IndexedTradeAssistant(CachedTradeAssistant(self.http_cache, settings.LOG_FILE, self.snapshot_store,
+                                                                self.lazy.timed, fetch_sources=self.announces),
+                                           settings.MINING_CARGO_SIZES)
+        self.price_updater = PriceUpdater(self.trade, self.logger, settings.PRICE_REPORTS_FLUSH_DELAY)
+        self.dispatcher = CommandDispatcher(self.logger,
+                                            workers=settings.DISPATCHER_WORKERS,
+                                            commands=settings.DISPATCHER_COMMANDS,
+                                            default_priority=settings.DISPATCHER_DEFAULT_PRIORITY,
+                                            metrics=self.metrics,
+                                            profiler=CommandProfiler(settings.PROFILE_SAMPLE_RATE,
+                                                                     settings.PROFILE_SLOW_COMMAND,
+                                                                     settings.PROFILE_DIRECTORY))
+        self.message_sender = MessageSender(self.logger,
+                                            max_characters=self.max_characters,
+                                            max_messages=settings.MESSAGE_MAX_COUNT,
+                                            attachment_message=self.messages.reply_attached,
+                                            bucket_capacity=settings.CHANNEL_MESSAGES_LIMIT,
+                                            bucket_period=settings.CHANNEL_MESSAGES_PERIOD,
+                                            idle_timeout=settings.CHANNEL_SENDER_IDLE_TIMEOUT)
+        self.message_sender.watch(self.client.api.http)
+        self.help_messages = self._get_help_message()
+        self.source_monitor = SourceMonitor(self.async_loop, self.logger, self.get_monitored_sources())
+        self.monitoring_thread = threading.Thread(target=self.monitoring_procedure, name="Astro-Bot monitoring",
+                                                  daemon=True)
+        self.monitoring_thread.start()
+        self.metrics_server = self.start_metrics_server()
+        self.lazy.warm_up(self.get_warm_up_loaders())
+        self.logger.info("Bot ready in %.2f s." % (time.monotonic() - started))
+
+    def unload(self, ctx):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.source_monitor.stop()
+        self.async_loop.close()
+        self.price_updater.flush()
+        self.guilds.close()
+        if self.lazy.is_loaded('database'):
+            self.main_database_manager.close()
+        if self.lazy.is_loaded('mongo'):
+            self.mongo.close()
+        Plugin.unload(self, ctx)
+
+    @property
+    def main_database_manager(self):
+        return self.lazy.get('database', lambda: self.get_database_manager(settings.DATABASE_NAME))
+
+    @property
+    def database_manager(self):
+        """
+        Fleet database of the guild set with 'guild_scope' in current thread, main database otherwise.
+        """
+        guild = getattr(self._guild_scope, 'guild', None)
+        if guild is not None:
+            return guild.database_manager
+        return self.main_database_manager
+
+    @contextmanager
+    def guild_scope(self, guild):
+        """
+        Makes 'database_manager' the fleet database of given guild (if given) in current thread, so inherited
+        fleet methods work on it.
+        """
+        previous = getattr(self._guild_scope, 'guild', None)
+        self._guild_scope.guild = guild or previous
+        try:
+            yield
+        finally:
+            self._guild_scope.guild = previous
+
+    @property
+    def mongo(self):
+        return self.lazy.get('mongo', lambda: MongoClient(self.mongo_uri))
+
+    @property
+    def attachments_handler(self):
+        return self.lazy.get('attachments', lambda: DiscordAttachmentHandler(
+            self.async_loop, timeout=settings.ATTACHMENT_DOWNLOAD_TIMEOUT, max_bytes=settings.ATTACHMENT_MAX_BYTES,
+            chunk_size=settings.ATTACHMENT_CHUNK_SIZE, batch_size=settings.SHIPS_VERIFY_BATCH_SIZE))
+
+    @property
+    def bot_user(self):
+        return self.lazy.get('bot_user', self._get_bot_user)
+
+    @property
+    def channel_main(self):
+        return self.get_main_channel(self.guilds.main)
+
+    def get_warm_up_loaders(self):
+        """
+        Returns (name, load) pairs of parts configured in WARM_UP_SUBSYSTEMS, loaded in background after start.
+        """
+        loaders = {
+            'database': lambda: self.main_database_manager,
+            'ship_matrix': lambda: self.rsi_data.ships,
+            'road_map': lambda: self.rsi_data.road_map,
+            'sq_road_map': lambda: self.rsi_data.sq_road_map,
+            'trade': lambda: self.trade.commodities,
+            'mining': lambda: self.trade.resources,
+        }
+        return [(name, loaders[name]) for name in settings.WARM_UP_SUBSYSTEMS]
+
+    def get_snapshot_backend(self):
+        if settings.SNAPSHOT_BACKEND == "file":
+            return FileSnapshotBackend(settings.SNAPSHOT_DIRECTORY)
+        return MongoSnapshotBackend(self.mongo.get_database(settings.SNAPSHOT_DATABASE))
+
+    def get_database_manager(self, database_name):
+        return self.instrument_database(PooledDatabaseManager(database_name, settings.LOG_FILE,
+                                                              pool_size=settings.DATABASE_POOL_SIZE,
+                                                              busy_timeout=settings.DATABASE_BUSY_TIMEOUT,
+                                                              batch_size=settings.DATABASE_WRITE_BATCH_SIZE,
+                                                              batch_delay=settings.DATABASE_WRITE_BATCH_DELAY))
+
+    def instrument_database(self, database_manager):
+        self.metrics.instrument(database_manager, 'database', 'method', self.instrumented_database_methods)
+        return database_manager
+
+    def start_metrics_server(self):
+        self.metrics.add_collector('dispatcher', self.dispatcher.get_stats, {('jobs',): 'command'})
+        self.metrics.add_collector('http_cache', self.http_cache.get_stats)
+        self.metrics.add_collector('response_cache', self.response_cache.get_stats)
+        self.metrics.add_collector('message_sender', self.message_sender.get_stats)
+        self.metrics.add_collector('monitor', self.source_monitor.get_stats, {(): 'source'})
+        self.metrics.add_collector('guild', self.guilds.get_stats, {(): 'guild'})
+        self.metrics.add_collector('price_updates', self.price_updater.get_stats)
+        self.metrics.add_collector('snapshots', self.snapshot_store.get_stats, {(): 'source'})
+        self.metrics.add_collector('subsystems', self.lazy.get_stats, {('init_seconds',): 'subsystem'})
+        if settings.METRICS_PORT:
+            server = MetricsServer(self.metrics, settings.METRICS_HOST,
+                                   settings.METRICS_PORT + self.client.config.shard_id)
+            try:
+                server.start()
+            except OSError as bind_error:
+                host, port = server.address
+                self.logger.error("Metrics endpoint disabled, could not listen on %s:%d: %s" % (host, port,
+                                                                                                 str(bind_error)))
+                return None
+            return server
+
+    def monitoring_procedure(self):
+        """
+        Starts SourceMonitor, which polls sources on the async loop. It runs in 'monitoring_thread' started
+        at the end of __init__, when all bot parts are ready.
+        """
+        self.source_monitor.start()
+
+    @property
+    def announces(self):
+        """
+        With gateway shards running in separate processes only one of them announces news in all guilds.
+        It is also the only one downloading ship matrix, road maps and trade data, the others load what it
+        saved to snapshot cache.
+        """
+        return self.client.config.shard_id == settings.MONITOR_SHARD_ID
+
+    def get_monitored_sources(self):
+        polls = {
+            'releases': self.monitor_current_releases,
+            'forum': self.monitor_forum_threads,
+            'youtube': self.monitor_youtube_channel,
+            'ship_prices': self.report_ship_price,
+            'trade': self.monitor_trade_data,
+        }
+        return [
+            MonitoredSource(name, polls[name],
+                            failure_threshold=settings.MONITOR_FAILURE_THRESHOLD,
+                            reset_timeout=settings.MONITOR_BREAKER_RESET,
+                            **options)
+            for name, options in settings.MONITOR_SOURCES.items()
+            if self.announces or name not in self.announcing_sources
+        ]
+
+    def get_main_channel(self, guild):
+        if guild.channel_main is None:
+            guild.channel_main = self._get_channel_instance(guild.main_channel_id)
+        return guild.channel_main
+
+    def announce(self, messages):
+        for guild in self.guilds:
+            try:
+                self.message_sender.send(self.get_main_channel(guild), messages)
+            except Exception as unexpected_exception:
+                self.logger.error("Could not announce in guild %s: %s" % (guild.guild_id, str(unexpected_exception)))
+
+    def monitor_current_releases(self):
+        if not self.announces:
+            self.rsi_data.reload_road_maps()
+            return False
+        new_version_released = self.rsi_data.check_new_version()
+        if new_version_released:
+            self.announce([self.messages.new_version % self.update_releases()])
+        return new_version_released
+
+    def update_releases(self):
+        """
+        Current versions, not stored as announced (unlike RsiMixin.update_releases), so 'releases' command
+        does not prevent announcement of a new version.
+        """
+        current_releases = self.rsi_data.get_updated_versions()
+        return "PU Live: %s\nPTU: %s\n" % (current_releases.get('live'), current_releases.get('ptu'))
+
+    def monitor_forum_threads(self):
+        new_threads = self.rsi_data.get_forum_release_messages()
+        if new_threads:
+            self.announce([self.messages.new_version % ""] + new_threads)
+        return bool(new_threads)
+
+    def monitor_youtube_channel(self):
+        try:
+            latest_video_url = pafy.get_channel("RobertsSpaceInd").uploads[0].watchv_url
+        except HTTPException as you_tube_error:
+            self.logger.warning("Unsuccessful YouTube channel connection. '%s'", str(you_tube_error))
+            return False
+        if self.database_manager.rsi_video_is_new(latest_video_url):
+            self.announce([latest_video_url])
+            return True
+        return False
+
+    def report_ship_price(self):
+        messages = []
+        for ship_name, price_limit in list(self.report_ship_price_list):
+            ship_data = self.rsi_data.get_ship(ship_name)
+            if ship_data is None:
+                messages.append(self.messages.ship_from_report_not_found % ship_name)
+            elif float(ship_data["price"][1:]) > price_limit:
+                messages.append(self.messages.ship_price_report % (ship_name, ship_data["price"]))
+                self.report_ship_price_list.remove((ship_name, price_limit))
+        if messages:
+            self.announce(messages)
+        return bool(messages)
+
+    def monitor_trade_data(self):
+        prices = self.trade.commodity_prices
+        self.trade.update_data()
+        return self.trade.commodity_prices is not prices
 
     def _get_channel_instance(self, channel_id):
-        return self.client.api.channels_get(self.main_channel_id)
+        return self.client.api.channels_get(channel_id)
+
+    def _get_guild_database(self, guild):
+        if guild.database_name is None:
+            return self.main_database_manager
+        return self.get_database_manager(guild.database_name)
+
+    def get_command_guild(self, event):
+        return self.guilds.get_for_command(event.channel.guild_id)
+
+    @property
+    def command_registry(self):
+        return get_command_registry(type(self))
+
+    def _render_help_messages(self, rows, headers):
+        return self.split_data_and_get_messages(rows, self.print_list_table, headers=headers)
 
     def _get_help_message(self):
-        header = ["Commands", "Arguments", "Description"]
-        rows = []
-        for method in self.meta_funcs:
-            commands, arguments = [], []
-            for decorator in method.meta:
-                if decorator['type'] == 'command':
-                    commands.append(decorator['args'][0])
-                    if not arguments:
-                        arguments = decorator['args'][1:]
-            commands = " | ".join(commands)
-            arguments = " ".join(arguments)
-            if commands:
-                for decorator in method.meta:
-                    description = decorator['kwargs'].get('docstring', "")
-                    if description:
-                        rows.append([commands, arguments, description])
-                        break
-        rows.sort()
-        return self.split_data_and_get_messages(rows, self.print_list_table, headers=header)
+        return self.command_registry.get_help_messages(additional_commands.help, self._render_help_messages)
+
+    def get_command_help(self, name):
+        command = self.command_registry.get(name)
+        if command:
+            return "```%s %s\n\n%s```" % (" | ".join(command.names), command.arguments, command.description)
+        return self.messages.found_nothing
+
+    def report_trade_price(self, args):
+        reply = BaseBot.report_trade_price(self, args)
+        if reply == self.messages.success:
+            self.price_updater.apply_trade_report(args.commodity, float(args.price), args.transaction, args.location)
+        return reply
+
+    def report_mining_price(self, args):
+        reply = BaseBot.report_mining_price(self, args)
+        if reply == self.messages.success:
+            percent = float(args.percent.replace("%", ""))
+            cargo = float(args.cargo) if args.cargo else 32
+            self.price_updater.apply_mining_report(args.resource, float(args.value) / (percent * cargo), args.location)
+        return reply
+
+    def get_mining_messages(self, resource_name=None):
+        if resource_name:
+            resource = self.trade.resources.match_one(resource_name)
+            rows = self.trade.mining_table.get_resource_table(resource.id) if resource else None
+        else:
+            rows = self.trade.mining_table.get_best_values_table()
+        if rows:
+            return self.split_data_and_get_messages(rows, self.print_dict_table)
+        return [self.messages.found_nothing]
+
+    @staticmethod
+    def get_cargo_size(cargo=None):
+        if not cargo:
+            return settings.MINING_CARGO_SIZES[0][1]
+        for ship, size in settings.MINING_CARGO_SIZES:
+            if ship.lower() == cargo.lower():
+                return size
+        try:
+            return float(cargo)
+        except ValueError:
+            return None
+
+    def get_best_refinery_messages(self, load, cargo=None):
+        """
+        'load' is a comma separated list of resource=percent pairs, e.g. 'quantanium=12,laranite=30.5'.
+        """
+        cargo_size = self.get_cargo_size(cargo)
+        resources, wrong = [], [] if cargo_size else [cargo]
+        for item in load.split(","):
+            name, _, percent = item.partition("=")
+            resource = self.trade.resources.match_one(name.strip())
+            try:
+                resources.append((resource.id, float(percent.replace("%", ""))))
+            except (AttributeError, ValueError):
+                wrong.append(item.strip())
+        if wrong or not resources:
+            return ["\n".join([self.messages.something_went_wrong, ", ".join(wrong)])]
+        rows = self.trade.mining_table.get_best_refineries(resources, cargo_size)
+        if rows:
+            return self.split_data_and_get_messages(rows, self.print_dict_table)
+        return [self.messages.found_nothing]
 
     def _get_bot_user(self):
         return self.bot.client.api.users_me_get()
 
-    def _get_member_roles(self):
+    def _get_member_roles(self, guild=None):
+        guild = guild or self.guilds.main
         return [
-            role.id for role in self.client.api.guilds_roles_list(self.guild_id)
-            if role.name in self.member_roles_names
+            role.id for role in self.client.api.guilds_roles_list(guild.guild_id)
+            if role.name in guild.member_roles_names
         ]
 
-    def user_is_member(self, user):
-        member = self.client.api.guilds_members_get(self.guild_id, user.id)
-        return any(role in self.member_roles for role in member.roles)
-
-    def _get_privileged_roles(self):
+    def _get_user_roles(self, user, guild):
+        roles = guild.roles_cache.get(user.id)
+        if roles is None:
+            roles = self.client.api.guilds_members_get(guild.guild_id, user.id).roles
+            guild.roles_cache.set(user.id, roles)
+        return roles
+
+    def user_is_member(self, user, guild=None):
+        guild = guild or self.guilds.main
+        if guild.member_roles is None:
+            guild.member_roles = self._get_member_roles(guild)
+        return any(role in guild.member_roles for role in self._get_user_roles(user, guild))
+
+    def _get_privileged_roles(self, guild=None):
+        guild = guild or self.guilds.main
         return [
-            role.id for role in self.client.api.guilds_roles_list(self.guild_id)
-            if role.name in self.privileged_roles_names
+            role.id for role in self.client.api.guilds_roles_list(guild.guild_id)
+            if role.name in guild.privileged_roles_names
         ]
 
-    def user_is_privileged(self, user):
-        member = self.client.api.guilds_members_get(self.guild_id, user.id)
-        return any(role in self.privileged_roles for role in member.roles)
+    def user_is_privileged(self, user, guild=None):
+        guild = guild or self.guilds.main
+        if guild.privileged_roles is None:
+            guild.privileged_roles = self._get_privileged_roles(guild)
+        return any(role in guild.privileged_roles for role in self._get_user_roles(user, guild))
 
     @staticmethod
     def mention_user(user):
@@ -67,36 +443,214 @@ class DiscordBot(BaseBot, Plugin):
     def mention_channel(channel):
         return '<#' + str(channel.id) + '>'
 
+    def send_messages(self, event, generator):
+        self.message_sender.send(event.channel, generator)
+
+    def get_ship_matrix_version(self):
+        return self.rsi_data.ships_version
+
+    def find_ships(self, kind, query):
+        """
+        Returns ships found by ship query of given kind ('prices', 'ship' or 'compare'), None when the query
+        gets 'ship not exists' reply (conditions of RsiMixin commands).
+        """
+        if kind == 'ship':
+            found = self.rsi_data.get_ship_data_from_name(query)
+            if isinstance(found, dict) or 1 < len(found) < self.max_ships:
+                return found
+        elif kind == 'prices':
+            found = self.rsi_data.get_ships_by_query(query)
+            if 0 < len(found) < self.max_ships:
+                return found
+        else:
+            found = [ship for name in query.split(",") for ship in self.rsi_data.get_ships_by_query(name.strip())]
+            if len(found) < self.max_ships:
+                return found
+
+    def render_ship_messages(self, kind, found):
+        if kind == 'ship' and isinstance(found, dict):
+            return [self.format_ship_data(found)]
+        elif kind == 'prices':
+            return list(self.split_data_and_get_messages(self.get_ship_prices_lines(found),
+                                                         lambda lines: "\n".join(lines)))
+        return list(self.split_compare_if_too_long(found))
+
+    def get_cached_ship_messages(self, kind, query, author):
+        """
+        Returns replies of ship query, rendered only on cache miss when some ship was found. 'Ship not exists'
+        replies mention the author, so they are not cached.
+        """
+        messages = self.response_cache.get(kind, query, self.get_ship_matrix_version())
+        if messages is None:
+            found = self.find_ships(kind, query)
+            if found is None:
+                return [self.messages.ship_not_exists % self.mention_user(author)]
+            messages = self.render_ship_messages(kind, found)
+            self.response_cache.set(kind, query, messages)
+        return messages
+
     @staticmethod
-    def send_messages(event, generator):
-        for message in generator:
-            event.channel.send_message(message)
+    def refresh_member_fleet(guild, discord_id):
+        guild.fleet_importer.forget(discord_id)
+        guild.fleet_aggregates.refresh_member(discord_id)
+
+    def clear_member_fleet(self, author, guild=None):
+        guild = guild or self.guilds.main
+        with self.guild_scope(guild):
+            ships = super().clear_member_fleet(author)
+        self.refresh_member_fleet(guild, author.id)
+        return ships
+
+    def delete_member(self, member_name, guild=None):
+        guild = guild or self.guilds.main
+        member = guild.database_manager.get_member_by_name(member_name)
+        if member:
+            discord_id = member.discord_id
+            guild.database_manager.delete_member(member)
+            self.refresh_member_fleet(guild, discord_id)
+            return True
+
+    def add_member_ship(self, ship_query, author, guild=None):
+        guild = guild or self.guilds.main
+        with self.guild_scope(guild):
+            messages = list(super().add_member_ship(ship_query, author))
+        self.refresh_member_fleet(guild, author.id)
+        return messages
+
+    def remove_member_ship(self, ship_query, author, guild=None):
+        guild = guild or self.guilds.main
+        with self.guild_scope(guild):
+            messages = list(super().remove_member_ship(ship_query, author))
+        self.refresh_member_fleet(guild, author.id)
+        return messages
+
+    def get_member_fleet(self, member_name, flight_ready=False, guild=None):
+        with self.guild_scope(guild):
+            return list(super().get_member_fleet(member_name, flight_ready))
+
+    def get_road_map_messages(self, args):
+        self.logger.debug("Requested Roadmap.")
+        road_map = self.rsi_data.sq_road_map if args.squadron else self.rsi_data.road_map
+
+        if args.update:
+            updated = road_map.update_database()
+            get_road_map_index(road_map)
+            return [self.messages.success] if updated else [self.messages.something_went_wrong]
+        elif args.list:
+            return [tabulate(road_map.get_releases_and_categories(), tablefmt="fancy_grid")]
+        elif not (args.version or args.category or args.find):
+            return [self.print_dict_table(road_map.get_releases(), table_format="fancy_grid")]
+
+        index = get_road_map_index(road_map)
+        found = index.find(args.find) if args.find else None
+        if args.category and args.version:
+            result = index.get_release_category_details(args.version, args.category)
+        elif args.version:
+            result = index.get_release_details(args.version, found)
+        elif args.category:
+            result = index.get_category_details(args.category, found)
+        else:
+            result = index.get_found_details(found)
+        return self._get_road_map_data_message(result) or [self.get_no_road_map_data_found_message(road_map)]
 
-    def update_fleet(self, attachments, author):
+    def get_fleet_tables(self, args, guild=None):
+        fleet_aggregates = (guild or self.guilds.main).fleet_aggregates
+        if args.manufacturers:
+            view = fleet_aggregates.get_view('manufacturers')
+        else:
+            kind = 'all' if args.all_ships else 'member' if args.member else 'summary'
+            if args.flight_ready:
+                view = fleet_aggregates.get_view(kind, args.member, self.get_flight_ready,
+                                                 self.get_ship_matrix_version())
+            else:
+                view = fleet_aggregates.get_view(kind, args.member)
+
+        if view and view.rows:
+            filters = [item.split("=") for item in args.filter.split(",")] if args.filter else []
+            order_by = args.order_by.split(",") if args.order_by else ["manufacturer", "name"]
+            ships = view.query(filters, order_by, args.descending)
+            return self.split_data_and_get_messages(ships, self.print_dict_table)
+
+    def iterate_fleet_import_messages(self, author, fleet_import, invalid_ships):
+        if fleet_import.unchanged:
+            yield self.messages.member_fleet_unchanged % self.mention_user(author)
+        else:
+            yield self.messages.member_fleet_imported % (self.mention_user(author),
+                                                         fleet_import.added, fleet_import.removed)
+        if invalid_ships:
+            for message in self.iterate_invalid_ships_messages(author, invalid_ships):
+                yield message
+
+    def update_fleet(self, attachments, author, channel=None, guild=None):
+        guild = guild or self.guilds.main
         invalid_ships = None
         for file in attachments.values():
             self.logger.debug("Checking file %s." % file.filename)
             try:
                 if file.filename == "shiplist.json":
                     self.logger.debug("Getting ships list.")
-                    ships = self.attachments_handler.get_ship_list(file.url, self.logger)
-                    ships, invalid_ships = self.rsi_data.verify_ships(ships)
-                    self.database_manager.update_member_ships(ships, author)
-
+                    ships, invalid_ships = [], []
+                    for batch in self.attachments_handler.iterate_ship_batches(file.url, file.size):
+                        verified_batch, invalid_batch = self.rsi_data.verify_ships(batch)
+                        ships += verified_batch
+                        invalid_ships += invalid_batch
+                    fleet_import = guild.fleet_importer.import_ships(ships, author)
+                    if not fleet_import.unchanged:
+                        guild.fleet_aggregates.refresh_member(author.id)
+                    if channel is not None:
+                        self.message_sender.send(channel, self.iterate_fleet_import_messages(author, fleet_import,
+                                                                                             invalid_ships))
+
+            except AttachmentTooLarge as too_large:
+                self.logger.warning("Rejected %s from %s. %s" % (file.filename, author.username, str(too_large)))
+            except asyncio.TimeoutError:
+                self.logger.error("Could not download attachment. Asyncio timeout error.")
             except Exception as unexpected_exception:
                 self.logger.error(str(unexpected_exception))
         return invalid_ships
 
     @Plugin.listen('MessageCreate')
     def on_message_create(self, event):
-        if event.attachments and self.user_is_member(event.author):
-            self.logger.debug("The msg has an attachment. Checking if contains ship list..")
-            self.update_fleet(event.attachments, event.author)
-
-    @Plugin.command('help', docstring="Shows this help message.")
-    @Plugin.command(additional_commands.help)
-    def show_help(self, event):
-        self.send_messages(event, self.help_messages)
+        if not event.attachments:
+            return
+        with self.metrics.timed('listener', event='MessageCreate'):
+            guild = self.get_command_guild(event)
+            if guild and self.user_is_member(event.author, guild):
+                self.logger.debug("The msg has an attachment. Checking if contains ship list..")
+                if self.dispatcher.submit('update_fleet', self.update_fleet, event.attachments, event.author,
+                                          event.channel, guild):
+                    self.send_messages(event, [self.messages.job_deferred])
+
+    @Plugin.listen('GuildMemberUpdate')
+    def on_guild_member_update(self, event):
+        guild = self.guilds.get(event.guild_id)
+        if guild:
+            guild.roles_cache.set(event.member.id, event.member.roles)
+
+    @Plugin.listen('GuildMemberRemove')
+    def on_guild_member_remove(self, event):
+        guild = self.guilds.get(event.guild_id)
+        if guild:
+            guild.roles_cache.remove(event.user.id)
+
+    @Plugin.listen('GuildRoleUpdate')
+    @Plugin.listen('GuildRoleDelete')
+    def on_guild_role_change(self, event):
+        guild = self.guilds.get(event.guild_id)
+        if guild:
+            self.logger.debug("Guild %s roles changed. Refreshing member and privileged roles." % guild.guild_id)
+            guild.member_roles = self._get_member_roles(guild)
+            guild.privileged_roles = self._get_privileged_roles(guild)
+
+    @Plugin.command('help', '[command:str...]',
+                    docstring="Shows this help message or details of given command, e.g. 'help fleet'")
+    @Plugin.command(additional_commands.help, '[command:str...]')
+    @dispatched
+    def show_help(self, event, command=None):
+        if command:
+            self.send_messages(event, [self.get_command_help(command)])
+        else:
+            self.send_messages(event, self.help_messages)
 
     @Plugin.command('fleet', parser=True, docstring="Organization fleet information. Try 'fleet -h' for more details.")
     @Plugin.command(additional_commands.fleet, parser=True)
@@ -110,66 +664,86 @@ class DiscordBot(BaseBot, Plugin):
                                 help="Choses columns to filter data, eg. '-f name=Herald,manufacturer=Drake'")
     @Plugin.parser.add_argument('-a', '--all-ships', action='store_true',
                                 help="Do not stack same models. Show every single ship in seperate row.")
+    @Plugin.parser.add_argument('-p', '--manufacturers', action='store_true',
+                                help="Show number of ships per manufacturer.")
     @Plugin.parser.add_argument('-h', '--help', action='store_true', help="Show this help message.")
+    @dispatched
     def show_fleet(self, event, args):
         if args.help:
-            event.channel.send_message("```%s```" % event.parser.format_help())
-        elif self.user_is_member(event.author):
-            fleet_tables = self.get_fleet_tables(args)
+            self.send_messages(event, ["```%s```" % event.parser.format_help()])
+            return
+        guild = self.get_command_guild(event)
+        if guild and self.user_is_member(event.author, guild):
+            fleet_tables = self.get_fleet_tables(args, guild)
             if fleet_tables:
                 self.send_messages(event, fleet_tables)
             else:
-                event.channel.send_message(self.messages.something_went_wrong)
+                self.send_messages(event, [self.messages.something_went_wrong])
 
     @Plugin.command('add_ship', '<ship:str...>', docstring="Add ship to fleet, e.g. 'add_ship Herald LTI'")
     @Plugin.command(additional_commands.add_ship, '<ship:str...>')
+    @dispatched
     def add_ship(self, event, ship):
-        if self.user_is_member(event.author):
-            self.send_messages(event, self.add_member_ship(ship, event.author))
+        guild = self.get_command_guild(event)
+        if guild and self.user_is_member(event.author, guild):
+            self.send_messages(event, self.add_member_ship(ship, event.author, guild))
 
     @Plugin.command('remove_ship', '<ship:str...>',
                     docstring="Remove ship from member fleet, e.g. 'remove_ship Herald LTI'")
     @Plugin.command(additional_commands.remove_ship, '<ship:str...>')
+    @dispatched
     def remove_ship(self, event, ship):
-        self.send_messages(event, self.remove_member_ship(ship, event.author))
+        guild = self.get_command_guild(event)
+        if guild:
+            self.send_messages(event, self.remove_member_ship(ship, event.author, guild))
 
     @Plugin.command('clear my ships', docstring="Manually clear member fleet.")
     @Plugin.command(additional_commands.clear_member_ships)
+    @dispatched
     def clear_member_ships(self, event):
-        ships_left = self.clear_member_fleet(event.author)
-        if ships_left:
-            event.channel.send_message(self.messages.something_went_wrong)
+        guild = self.get_command_guild(event)
+        if guild and self.clear_member_fleet(event.author, guild):
+            self.send_messages(event, [self.messages.something_went_wrong])
 
     @Plugin.command('remove_member', '<member_name:str...>',
                     docstring="Remove member from fleet, e.g. 'remove_member Nobody'")
     @Plugin.command(additional_commands.remove_member, '<member_name:str...>')
+    @dispatched
     def remove_member(self, event, member_name):
-        if self.user_is_privileged(event.author):
-            if self.delete_member(member_name):
-                event.channel.send_message(self.messages.success)
+        guild = self.get_command_guild(event)
+        if guild and self.user_is_privileged(event.author, guild):
+            if self.delete_member(member_name, guild):
+                self.send_messages(event, [self.messages.success])
             else:
-                event.channel.send_message(self.messages.something_went_wrong)
+                self.send_messages(event, [self.messages.something_went_wrong])
 
     @Plugin.command('prices', '<query:str...>', docstring="Ships prices in store credits, e.g. 'prices Cutlass'")
     @Plugin.command(additional_commands.prices, '<query:str...>')
+    @dispatched
     def check_ship_price(self, event, query):
-        self.send_messages(event, self.iterate_ship_prices(query, event.author))
+        query = self.response_cache.normalize_query(query)
+        self.send_messages(event, self.get_cached_ship_messages('prices', query, event.author))
 
     @Plugin.command('ship', '<query:str...>', docstring="Ship details, e.g. 'ship Cutlass Black'")
     @Plugin.command(additional_commands.ship, '<query:str...>')
+    @dispatched
     def check_ship_info(self, event, query):
-        self.send_messages(event, self.iterate_ship_info(query, event.author))
+        query = self.response_cache.normalize_query(query)
+        self.send_messages(event, self.get_cached_ship_messages('ship', query, event.author))
 
     @Plugin.command('compare', '<query:str...>',
                     docstring="Compare ships details, e.g. 'compare Cutlass,Freelancer'")
     @Plugin.command(additional_commands.compare, '<query:str...>')
+    @dispatched
     def compare_ships(self, event, query):
-        self.send_messages(event, self.iterate_ships_comparison(query, event.author))
+        query = self.response_cache.normalize_list_query(query)
+        self.send_messages(event, self.get_cached_ship_messages('compare', query, event.author))
 
     @Plugin.command('releases', docstring="Current PU and PTU versions.")
     @Plugin.command(additional_commands.releases)
+    @dispatched
     def check_current_releases(self, event):
-        event.channel.send_message(self.update_releases())
+        self.send_messages(event, [self.update_releases()])
 
     @Plugin.command('roadmap', parser=True, docstring="Roadmap information. Try 'roadmap -h' for more details.")
     @Plugin.command(additional_commands.roadmap, parser=True)
@@ -186,9 +760,10 @@ class DiscordBot(BaseBot, Plugin):
     @Plugin.parser.add_argument("-u", "--update", action='store_true',
                                 help="Update database with data downloaded from RSI page.")
     @Plugin.parser.add_argument('-h', '--help', action='store_true', help="Show this help message.")
+    @dispatched
     def road_map(self, event, args):
         if args.help:
-            event.channel.send_message("```%s```" % event.parser.format_help())
+            self.send_messages(event, ["```%s```" % event.parser.format_help()])
         else:
             self.logger.debug("Requested Roadmap.")
             self.send_messages(event, self.get_road_map_messages(args))
@@ -208,11 +783,12 @@ class DiscordBot(BaseBot, Plugin):
     @Plugin.parser.add_argument('-l', '--legal', action='store_true', help="Include only legal cargo.")
     @Plugin.parser.add_argument('-u', '--update', action='store_true', help="Update prices database.")
     @Plugin.parser.add_argument('-h', '--help', action='store_true', help="Show this help message.")
+    @dispatched
     def trade_route(self, event, args):
         if args.help:
-            event.channel.send_message("```%s```" % event.parser.format_help())
+            self.send_messages(event, ["```%s```" % event.parser.format_help()])
         elif args.update:
-            event.channel.send_message("```%s```" % self.update_trade_data())
+            self.send_messages(event, ["```%s```" % self.update_trade_data()])
         else:
             self.send_messages(event, self.get_trade_messages(args))
 
@@ -229,15 +805,17 @@ class DiscordBot(BaseBot, Plugin):
     @Plugin.parser.add_argument('location', action='store',
                                 help="Required. Location of reported price, e.g. -l grim hex")
     @Plugin.parser.add_argument('-h', '--help', action='store_true', help="Show this help message.")
+    @dispatched
     def trade_report(self, event, args):
         if args.help:
-            event.channel.send_message("```%s```" % event.parser.format_help())
+            self.send_messages(event, ["```%s```" % event.parser.format_help()])
         else:
-            event.channel.send_message(self.report_trade_price(args))
+            self.send_messages(event, [self.report_trade_price(args)])
 
     @Plugin.command('trade_prices', '<location:str...>',
                     docstring="Show commodities prices, e.g. 'trade_prices lorville'")
     @Plugin.command(additional_commands.trade_prices, '<location:str...>')
+    @dispatched
     def trade_prices(self, event, location):
         self.send_messages(event, self.get_trade_prices_msgs(location))
 
@@ -245,15 +823,24 @@ class DiscordBot(BaseBot, Plugin):
     @Plugin.command(additional_commands.mining, parser=True)
     @Plugin.parser.add_argument("-r", "--resource", action='store',
                                 help="Show all prices for given resource, e.g. '-r laranite'")
+    @Plugin.parser.add_argument("-l", "--load", action='store',
+                                help="Find best refinery for cargo load given as resource=percent pairs, "
+                                     "e.g. '-l quantanium=12,laranite=30'")
+    @Plugin.parser.add_argument('-c', '--cargo', action='store',
+                                help="Optional. Cargo size in SCU or mining ship name used with '--load' "
+                                     "(Prospector by default), e.g. '-c mole'")
     @Plugin.parser.add_argument('-u', '--update', action='store_true', help="Update prices database.")
     @Plugin.parser.add_argument('-h', '--help', action='store_true', help="Show this help message.")
+    @dispatched
     def mining_prices(self, event, args):
         if args.help:
-            event.channel.send_message("```%s```" % event.parser.format_help())
+            self.send_messages(event, ["```%s```" % event.parser.format_help()])
         elif args.update:
-            event.channel.send_message("```%s```" % self.update_trade_data())
+            self.send_messages(event, ["```%s```" % self.update_trade_data()])
+        elif args.load:
+            self.send_messages(event, self.get_best_refinery_messages(args.load, args.cargo))
         else:
-            event.channel.send_message(self.get_mining_messages(args.resource))
+            self.send_messages(event, self.get_mining_messages(args.resource))
 
     @Plugin.command('mining_report', parser=True,
                     docstring="Report new mining resource price. Usage: 'mining_report Gold 14.54 47 \"Port Olisar\"'")
@@ -269,8 +856,9 @@ class DiscordBot(BaseBot, Plugin):
     @Plugin.parser.add_argument('-c', '--cargo', action='store',
                                 help="Optional. Size of mining ship cargo (Prospector by default), e.g. -c 32")
     @Plugin.parser.add_argument('-h', '--help', action='store_true', help="Show this help message.")
+    @dispatched
     def mining_report(self, event, args):
         if args.help:
-            event.channel.send_message("```%s```" % event.parser.format_help())
+            self.send_messages(event, ["```%s```" % event.parser.format_help()])
         else:
-            event.channel.send_message(self.report_mining_price(args))
+            self.send_messages(event, [self.report_mining_price(args)])
@@ -0,0 +1,647 @@
+import asyncio
+import concurrent.futures
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import aiohttp
+import requests
+
+from base_astro_bot.rsi_data import RsiDataParser
+from base_astro_bot.rsi_data.loaners import LOANER_SHIPS
+from base_astro_bot.rsi_data.road_map import RoadMap, SqRoadMap
+from base_astro_bot.trade import TradeAssistant
+from base_astro_bot.trade.data_rat_client import TradeClient, MiningClient, handles_request_exception
+from base_astro_bot.trade.data_structure import DataStructure
+from base_astro_bot.utils import MyLogger
+
+import settings
+from .http_cache import requests_sender, aiohttp_sender
+from .price_updates import ReportableDataStructure
+from .ship_matrix_store import ShipMatrixStore
+from .ship_resolver import ShipResolver
+
+
+FETCH_ERRORS = (requests.exceptions.ConnectionError, aiohttp.ClientError, asyncio.TimeoutError,
+                concurrent.futures.TimeoutError)
+
+
+@contextmanager
+def untimed(name):
+    yield
+
+
+class CachedRoadMapMixin:
+    """
+    Road map fetched through HttpCache. When snapshot store is given, road map is saved to it (instead of
+    SQL database) as separate categories, releases and cards records, so a refresh writes only changed
+    cards. Without 'fetch_sources' road map
+    is never downloaded, it is loaded from the snapshot saved by the fetching process whenever it changed.
+    """
+    source = 'road_map'
+
+    def __init__(self, http_cache, async_loop=None, log_file='road_map.log', database_manager=None,
+                 snapshot_store=None, fetch_sources=True):
+        self.http_cache = http_cache
+        self.async_loop = async_loop
+        self.snapshot_store = snapshot_store
+        self.fetch_sources = fetch_sources or snapshot_store is None
+        self.snapshot_version = None
+        RoadMap.__init__(self, log_file=log_file, database_manager=database_manager)
+
+    async def _request(self, headers):
+        session = await self.async_loop.get_session()
+        async with session.get(self.api_init_url) as response:
+            await response.read()
+        token = session.cookie_jar.filter_cookies(self.api_init_url).get('Rsi-Token')
+        if token is not None:
+            headers = dict(headers, **{'x-rsi-token': token.value})
+        async with session.get(self.road_map_url, headers=headers) as response:
+            return response.status, response.headers, await response.read()
+
+    def _send(self, headers):
+        if self.async_loop is not None:
+            return self.async_loop.submit(self._request(headers)).result(settings.MONITOR_REQUEST_TIMEOUT)
+        with requests.Session() as session:
+            session.get(self.api_init_url)
+            session.headers.update({'x-rsi-token': session.cookies.get('Rsi-Token')})
+            response = session.get(self.road_map_url, headers=headers)
+        return response.status_code, response.headers, response.content
+
+    def _parse(self, content):
+        response_json = json.loads(content.decode())
+        if response_json.get('success') == 1:
+            return response_json
+        self.logger.error("Road Map didn't return 'success' flag.")
+
+    def update_database(self):
+        if not self.fetch_sources:
+            return self.reload_road_map()
+        try:
+            result = self.http_cache.fetch(self.source, self.road_map_url, self._send, self._parse)
+        except FETCH_ERRORS as err:
+            self.logger.warning("Could not download Road-map from RSI website due to following error:\n%s" % str(err))
+            result = None
+
+        if result and result.value and not result.changed:
+            return True
+        elif result and result.value:
+            data = result.value['data']
+            self.releases = self._get_releases_structure(data)
+            self.categories = self._get_categories_structure(data.get('categories'))
+            self.current_versions = self._get_current_versions(data.get('description'))
+            self.save_road_map()
+            return True
+        else:
+            if result:
+                self.logger.warning("Could not get data from Road Map. HTTP status code %s." % result.status_code)
+            self.releases, self.categories, self.current_versions = self.load_road_map()
+
+    def reload_road_map(self):
+        """
+        Loads road map from snapshot cache unless the same snapshot is loaded. Returns True when road map is loaded.
+        """
+        version = self.snapshot_store.get_latest_version(self.source)
+        if version is not None and version != self.snapshot_version:
+            self.releases, self.categories, self.current_versions = self.load_road_map()
+            self.snapshot_version = version
+        return self.snapshot_version is not None
+
+    def get_snapshot_records(self):
+        records = {'categories': self.categories, 'current_versions': self.current_versions}
+        release_keys = []
+        for release_index, release in enumerate(self.releases or []):
+            release_key = "release/%s" % release.get('id', release_index)
+            card_keys = []
+            for card_index, card in enumerate(release.get('cards') or []):
+                card_key = "%s/card/%s" % (release_key, card.get('id', card_index))
+                records[card_key] = card
+                card_keys.append(card_key)
+            records[release_key] = dict(release, cards=card_keys)
+            release_keys.append(release_key)
+        records['releases'] = release_keys
+        return records
+
+    @staticmethod
+    def get_road_map_from_records(records):
+        releases = [dict(records[release_key], cards=[records[card_key] for card_key in records[release_key]['cards']])
+                    for release_key in records['releases']]
+        return releases, records['categories'], records['current_versions']
+
+    def save_road_map(self):
+        if self.snapshot_store is None:
+            self.database.save_road_map(self.releases, self.categories, self.current_versions)
+        else:
+            self.snapshot_store.save(self.source, self.get_snapshot_records())
+
+    def load_road_map(self):
+        if self.snapshot_store is None:
+            return self.database.get_road_map()
+        records = self.snapshot_store.load(self.source)
+        if records is None:
+            self.logger.warning("No '%s' snapshot in cache." % self.source)
+            return [], {}, {}
+        return self.get_road_map_from_records(records)
+
+
+class CachedRoadMap(CachedRoadMapMixin, RoadMap):
+    pass
+
+
+class CachedSqRoadMap(CachedRoadMapMixin, SqRoadMap):
+    source = 'sq_road_map'
+
+
+class CachedRsiDataParser(RsiDataParser):
+    """
+    RSI data parser fetching ship matrix, ship upgrades, game packages, road maps and forum search
+    through HttpCache. Ship prices and forum threads are not processed again when response is unchanged.
+    When async loop is given, requests are made with its shared aiohttp session. Ships are published to
+    ship matrix store and all ship lookups, searches and verification use its snapshot - no process keeps
+    its own ships dict. Only the process created with 'fetch_sources' downloads ship matrix, updates prices
+    and downloads road maps, the others use its published ship matrix snapshot (or cached one until it is
+    published) and road maps from snapshot cache (see 'reload_road_maps').
+    Free text ship names are resolved with ShipResolver built once per ship matrix version.
+    Ship matrix and road maps are loaded on first use (timed with 'load_timer'), so ship lookups are
+    answered from already published snapshot until ship matrix is downloaded. When snapshot store is given,
+    ship matrix and road maps are cached in it instead of SQL database.
+    """
+    ship_name_aliases = settings.SHIP_NAME_ALIASES
+    _prices_applied_to = None
+    _resolver = None
+    _resolver_version = None
+
+    def __init__(self, http_cache, async_loop=None, ship_matrix_store=None, auto_update_period=0,
+                 log_file='rsi_parser.log', get_database_manager=None, load_timer=untimed, snapshot_store=None,
+                 fetch_sources=True):
+        self.logger = MyLogger(log_file_name=log_file, logger_name="RSI parser logger", prefix="[RSI_PARSER]")
+        self.http_cache = http_cache
+        self.async_loop = async_loop
+        self.ship_matrix_store = ship_matrix_store or ShipMatrixStore(settings.SHIP_MATRIX_STORE_FILE,
+                                                                      settings.SHIP_MATRIX_STORE_CHECK)
+        self.auto_update_period = auto_update_period
+        self.auto_update_thread = None
+        self.load_timer = load_timer
+        self.snapshot_store = snapshot_store
+        self.fetch_sources = fetch_sources
+        self._log_file = log_file
+        self._get_database_manager = get_database_manager
+        self._loaners = LOANER_SHIPS
+        self._ships_loaded = False
+        self._road_maps = {}
+        self._locks = {name: threading.RLock() for name in ('ship_matrix', 'road_map', 'sq_road_map')}
+
+    @property
+    def database(self):
+        return self._get_database_manager()
+
+    @property
+    def ships(self):
+        """
+        Read-only mapping of lowercase ship names to ships data from published snapshot, built on first use.
+        """
+        if not self._ships_loaded:
+            with self._locks['ship_matrix']:
+                if not self._ships_loaded:
+                    with self.load_timer('ship_matrix'):
+                        self.build_ships_base()
+                    self._ships_loaded = True
+                    if self.auto_update_period and self.fetch_sources:
+                        self.auto_update_thread = threading.Thread(target=self.update_prices_periodically, daemon=True)
+                        self.auto_update_thread.start()
+        return self.ship_matrix_store.snapshot or {}
+
+    def _get_road_map(self, name, road_map_class):
+        road_map = self._road_maps.get(name)
+        if road_map is None:
+            with self._locks[name]:
+                road_map = self._road_maps.get(name)
+                if road_map is None:
+                    with self.load_timer(name):
+                        road_map = self._road_maps[name] = road_map_class(self.http_cache, self.async_loop,
+                                                                          self._log_file, self.database,
+                                                                          self.snapshot_store, self.fetch_sources)
+        return road_map
+
+    @property
+    def road_map(self):
+        return self._get_road_map('road_map', CachedRoadMap)
+
+    @property
+    def sq_road_map(self):
+        return self._get_road_map('sq_road_map', CachedSqRoadMap)
+
+    def _get_sender(self, method, url, body=None):
+        if self.async_loop is not None:
+            return aiohttp_sender(self.async_loop, method, url, data=body, timeout=settings.MONITOR_REQUEST_TIMEOUT)
+        return requests_sender(getattr(requests, method.lower()), url, data=body)
+
+    def _fetch(self, source, url, parse, method="GET", body=None):
+        try:
+            result = self.http_cache.fetch(source, url, self._get_sender(method, url, body), parse, body)
+        except FETCH_ERRORS as err:
+            self.logger.warning("Could not request RSI website due to following error:\n%s" % str(err))
+            return None
+        if result.status_code not in (200, 304):
+            self.logger.warning("Could not get data from RSI website. HTTP status code %s." % result.status_code)
+        return result
+
+    def _parse_ships_prices(self, content):
+        for line in content.decode().split('\n'):
+            if "RSI.ShipUpgrade.MainView" in line:
+                return json.loads(line.split("fromShips: ")[1].split(", toShips: ")[0])
+        self.logger.error("Didn't find 'RSI.ShipUpgrade.MainView' string on page.")
+
+    def _parse_ships_matrix(self, content):
+        result = json.loads(content.decode())
+        if result.get("success") == 1:
+            return result["data"]
+        self.logger.error("Ship Matrix didn't return 'success' flag.")
+
+    def get_ships_prices(self):
+        result = self._fetch('ship_upgrades', self.ship_upgrades_url, self._parse_ships_prices)
+        if result:
+            return result.value
+
+    def get_ships_matrix(self):
+        result = self._fetch('ships_matrix', self.ships_matrix_url, self._parse_ships_matrix)
+        if result:
+            return result.value
+
+    def build_ships_base(self):
+        """
+        Publishes ships built from RSI ship matrix and prices, or loaded from cache when RSI does not answer.
+        Without 'fetch_sources' ships are loaded from cache only when nothing is published yet.
+        """
+        if not self.fetch_sources:
+            if self.ship_matrix_store.snapshot is None:
+                self.publish_ships(self.load_ships())
+            return
+        ship_matrix = self.get_ships_matrix()
+        if ship_matrix:
+            ships = {}
+            for ship in ship_matrix:
+                ship_name = ship["name"].lower()
+                ships[ship_name] = {data_key: ship[data_key] for data_key in self.ships_matrix_keys}
+                ships[ship_name]["manufacturer"] = ship["manufacturer"]["name"]
+                ships[ship_name]["manufacturer_code"] = ship["manufacturer"]["code"]
+            prices = self.get_ships_prices()
+            if prices:
+                self.apply_ships_prices(ships, prices)
+            self.save_ships(ships)
+            content_hash = self.publish_ships(ships)
+            if prices:
+                self._prices_applied_to = content_hash
+        else:
+            self.publish_ships(self.load_ships())
+
+    def save_ships(self, ships):
+        if self.snapshot_store is None:
+            self.database.save_rsi_data(ships)
+        else:
+            self.snapshot_store.save('ship_matrix', ships)
+
+    def load_ships(self):
+        if self.snapshot_store is None:
+            return self.database.get_rsi_data()
+        return self.snapshot_store.load('ship_matrix')
+
+    @staticmethod
+    def apply_ships_prices(ships, prices):
+        for ship in prices:
+            ship_name = ship["name"].lower()
+            if ship_name in ships:
+                ships[ship_name]["price"] = ship["msrp"].replace(",", "")
+
+    def update_ships_prices(self):
+        """
+        Applies changed prices to a copy of published ships and publishes it.
+        """
+        result = self._fetch('ship_upgrades', self.ship_upgrades_url, self._parse_ships_prices)
+        snapshot = self.ships_snapshot
+        if result and result.value and snapshot and \
+                (result.changed or self._prices_applied_to != snapshot.content_hash):
+            ships = dict(snapshot.items())
+            self.apply_ships_prices(ships, result.value)
+            self.save_ships(ships)
+            self._prices_applied_to = self.publish_ships(ships)
+
+    def publish_ships(self, ships):
+        """
+        Returns content hash of published ships, None if there are no ships or they could not be published.
+        """
+        if ships:
+            try:
+                return self.ship_matrix_store.publish(ships)
+            except OSError as err:
+                self.logger.error("Could not publish ship matrix snapshot: %s" % str(err))
+
+    @property
+    def ships_snapshot(self):
+        """
+        Published ship matrix snapshot, ship matrix is built when nothing is published yet.
+        """
+        snapshot = self.ship_matrix_store.snapshot
+        if snapshot is None and self.ships:
+            snapshot = self.ship_matrix_store.snapshot
+        return snapshot
+
+    @property
+    def ships_version(self):
+        """
+        Changes whenever ships or their prices change: content hash of published snapshot.
+        """
+        snapshot = self.ships_snapshot
+        if snapshot is not None:
+            return snapshot.content_hash
+
+    def get_ship(self, ship_name):
+        snapshot = self.ships_snapshot
+        row = snapshot.find_row(ship_name) if snapshot is not None else None
+        if row is not None:
+            ship = snapshot.get_ship(row)
+            self.shorten_manufacturer_name(ship)
+            return ship
+
+    def get_ships_by_query(self, query):
+        snapshot = self.ships_snapshot
+        if snapshot is None:
+            return []
+        result = snapshot.get_ships(snapshot.sort_rows_by_price(snapshot.find_rows(query)))
+        for ship in result:
+            self.shorten_manufacturer_name(ship)
+        return result
+
+    @staticmethod
+    def _iterate_resolver_rows(snapshot):
+        if snapshot is not None:
+            arrays = snapshot.arrays
+            for row in zip(arrays['search_name'], arrays['search_manufacturer'], arrays['search_manufacturer_code']):
+                yield tuple(str(value) for value in row)
+
+    def get_ship_resolver(self):
+        snapshot = self.ships_snapshot
+        version = snapshot.content_hash if snapshot is not None else None
+        if self._resolver is None or self._resolver_version != version:
+            self._resolver = ShipResolver(self._iterate_resolver_rows(snapshot), self.ship_name_aliases)
+            self._resolver_version = version
+        return self._resolver
+
+    def _search_ship_keys(self, query):
+        snapshot = self.ships_snapshot
+        if snapshot is None:
+            return []
+        rows = snapshot.sort_rows_by_price(snapshot.find_rows(query))
+        return [str(key) for key in snapshot.arrays['search_name'][rows]]
+
+    def get_ship_data_from_name(self, ship_name):
+        """
+        Unlike base substring search, names matching no ship fall back to the most similar ship, so 'ship',
+        'add_ship' and 'remove_ship' commands also accept a misspelled name (e.g. 'add_ship gladus' adds
+        a Gladius).
+        """
+        keys = self.get_ship_resolver().resolve(ship_name, self._search_ship_keys)
+        ships = [ship for ship in (self.get_ship(key) for key in keys) if ship is not None]
+        if len(ships) == 1:
+            return ships[0]
+        return ships
+
+    def verify_ships(self, ships_data):
+        resolver = self.get_ship_resolver()
+        verified_ships = []
+        invalid_ships = []
+        for ship in ships_data:
+            key = resolver.find_exact(ship.get('name') or "")
+            db_ship = self.get_ship(key) if key is not None else None
+            if db_ship is None:
+                invalid_ships.append({'name': ship.get('name'), 'manufacturer': ship.get('manufacturer')})
+            else:
+                ship['name'] = db_ship['name']
+                self.shorten_manufacturer_name(ship, db_ship)
+                verified_ships.append(ship)
+        return verified_ships, invalid_ships
+
+    def check_new_version(self):
+        """
+        Refreshes road map and tells if its snapshot shows a change of current versions since they were last
+        announced. Hash of announced 'current_versions' record is kept as 'announced_versions' snapshot, written
+        only here by the releases monitor of the announcing process, so 'releases' command or another process
+        saving road map first can not swallow an announcement. Versions seen for the first time are only stored.
+        Without snapshot store announced versions are kept in SQL database.
+        """
+        road_map = self.road_map
+        road_map.update_database()
+        if not road_map.current_versions:
+            return False
+        if self.snapshot_store is None:
+            return self.database.update_versions(road_map.current_versions)
+        record_hash = self.snapshot_store.get_record_hash(road_map.source, 'current_versions')
+        if record_hash is None:
+            return False
+        diff = self.snapshot_store.save('announced_versions', {'current_versions': record_hash})
+        return bool(diff and diff.changed)
+
+    def reload_road_maps(self):
+        """
+        Loads road maps saved by the fetching process again when their snapshots changed.
+        """
+        for road_map in list(self._road_maps.values()):
+            road_map.reload_road_map()
+
+    def get_game_packages(self):
+        result = self._fetch('game_packages', self.game_packages_url, lambda content: content.decode())
+        if result:
+            return result.value
+
+    def get_forum_release_messages(self):
+        payload = dict(settings.FORUM_SEARCH_PAYLOAD, text=self.forum_query)
+        result = self._fetch('forum', settings.FORUM_SEARCH_URL, lambda content: json.loads(content.decode()),
+                             "POST", json.dumps(payload))
+        if result and result.changed:
+            data = result.value.get("data")
+            if data:
+                hits = data.get("hits")
+                if hits and hits["total"]:
+                    return list(self._iterate_new_forum_threads(hits["hits"]))
+
+
+class CachedDataClientMixin:
+    """
+    SCM data client answering GET requests through HttpCache. 'has_changes' tells if any of client
+    endpoints changed, so data structures do not have to be rebuilt when nothing is new.
+    """
+    endpoints = ()
+    source = 'scm'
+
+    def __init__(self, http_cache):
+        self.http_cache = http_cache
+
+    @handles_request_exception
+    def _fetch(self, endpoint):
+        url = self.base_url + endpoint
+        return self.http_cache.fetch(self.source, url, requests_sender(requests.get, url, headers=self.headers),
+                                     lambda content: json.loads(content.decode()))
+
+    def get_request(self, endpoint):
+        result = self._fetch(endpoint)
+        if result:
+            return result.value
+
+    def has_changes(self):
+        for endpoint in self.endpoints:
+            result = self._fetch(endpoint)
+            if result is None or result.value is None or result.changed:
+                return True
+        return False
+
+
+class CachedTradeClient(CachedDataClientMixin, TradeClient):
+    endpoints = ('containers', 'locations', 'commodities', 'commodity_prices')
+
+
+class CachedMiningClient(CachedDataClientMixin, MiningClient):
+    endpoints = ('resources', 'resource_prices')
+
+
+def lazy_table(name):
+    def get_table(self):
+        return self._get_table(name)
+
+    def set_table(self, value):
+        self._tables[name] = value
+
+    return property(get_table, set_table)
+
+
+class CachedTradeAssistant(TradeAssistant):
+    """
+    TradeAssistant using cached SCM clients and loading its tables on first use, in three parts: places,
+    trade and mining. Each part comes from SCM API, or from snapshot store when API does not answer, so
+    trade commands do not wait for mining data and the other way round. Each table is a separate snapshot
+    source with items as records, so saving a part writes only changed items and prices.
+    Without 'fetch_sources' SCM API is never asked, parts are loaded from snapshots saved by the fetching
+    process and 'update_data' loads them again when their snapshots changed.
+    """
+    parts = OrderedDict([
+        ('places', ('celestial_bodies', 'locations')),
+        ('trade', ('commodity_prices', 'commodities')),
+        ('mining', ('resource_prices', 'resources')),
+    ])
+    celestial_bodies = lazy_table('celestial_bodies')
+    locations = lazy_table('locations')
+    commodity_prices = lazy_table('commodity_prices')
+    commodities = lazy_table('commodities')
+    resource_prices = lazy_table('resource_prices')
+    resources = lazy_table('resources')
+
+    def __init__(self, http_cache, log_file="trade_assistant.log", snapshot_store=None, load_timer=untimed,
+                 fetch_sources=True):
+        self._log_file = log_file
+        self.logger = MyLogger(log_file_name=self._log_file, logger_name="Trade Assistant logger", prefix="[TRADE]")
+        self.trade_data_client = CachedTradeClient(http_cache)
+        self.mining_data_client = CachedMiningClient(http_cache)
+        self.snapshot_store = snapshot_store
+        self.load_timer = load_timer
+        self.fetch_sources = fetch_sources or snapshot_store is None
+        self._tables = {}
+        self._cached_versions = {}
+        self._locks = {part: threading.RLock() for part in self.parts}
+        self.lock = threading.RLock()
+
+    def _is_loaded(self, part):
+        return all(table in self._tables for table in self.parts[part])
+
+    def _ensure_loaded(self, part):
+        if not self._is_loaded(part):
+            if part != 'places':
+                self._ensure_loaded('places')
+            with self._locks[part]:
+                if not self._is_loaded(part):
+                    with self.load_timer(part):
+                        self._load_part(part)
+
+    def _get_table(self, name):
+        if name not in self._tables:
+            self._ensure_loaded(next(part for part, tables in self.parts.items() if name in tables))
+        return self._tables.get(name)
+
+    def _get_part_items(self, part):
+        if part == 'places':
+            return self.trade_data_client.get_containers(), self.trade_data_client.get_locations()
+        elif part == 'trade':
+            return self.trade_data_client.get_prices(), self.trade_data_client.get_commodities()
+        return self.mining_data_client.get_prices(), self.mining_data_client.get_resources()
+
+    def _get_cached_items(self, part):
+        return tuple(list((self.snapshot_store.load(table) or {}).values()) for table in self.parts[part])
+
+    def save_snapshot(self, part):
+        """
+        Saves tables of given part to snapshot cache, returns True when all were saved. Tables are copied under
+        'lock', so prices reported meanwhile do not change them while they are iterated.
+        """
+        saved = True
+        for table in self.parts[part]:
+            with self.lock:
+                records = {item.id: dict(item) for item in getattr(self, table).values()}
+            saved = self.snapshot_store.save(table, records) is not None and saved
+        return saved
+
+    def _set_part(self, part, first_items, second_items):
+        if part == 'places':
+            self.celestial_bodies = DataStructure(first_items)
+            self.locations = DataStructure(second_items, parents=self.celestial_bodies)
+        elif part == 'trade':
+            self.commodity_prices = DataStructure(first_items, locations=self.locations)
+            self.commodities = ReportableDataStructure(second_items, prices=self.commodity_prices)
+        else:
+            self.resource_prices = DataStructure(first_items, locations=self.locations)
+            self.resources = ReportableDataStructure(second_items, prices=self.resource_prices)
+
+    def _fetch_part(self, part):
+        items = self._get_part_items(part)
+        if not all(items):
+            return False
+        self._set_part(part, *items)
+        if self.snapshot_store is not None:
+            self.save_snapshot(part)
+        return True
+
+    def _load_cached_part(self, part):
+        """
+        Loads part from snapshot cache unless the same snapshots are loaded. Returns True when part is loaded.
+        Parts using places are loaded again whenever places snapshots changed.
+        """
+        tables = self.parts[part] if part == 'places' else self.parts['places'] + self.parts[part]
+        versions = tuple(self.snapshot_store.get_latest_version(table) for table in tables)
+        if not self._is_loaded(part) or versions != self._cached_versions.get(part):
+            items = self._get_cached_items(part)
+            if not all(items):
+                return False
+            self._set_part(part, *items)
+            self._cached_versions[part] = versions
+        return True
+
+    def _load_part(self, part):
+        if self.fetch_sources and self._fetch_part(part):
+            return
+        if self.snapshot_store is None or not self._load_cached_part(part):
+            self.logger.error("No '%s' data in SCM API nor in snapshot cache." % part)
+
+    def update_data(self):
+        """
+        Downloads all parts again. Parts which could not be downloaded keep loaded data, or are loaded
+        from snapshot cache when they were not loaded before. Without 'fetch_sources' parts are loaded from
+        snapshot cache when it changed. Returns True when all parts were updated.
+        """
+        updated = True
+        for part in self.parts:
+            with self._locks[part]:
+                if not self.fetch_sources:
+                    updated = self._load_cached_part(part) and updated
+                elif not self._fetch_part(part):
+                    updated = False
+                    if not self._is_loaded(part):
+                        self._load_part(part)
+        return updated
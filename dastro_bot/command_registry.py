@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+
+CommandInfo = namedtuple('CommandInfo', ['names', 'arguments', 'description', 'handler'])
+
+
+class CommandRegistry:
+    help_headers = ["Commands", "Arguments", "Description"]
+
+    def __init__(self, commands):
+        self.commands = sorted(commands, key=lambda command: command.names)
+        self._by_name = {name.lower(): command for command in self.commands for name in command.names}
+        self._help_messages = {}
+
+    @staticmethod
+    def get_command_info(function):
+        names, arguments, description = [], [], ""
+        for decorator in function.meta:
+            if decorator['type'] == 'command':
+                if decorator['args'][0] not in names:
+                    names.append(decorator['args'][0])
+                if not arguments:
+                    arguments = list(decorator['args'][1:])
+                if not description:
+                    description = decorator['kwargs'].get('docstring', "")
+        if names and description:
+            return CommandInfo(tuple(names), " ".join(arguments), description, function.__name__)
+
+    @classmethod
+    def from_functions(cls, functions):
+        commands = [cls.get_command_info(function) for function in functions]
+        return cls([command for command in commands if command])
+
+    @classmethod
+    def from_plugin_class(cls, plugin_class):
+        functions = [getattr(plugin_class, name) for name in dir(plugin_class)]
+        return cls.from_functions([function for function in functions if hasattr(function, 'meta')])
+
+    def get(self, name):
+        return self._by_name.get(name.lower().strip())
+
+    def get_help_rows(self):
+        return [[" | ".join(command.names), command.arguments, command.description] for command in self.commands]
+
+    def get_help_messages(self, language, render_messages):
+        if language not in self._help_messages:
+            self._help_messages[language] = render_messages(self.get_help_rows(), self.help_headers)
+        return self._help_messages[language]
+
+    def to_dict(self):
+        return {
+            'commands': [command._asdict() for command in self.commands],
+            'help_messages': self._help_messages,
+        }
+
+
+_registries = {}
+
+
+def get_command_registry(plugin_class):
+    if plugin_class not in _registries:
+        _registries[plugin_class] = CommandRegistry.from_plugin_class(plugin_class)
+    return _registries[plugin_class]
@@ -0,0 +1,342 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import wraps
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import joinedload, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from base_astro_bot.database import DatabaseManager
+from base_astro_bot.database.database_models import Base, FoundForumThreads, Member, RoadMap, RsiData, \
+    RsiLatestVideo, Ship, TradeData, Version
+from base_astro_bot.utils import MyLogger
+
+import settings
+
+
+class WriteQueue:
+    """
+    Runs write operations on a single writer thread. Operations queued while the writer is busy are run in
+    one transaction (each in its own savepoint, so a failing operation does not undo the others) and
+    committed together. 'submit' returns a Future with the result of the operation.
+    """
+    def __init__(self, get_session, logger, batch_size=64, batch_delay=0):
+        self.get_session = get_session
+        self.logger = logger
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._queue = queue.Queue()
+        self._stats = {'operations': 0, 'errors': 0, 'batches': 0, 'batch_max': 0}
+        self._thread = threading.Thread(target=self._work, name="Astro-Bot database writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation):
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_delay
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_operation(self, session, operation, nested):
+        savepoint = session.begin_nested() if nested else None
+        try:
+            result = operation(session)
+            if savepoint is not None:
+                savepoint.commit()
+            return result, None
+        except Exception as unexpected_exception:
+            if savepoint is None:
+                raise
+            savepoint.rollback()
+            return None, unexpected_exception
+
+    def _run_batch(self, batch):
+        session = self.get_session()
+        try:
+            results = [self._run_operation(session, operation, len(batch) > 1) for operation, _ in batch]
+            session.commit()
+        except Exception as unexpected_exception:
+            session.rollback()
+            results = [(None, unexpected_exception)] * len(batch)
+        finally:
+            session.close()
+
+        self._stats['operations'] += len(batch)
+        self._stats['batches'] += 1
+        self._stats['batch_max'] = max(self._stats['batch_max'], len(batch))
+        for (_, future), (result, error) in zip(batch, results):
+            if error is None:
+                future.set_result(result)
+            else:
+                self._stats['errors'] += 1
+                self.logger.error("Database write failed: %s" % str(error))
+                future.set_exception(error)
+
+    def _work(self):
+        while True:
+            batch = self._take_batch()
+            stopped = batch[-1] is None
+            if stopped:
+                batch.pop()
+            if batch:
+                self._run_batch(batch)
+            if stopped:
+                return
+
+    def get_stats(self):
+        return dict(self._stats, queue_depth=self._queue.qsize())
+
+
+def in_session(method):
+    """
+    Runs reading DatabaseManager method with 'sql_alchemy_session' of the calling thread, closed when the
+    outermost such call returns. Methods which change data are run by WriteQueue instead.
+    """
+    @wraps(method)
+    def run_in_session(self, *args, **kwargs):
+        with self.session_scope():
+            return method(self, *args, **kwargs)
+    return run_in_session
+
+
+class PooledDatabaseManager(DatabaseManager):
+    """
+    DatabaseManager safe to use from many threads. SQLite database is switched to WAL mode, so reads run
+    on pooled connections (each thread with its own session) and never wait for writes. All changes (fleets,
+    versions, cached data and announced threads and videos) are run by WriteQueue on one writer connection,
+    concurrent changes share one transaction.
+    """
+    def __init__(self, database_name=None, log_file='database_mgr.log', pool_size=4, busy_timeout=10,
+                 batch_size=64, batch_delay=0):
+        self.logger = MyLogger(log_file_name=log_file, logger_name="Database mgr logger", prefix="[DB]")
+        connection_string = settings.DATABASE_DIALECT % (database_name or settings.DATABASE_NAME)
+        sqlite = connection_string.startswith("sqlite")
+        connect_args = {'check_same_thread': False} if sqlite else {}
+        self.writer_engine = create_engine(connection_string, poolclass=QueuePool, pool_size=1, max_overflow=0,
+                                           connect_args=connect_args)
+        self.engine = create_engine(connection_string, poolclass=QueuePool, pool_size=pool_size,
+                                    max_overflow=pool_size, pool_timeout=busy_timeout, connect_args=connect_args)
+        if sqlite:
+            self._configure_sqlite(busy_timeout)
+        Base.metadata.create_all(self.writer_engine)
+
+        self._sessions = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+        self._scopes = threading.local()
+        self.write_queue = WriteQueue(sessionmaker(bind=self.writer_engine, expire_on_commit=False), self.logger,
+                                      batch_size, batch_delay)
+        self._closed = False
+
+    def _configure_sqlite(self, busy_timeout):
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA busy_timeout = %d" % (busy_timeout * 1000))
+            cursor.execute("PRAGMA synchronous = NORMAL")
+            cursor.close()
+
+        def set_writer_pragmas(dbapi_connection, connection_record):
+            # Transactions of writer are started below, so the driver does not defer them or break savepoints.
+            dbapi_connection.isolation_level = None
+            set_pragmas(dbapi_connection, connection_record)
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.close()
+
+        def begin_immediate(connection):
+            connection.connection.cursor().execute("BEGIN IMMEDIATE")
+
+        event.listen(self.engine, 'connect', set_pragmas)
+        event.listen(self.writer_engine, 'connect', set_writer_pragmas)
+        event.listen(self.writer_engine, 'begin', begin_immediate)
+
+    @property
+    def sql_alchemy_session(self):
+        return self._sessions()
+
+    @contextmanager
+    def session_scope(self):
+        depth = getattr(self._scopes, 'depth', 0)
+        self._scopes.depth = depth + 1
+        try:
+            yield self._sessions()
+        finally:
+            self._scopes.depth = depth
+            if not depth:
+                self._sessions.remove()
+
+    def write(self, operation):
+        """
+        Runs 'operation(session)' on the writer thread and returns its result once it is committed.
+        """
+        return self.write_queue.submit(operation).result()
+
+    @staticmethod
+    def get_or_add_member(session, user):
+        member = session.query(Member).filter(Member.discord_id == user.id).one_or_none()
+        if member is None:
+            member = Member(discord_id=user.id, name=user.username)
+            session.add(member)
+            session.flush()
+        else:
+            member.name = user.username
+        return member
+
+    @staticmethod
+    def _add_ships(session, ships_data, member):
+        rows = []
+        for ship_data in ships_data:
+            lti = ship_data.get('lti', False)
+            if isinstance(lti, str):
+                lti = lti == "LTI"
+            rows.append({'manufacturer': ship_data['manufacturer'], 'name': ship_data['name'], 'lti': lti,
+                         'package_id': ship_data.get('package_id'), 'owner_id': member.id})
+        if rows:
+            session.bulk_insert_mappings(Ship, rows)
+
+    @staticmethod
+    def _delete_member(session, member_id):
+        session.query(Ship).filter(Ship.owner_id == member_id).delete(synchronize_session=False)
+        session.query(Member).filter(Member.id == member_id).delete(synchronize_session=False)
+
+    def delete_member(self, member):
+        self.write(lambda session: self._delete_member(session, member.id))
+        self.logger.debug("Member deleted.")
+
+    def delete_discord_user(self, user):
+        def delete(session):
+            member = session.query(Member).filter(Member.discord_id == user.id).one_or_none()
+            if member is not None:
+                self._delete_member(session, member.id)
+        self.write(delete)
+
+    def add_and_get_member(self, user):
+        def add(session):
+            member = session.query(Member).filter(Member.discord_id == user.id).one_or_none()
+            if member is not None:
+                self._delete_member(session, member.id)
+            return self.get_or_add_member(session, user)
+        return self.write(add)
+
+    def update_member_ships(self, ships_data, owner):
+        def update(session):
+            member = self.get_or_add_member(session, owner)
+            session.query(Ship).filter(Ship.owner_id == member.id).delete(synchronize_session=False)
+            self._add_ships(session, ships_data, member)
+        self.write(update)
+
+    def add_one_ship(self, ship_data, owner):
+        self.write(lambda session: self._add_ships(session, [ship_data], self.get_or_add_member(session, owner)))
+
+    def remove_one_ship(self, ship_data, owner):
+        def remove(session):
+            member = session.query(Member).filter(Member.discord_id == owner.id).one_or_none()
+            if member is None:
+                return False
+            ship = session.query(Ship).filter(Ship.owner_id == member.id, Ship.name == ship_data['name'],
+                                              Ship.lti == (ship_data['lti'] == "LTI")).first()
+            if ship is not None:
+                session.query(Ship).filter(Ship.id == ship.id).delete(synchronize_session=False)
+            return ship is not None
+        self.logger.debug("Removing ship %s" % str(ship_data))
+        return self.write(remove)
+
+    def update_versions(self, input_data):
+        def update(session):
+            version_has_changed = False
+            for key, new_value in input_data.items():
+                version = session.query(Version).filter(Version.name == key).one_or_none()
+                if version is None:
+                    session.add(Version(name=key, value=new_value))
+                elif version.value != new_value:
+                    version.value = new_value
+                    version_has_changed = True
+            return version_has_changed
+        self.logger.debug("Updating PU and PTU version.")
+        return self.write(update)
+
+    def _save_single_row(self, model, **values):
+        def save(session):
+            rows = session.query(model).all()
+            if len(rows) > 1:
+                self.logger.error("Multiple %s objects in database!" % model.__name__)
+            elif rows:
+                for name, value in values.items():
+                    setattr(rows[0], name, value)
+            else:
+                session.add(model(**values))
+        self.write(save)
+
+    def save_rsi_data(self, ships_data):
+        self.logger.debug("Updating RSI data.")
+        self._save_single_row(RsiData, ships=json.dumps(ships_data))
+
+    def save_road_map(self, *road_map_data):
+        self.logger.debug("Updating Road Map.")
+        releases, categories, current_versions = self.get_json_strings(*road_map_data)
+        self._save_single_row(RoadMap, releases=releases, categories=categories, current_versions=current_versions)
+
+    def save_trade_data(self, *trade_data):
+        self.logger.debug("Updating Trade Data.")
+        celestial_bodies, locations, commodities, prices = self.get_json_strings(*trade_data)
+        self._save_single_row(TradeData, celestial_bodies=celestial_bodies, locations=locations,
+                              commodities=commodities, prices=prices)
+
+    def thread_is_new(self, thread_id, subject, url):
+        def add(session):
+            if session.query(FoundForumThreads).filter(FoundForumThreads.id == thread_id).first() is not None:
+                return False
+            session.add(FoundForumThreads(id=thread_id, subject=subject, url=url))
+            return True
+        return self.write(add)
+
+    def rsi_video_is_new(self, url):
+        def add(session):
+            if session.query(RsiLatestVideo).filter(RsiLatestVideo.url == url).first() is not None:
+                return False
+            session.add(RsiLatestVideo(url=url))
+            return True
+        return self.write(add)
+
+    @in_session
+    def get_all_ships(self):
+        return self.sql_alchemy_session.query(Ship).options(joinedload(Ship.owner)).all()
+
+    @in_session
+    def get_ships_by_member_id(self, member_id):
+        return self.sql_alchemy_session.query(Ship).options(joinedload(Ship.owner)) \
+            .filter(Ship.owner_id == member_id).all()
+
+    get_all_members = in_session(DatabaseManager.get_all_members)
+    get_member_by_name = in_session(DatabaseManager.get_member_by_name)
+    get_member_by_discord_id = in_session(DatabaseManager.get_member_by_discord_id)
+    get_ships_by_member_name = in_session(DatabaseManager.get_ships_by_member_name)
+    get_ships_summary = in_session(DatabaseManager.get_ships_summary)
+    get_rsi_data = in_session(DatabaseManager.get_rsi_data)
+    get_road_map = in_session(DatabaseManager.get_road_map)
+    get_trade_data = in_session(DatabaseManager.get_trade_data)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.write_queue.stop()
+            self._sessions.remove()
+            self.writer_engine.dispose()
+            self.engine.dispose()
+
+    def get_stats(self):
+        return dict(self.write_queue.get_stats(), read_connections=self.engine.pool.checkedout())
@@ -0,0 +1,146 @@
+import itertools
+import queue
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from functools import wraps
+
+
+Job = namedtuple('Job', ['priority', 'order', 'name', 'function', 'args', 'kwargs', 'submitted'])
+
+
+class CommandDispatcher:
+    """
+    Runs command jobs on a bounded pool of worker threads. Jobs with lower priority value are started first
+    and each job name can be limited to a number of concurrently running jobs. Jobs are timed with given
+    metrics registry and run through given profiler.
+    """
+    def __init__(self, logger, workers=4, commands=None, default_priority=5, metrics=None, profiler=None):
+        self.logger = logger
+        self.metrics = metrics
+        self.profiler = profiler
+        self.workers_count = workers
+        self.commands = commands or {}
+        self.default_priority = default_priority
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._idle_workers = workers
+        self._running = defaultdict(int)
+        self._pending = defaultdict(int)
+        self._limited = defaultdict(deque)
+        self._stats = defaultdict(lambda: {'count': 0, 'errors': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+        self._workers = [
+            threading.Thread(target=self._work, name="Astro-Bot worker %d" % number, daemon=True)
+            for number in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def get_priority(self, name):
+        return self.commands.get(name, {}).get('priority', self.default_priority)
+
+    def get_limit(self, name):
+        return self.commands.get(name, {}).get('limit', self.workers_count)
+
+    @property
+    def queue_depth(self):
+        with self._lock:
+            return sum(self._pending.values())
+
+    def _count_startable_jobs(self):
+        return sum(
+            min(pending, max(self.get_limit(name) - self._running[name], 0))
+            for name, pending in self._pending.items()
+        )
+
+    def submit(self, name, function, *args, **kwargs):
+        """
+        Queues the job and returns True if it will have to wait for a free worker.
+        """
+        job = Job(self.get_priority(name), next(self._order), name, function, args, kwargs, time.monotonic())
+        with self._lock:
+            deferred = self._count_startable_jobs() >= self._idle_workers or \
+                self._running[name] + self._pending[name] >= self.get_limit(name)
+            self._pending[name] += 1
+            self._queue.put(job)
+        return deferred
+
+    def _take_job(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if self._running[job.name] < self.get_limit(job.name):
+                    self._pending[job.name] -= 1
+                    self._running[job.name] += 1
+                    self._idle_workers -= 1
+                    return job
+                self._limited[job.name].append(job)
+
+    def _finish_job(self, job):
+        with self._lock:
+            self._running[job.name] -= 1
+            self._idle_workers += 1
+            if self._limited[job.name]:
+                self._queue.put(self._limited[job.name].popleft())
+
+    def _work(self):
+        while True:
+            job = self._take_job()
+            wait_time = time.monotonic() - job.submitted
+            stats = self._stats[job.name]
+            stats['count'] += 1
+            stats['wait_total'] += wait_time
+            stats['wait_max'] = max(stats['wait_max'], wait_time)
+            started = time.monotonic()
+            error = False
+            try:
+                if self.profiler is not None:
+                    self.profiler.run(job.name, job.function, *job.args, **job.kwargs)
+                else:
+                    job.function(*job.args, **job.kwargs)
+            except Exception as unexpected_exception:
+                error = True
+                stats['errors'] += 1
+                self.logger.error("Job '%s' failed: %s" % (job.name, str(unexpected_exception)))
+            finally:
+                self._finish_job(job)
+                if self.metrics is not None:
+                    self.metrics.observe('command', time.monotonic() - started, error, command=job.name)
+                    self.metrics.observe('command_queue', wait_time, command=job.name)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'queue_depth': sum(self._pending.values()),
+                'idle_workers': self._idle_workers,
+                'jobs': {
+                    name: {
+                        'count': stats['count'],
+                        'errors': stats['errors'],
+                        'running': self._running[name],
+                        'wait_avg': round(stats['wait_total'] / stats['count'], 3) if stats['count'] else 0.0,
+                        'wait_max': round(stats['wait_max'], 3),
+                    }
+                    for name, stats in self._stats.items()
+                }
+            }
+
+
+def get_job_name(method, kwargs):
+    if getattr(kwargs.get('args'), 'update', False):
+        return method.__name__ + "_update"
+    return method.__name__
+
+
+def dispatched(method):
+    """
+    Runs decorated command handler in bot dispatcher. Handlers called with '-u/--update' flag are queued
+    as '<handler name>_update' jobs, so they can be configured with separate priority and limit.
+    """
+    @wraps(method)
+    def wrapper(self, event, *args, **kwargs):
+        job_name = get_job_name(method, kwargs)
+        if self.dispatcher.submit(job_name, method, self, event, *args, **kwargs):
+            self.send_messages(event, [self.messages.job_deferred])
+    return wrapper
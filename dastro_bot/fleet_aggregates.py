@@ -0,0 +1,179 @@
+import threading
+from collections import Counter, OrderedDict
+
+
+class FleetView:
+    """
+    Read-only list of fleet rows with lazily built secondary indexes. Each column index maps
+    lowercase value strings to row numbers (used by filters) and keeps sort rank of every row.
+    """
+    def __init__(self, rows):
+        self.rows = rows
+        self._indexes = {}
+
+    def _get_index(self, column):
+        if column not in self._indexes:
+            values = [row[column] for row in self.rows]
+            ranks = {value: rank for rank, value in enumerate(sorted(set(values)))}
+            by_value = {}
+            for number, value in enumerate(values):
+                by_value.setdefault(str(value).lower(), []).append(number)
+            self._indexes[column] = by_value, [ranks[value] for value in values]
+        return self._indexes[column]
+
+    def filter(self, column, expected_value):
+        expected_value = expected_value.lower()
+        by_value, _ = self._get_index(column)
+        return set(number for value, numbers in by_value.items() if expected_value in value for number in numbers)
+
+    def query(self, filters=(), order_by=("manufacturer", "name"), descending=False):
+        """
+        Returns rows matching all (column, value) filters, ordered by 'order_by' columns (the first one is
+        the primary key, like in FleetMixin). Default order is the one of FleetMixin without 'order_by'.
+        """
+        numbers = set(range(len(self.rows)))
+        for column, expected_value in filters:
+            numbers &= self.filter(column, expected_value)
+        ranks = [self._get_index(column)[1] for column in order_by]
+        numbers = sorted(numbers, key=lambda number: [column_ranks[number] for column_ranks in ranks])
+        if descending:
+            numbers.reverse()
+        return [self.rows[number] for number in numbers]
+
+
+class FleetAggregates:
+    """
+    In-memory copy of organization fleet with model counts and per-manufacturer rollups. Loaded from
+    database once and updated per member, whenever fleet of that member changes.
+    """
+    def __init__(self, database_manager, max_views=256):
+        self.database_manager = database_manager
+        self.max_views = max_views
+        self.members = {}
+        self.models = OrderedDict()
+        self.manufacturers = Counter()
+        self._views = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def get_ship_dict(ship):
+        return {
+            'name': ship.name,
+            'manufacturer': ship.manufacturer,
+            'lti': "LTI" if ship.lti else "",
+        }
+
+    def _add_member(self, discord_id, name, ships):
+        self.members[discord_id] = (name, ships)
+        for ship in ships:
+            model = self.models.setdefault(ship['name'], {'manufacturer': ship['manufacturer'], 'owners': Counter()})
+            model['owners'][name] += 1
+            self.manufacturers[ship['manufacturer']] += 1
+
+    def _remove_member(self, discord_id):
+        name, ships = self.members.pop(discord_id, (None, []))
+        for ship in ships:
+            model = self.models[ship['name']]
+            model['owners'][name] -= 1
+            if not model['owners'][name]:
+                del model['owners'][name]
+            if not model['owners']:
+                del self.models[ship['name']]
+            self.manufacturers[ship['manufacturer']] -= 1
+        self.manufacturers = +self.manufacturers
+
+    def _load(self):
+        members = self.database_manager.get_all_members()
+        ships = {}
+        for ship in self.database_manager.get_all_ships():
+            ships.setdefault(ship.owner_id, []).append(self.get_ship_dict(ship))
+        for member in members:
+            self._add_member(str(member.discord_id), member.name, ships.get(member.id, []))
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._load()
+
+    def refresh_member(self, discord_id):
+        discord_id = str(discord_id)
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove_member(discord_id)
+            member = self.database_manager.get_member_by_discord_id(discord_id)
+            if member is not None:
+                ships = self.database_manager.get_ships_by_member_id(member.id)
+                self._add_member(discord_id, member.name, [self.get_ship_dict(ship) for ship in ships])
+            self._views.clear()
+
+    def get_member_ships(self, member_name):
+        member_name = member_name.lower()
+        found = [ships for name, ships in self.members.values() if member_name in name.lower()]
+        if len(found) == 1 and found[0]:
+            return found[0]
+
+    def get_all_ships(self):
+        return [dict(ship, owner=name) for name, ships in self.members.values() for ship in ships]
+
+    def get_models_summary(self):
+        return [
+            {
+                'manufacturer': model['manufacturer'],
+                'name': name,
+                'count': sum(model['owners'].values()),
+                'owners': ", ".join(sorted(+model['owners'])),
+            }
+            for name, model in self.models.items()
+        ]
+
+    def get_manufacturers_summary(self):
+        return [
+            {
+                'manufacturer': manufacturer,
+                'name': ", ".join(sorted(name for name, model in self.models.items()
+                                         if model['manufacturer'] == manufacturer)),
+                'count': count,
+            }
+            for manufacturer, count in self.manufacturers.items()
+        ]
+
+    def _get_rows(self, kind, member_name):
+        if kind == 'member':
+            return self.get_member_ships(member_name)
+        elif kind == 'all':
+            return self.get_all_ships()
+        elif kind == 'manufacturers':
+            return self.get_manufacturers_summary()
+        return self.get_models_summary()
+
+    def get_view(self, kind, member_name=None, flight_ready=None, version=None):
+        """
+        Returns FleetView of 'summary', 'all', 'member' or 'manufacturers' rows. If 'flight_ready' function is
+        given, rows are passed through it and the result is cached until 'version' changes.
+        """
+        key = (kind, member_name and member_name.lower(), flight_ready is not None)
+        with self._lock:
+            self._ensure_loaded()
+            cached = self._views.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            rows = self._get_rows(kind, member_name)
+            if rows is None:
+                return None
+            if flight_ready is not None:
+                rows = flight_ready([dict(row) for row in rows])
+            view = FleetView(rows)
+            if len(self._views) >= self.max_views:
+                self._views.clear()
+            self._views[key] = (version, view)
+            return view
+
+    def get_stats(self):
+        return {
+            'members': len(self.members),
+            'ships': sum(self.manufacturers.values()),
+            'models': len(self.models),
+            'views': len(self._views),
+        }
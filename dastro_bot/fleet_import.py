@@ -0,0 +1,114 @@
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+
+from base_astro_bot.database.database_models import Ship
+
+
+FleetImport = namedtuple('FleetImport', ['member', 'added', 'removed', 'unchanged', 'latency', 'rows_written'])
+
+
+class FleetImporter:
+    """
+    Imports member ship lists by applying only the difference between uploaded and stored ships.
+    Content hash of the last imported list is kept per member, so identical re-uploads are skipped.
+    Changes are written through the writer queue of PooledDatabaseManager.
+    """
+    def __init__(self, database_manager, logger, history_size=100):
+        self.database_manager = database_manager
+        self.logger = logger
+        self.history = deque(maxlen=history_size)
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_package_id(package_id):
+        """
+        Package ids are numbers in uploaded ship lists and strings in the database.
+        """
+        return str(package_id) if package_id is not None else None
+
+    @classmethod
+    def get_ship_key(cls, ship_data):
+        lti = ship_data.get('lti', False)
+        if isinstance(lti, str):
+            lti = lti == "LTI"
+        return ship_data['manufacturer'], ship_data['name'], bool(lti), cls.normalize_package_id(
+            ship_data.get('package_id'))
+
+    @classmethod
+    def get_stored_ship_key(cls, ship):
+        return ship.manufacturer, ship.name, bool(ship.lti), cls.normalize_package_id(ship.package_id)
+
+    @staticmethod
+    def get_content_hash(keys):
+        return hashlib.sha1(json.dumps(sorted(keys, key=str)).encode()).hexdigest()
+
+    def forget(self, discord_id=None):
+        with self._lock:
+            if discord_id is None:
+                self._hashes.clear()
+            else:
+                self._hashes.pop(str(discord_id), None)
+
+    def _get_changes(self, ships_data, stored_ships):
+        uploaded = defaultdict(list)
+        for ship_data in ships_data:
+            key = self.get_ship_key(ship_data)
+            uploaded[key].append(key)
+        stored = defaultdict(list)
+        for ship in stored_ships:
+            stored[self.get_stored_ship_key(ship)].append(ship)
+
+        to_insert = []
+        for key, ships in uploaded.items():
+            to_insert += ships[len(stored[key]):]
+        to_delete = []
+        for key, ships in stored.items():
+            to_delete += ships[len(uploaded[key]):]
+        return to_insert, to_delete
+
+    def _apply_changes(self, session, ships_data, owner):
+        member = self.database_manager.get_or_add_member(session, owner)
+        stored_ships = session.query(Ship).filter(Ship.owner_id == member.id).all()
+        to_insert, to_delete = self._get_changes(ships_data, stored_ships)
+        if to_delete:
+            session.query(Ship).filter(Ship.id.in_([ship.id for ship in to_delete])) \
+                .delete(synchronize_session=False)
+        if to_insert:
+            session.bulk_insert_mappings(Ship, [
+                {'manufacturer': manufacturer, 'name': name, 'lti': lti, 'package_id': package_id,
+                 'owner_id': member.id}
+                for manufacturer, name, lti, package_id in to_insert
+            ])
+        return len(to_insert), len(to_delete)
+
+    def import_ships(self, ships_data, owner):
+        started = time.monotonic()
+        content_hash = self.get_content_hash([self.get_ship_key(ship_data) for ship_data in ships_data])
+        if self._hashes.get(str(owner.id)) == content_hash:
+            added, removed, unchanged = 0, 0, True
+        else:
+            added, removed = self.database_manager.write(
+                lambda session: self._apply_changes(session, ships_data, owner))
+            unchanged = not (added or removed)
+            with self._lock:
+                self._hashes[str(owner.id)] = content_hash
+
+        result = FleetImport(owner.username, added, removed, unchanged, time.monotonic() - started, added + removed)
+        self.history.append(result)
+        self.logger.debug("Imported %d ships of %s in %.3fs, %d rows written." %
+                          (len(ships_data), owner.username, result.latency, result.rows_written))
+        return result
+
+    def get_stats(self):
+        imports = list(self.history)
+        return {
+            'imports': len(imports),
+            'unchanged': sum(1 for result in imports if result.unchanged),
+            'rows_written': sum(result.rows_written for result in imports),
+            'latency_avg': round(sum(result.latency for result in imports) / len(imports), 3) if imports else 0.0,
+            'latency_max': round(max((result.latency for result in imports), default=0.0), 3),
+        }
@@ -0,0 +1,136 @@
+import threading
+
+from .fleet_aggregates import FleetAggregates
+from .fleet_import import FleetImporter
+from .roles_cache import MemberRolesCache
+
+
+class GuildContext:
+    """
+    Configuration and state of one served guild: channels, role names and resolved role ids, member roles
+    cache and fleet namespace. Fleet database, importer and aggregates are created on first use.
+    Guild without its own 'database_name' uses the main database of the bot, which is not closed with it.
+    """
+    def __init__(self, guild_id, channels, member_roles_names, privileged_roles_names, database_name=None,
+                 roles_cache_ttl=600, roles_cache_size=1000):
+        self.guild_id = int(guild_id)
+        self.channels = channels
+        self.member_roles_names = member_roles_names
+        self.privileged_roles_names = privileged_roles_names
+        self.database_name = database_name
+        self.roles_cache = MemberRolesCache(roles_cache_ttl, roles_cache_size)
+        self.member_roles = None
+        self.privileged_roles = None
+        self.channel_main = None
+        self._logger = None
+        self._load_database = None
+        self._fleet = None
+        self._lock = threading.Lock()
+
+    @property
+    def main_channel_id(self):
+        return self.channels['main']
+
+    def bind(self, logger, load_database):
+        self._logger = logger
+        self._load_database = load_database
+
+    def _get_fleet(self):
+        with self._lock:
+            if self._fleet is None:
+                database_manager = self._load_database(self)
+                self._fleet = (database_manager, FleetImporter(database_manager, self._logger),
+                               FleetAggregates(database_manager))
+            return self._fleet
+
+    @property
+    def database_manager(self):
+        return self._get_fleet()[0]
+
+    @property
+    def fleet_importer(self):
+        return self._get_fleet()[1]
+
+    @property
+    def fleet_aggregates(self):
+        return self._get_fleet()[2]
+
+    def get_stats(self):
+        stats = {'roles_cache': self.roles_cache.get_stats()}
+        if self._fleet is not None:
+            stats['fleet'] = self.fleet_aggregates.get_stats()
+            stats['database'] = self.database_manager.get_stats()
+        return stats
+
+    @property
+    def owns_database(self):
+        return self.database_name is not None
+
+    def close(self):
+        if self._fleet is not None and self.owns_database:
+            self.database_manager.close()
+
+
+class GuildRegistry:
+    """
+    Guilds served by the bot. In single guild mode it holds only the guild configured with GUILD_ID,
+    CHANNELS and role names. Otherwise it is built from GUILDS setting and the main guild (GUILD_ID if
+    configured there, or the lowest ID) serves direct messages.
+    """
+    def __init__(self, contexts, main_guild_id, multi_guild=False):
+        self.contexts = {context.guild_id: context for context in contexts}
+        self.main = self.contexts[int(main_guild_id)]
+        self.multi_guild = multi_guild
+
+    @classmethod
+    def from_settings(cls, guilds, guild_id, channels, member_roles_names, privileged_roles_names,
+                      roles_cache_ttl=600, roles_cache_size=1000):
+        if not guilds:
+            context = GuildContext(guild_id, channels, member_roles_names, privileged_roles_names,
+                                   roles_cache_ttl=roles_cache_ttl, roles_cache_size=roles_cache_size)
+            return cls([context], guild_id)
+
+        contexts = [
+            GuildContext(configured_id, config['channels'],
+                         config.get('member_roles', member_roles_names),
+                         config.get('privileged_roles', privileged_roles_names),
+                         config.get('database_name', "guild_%s.sqlite" % configured_id),
+                         roles_cache_ttl, roles_cache_size)
+            for configured_id, config in guilds.items()
+        ]
+        main_guild_id = guild_id if int(guild_id) in {context.guild_id for context in contexts} else \
+            min(context.guild_id for context in contexts)
+        return cls(contexts, main_guild_id, multi_guild=True)
+
+    def __iter__(self):
+        return iter(sorted(self.contexts.values(), key=lambda context: context.guild_id))
+
+    def __len__(self):
+        return len(self.contexts)
+
+    def bind(self, logger, load_database):
+        for context in self.contexts.values():
+            context.bind(logger, load_database)
+
+    def close(self):
+        for context in self.contexts.values():
+            context.close()
+
+    def get(self, guild_id):
+        """
+        Returns context of configured guild or None.
+        """
+        if guild_id is not None:
+            return self.contexts.get(int(guild_id))
+
+    def get_for_command(self, guild_id):
+        """
+        Returns context in which command sent from given guild (None for direct messages) is handled.
+        In single guild mode every command is handled by the configured guild, as it always was.
+        """
+        if guild_id is None or not self.multi_guild:
+            return self.main
+        return self.get(guild_id)
+
+    def get_stats(self):
+        return {context.guild_id: context.get_stats() for context in self}
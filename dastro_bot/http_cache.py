@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+
+CacheResult = namedtuple('CacheResult', ['value', 'changed', 'status_code', 'from_cache'])
+
+PARSE_ERRORS = (ValueError, LookupError)
+
+
+class CacheEntry:
+    def __init__(self, etag, last_modified, content_hash, value):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.value = value
+        self.validated = time.monotonic()
+
+
+class HttpCache:
+    """
+    Conditional requests cache shared by scraped sources. It is independent of HTTP library - requests are
+    made by 'send(headers)' function given to 'fetch', which returns (status code, headers, content).
+    Responses are revalidated with ETag / Last-Modified once older than freshness of their source.
+    Parsed value is kept with the entry and reused when server answers 304 or content hash is unchanged.
+    Content which can not be parsed (e.g. HTML error page) is counted as error and cached value is kept.
+    Requests are timed per source with given metrics registry.
+    """
+    def __init__(self, freshness=None, default_freshness=0, max_entries=64, metrics=None):
+        self.metrics = metrics
+        self.freshness = freshness or {}
+        self.default_freshness = default_freshness
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'fresh': 0, 'not_modified': 0, 'unchanged': 0, 'changed': 0, 'errors': 0,
+                      'bytes_downloaded': 0}
+
+    def get_freshness(self, source):
+        return self.freshness.get(source, self.default_freshness)
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def fetch(self, source, url, send, parse, body=None):
+        """
+        Returns CacheResult with parsed value. 'changed' is False when value comes from the cache.
+        """
+        key = (source, url, body)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.validated < self.get_freshness(source):
+            self.stats['fresh'] += 1
+            return CacheResult(entry.value, False, 200, True)
+
+        if self.metrics is not None:
+            with self.metrics.timed('external_fetch', source=source):
+                status_code, headers, content = send(self.get_conditional_headers(entry))
+        else:
+            status_code, headers, content = send(self.get_conditional_headers(entry))
+        if status_code == 304 and entry is not None:
+            entry.validated = time.monotonic()
+            self.stats['not_modified'] += 1
+            return CacheResult(entry.value, False, status_code, True)
+        if status_code != 200:
+            self.stats['errors'] += 1
+            return CacheResult(None, False, status_code, False)
+
+        self.stats['bytes_downloaded'] += len(content)
+        content_hash = hashlib.sha1(content).hexdigest()
+        if entry is not None and entry.content_hash == content_hash:
+            entry.validated = time.monotonic()
+            entry.etag, entry.last_modified = headers.get('ETag'), headers.get('Last-Modified')
+            self.stats['unchanged'] += 1
+            return CacheResult(entry.value, False, status_code, True)
+
+        try:
+            value = parse(content)
+        except PARSE_ERRORS:
+            self.stats['errors'] += 1
+            if entry is not None:
+                return CacheResult(entry.value, False, status_code, True)
+            return CacheResult(None, False, status_code, False)
+        self._store(key, CacheEntry(headers.get('ETag'), headers.get('Last-Modified'), content_hash, value))
+        self.stats['changed'] += 1
+        return CacheResult(value, True, status_code, False)
+
+    def invalidate(self, source=None):
+        with self._lock:
+            for key in [key for key in self._entries if source is None or key[0] == source]:
+                del self._entries[key]
+
+    def get_stats(self):
+        return dict(self.stats, entries=len(self._entries))
+
+
+def requests_sender(function, url, headers=None, **kwargs):
+    """
+    Returns 'send' function for HttpCache using given 'requests' function, e.g. requests.get or session.post.
+    """
+    def send(conditional_headers):
+        response = function(url, headers=dict(headers or {}, **conditional_headers), **kwargs)
+        return response.status_code, response.headers, response.content
+    return send
+
+
+def aiohttp_sender(async_loop, method, url, headers=None, data=None, timeout=30):
+    """
+    Returns 'send' function for HttpCache making requests with shared aiohttp session of AsyncLoopThread.
+    It blocks until response is read, so it must not be called from the loop thread itself.
+    """
+    async def request(conditional_headers):
+        session = await async_loop.get_session()
+        async with session.request(method, url, headers=dict(headers or {}, **conditional_headers), data=data,
+                                   timeout=timeout) as response:
+            return response.status, response.headers, await response.read()
+
+    def send(conditional_headers):
+        return async_loop.submit(request(conditional_headers)).result(timeout)
+    return send
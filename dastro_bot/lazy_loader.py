@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+_MISSING = object()
+
+
+class LazyLoader:
+    """
+    Builds named bot parts on first use, so the bot answers simple commands before slow data sources
+    are loaded. Every part is built once (threads asking for a part being built wait for it). Build time
+    of each part is logged and observed as 'subsystem_init' metric. 'warm_up' loads parts in background.
+    """
+    def __init__(self, logger, metrics=None):
+        self.logger = logger
+        self.metrics = metrics
+        self.timings = {}
+        self._failed = set()
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._warm_up_thread = None
+
+    def _get_lock(self, name):
+        with self._lock:
+            if name not in self._locks:
+                self._locks[name] = threading.RLock()
+            return self._locks[name]
+
+    @contextmanager
+    def timed(self, name):
+        """
+        Times loading of given part. Used by parts which keep their loaded state themselves.
+        """
+        started = time.monotonic()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            seconds = time.monotonic() - started
+            self.timings[name] = round(seconds, 3)
+            if self.metrics is not None:
+                self.metrics.observe('subsystem_init', seconds, error, subsystem=name)
+            if error:
+                self._failed.add(name)
+                self.logger.error("Loading %s failed after %.2f s." % (name, seconds))
+            else:
+                self._failed.discard(name)
+                self.logger.info("Loaded %s in %.2f s." % (name, seconds))
+
+    def get(self, name, factory):
+        instance = self._instances.get(name, _MISSING)
+        if instance is _MISSING:
+            with self._get_lock(name):
+                instance = self._instances.get(name, _MISSING)
+                if instance is _MISSING:
+                    with self.timed(name):
+                        instance = self._instances[name] = factory()
+        return instance
+
+    def is_loaded(self, name):
+        """
+        Tells if part was built with 'get' (failed builds are not loaded and are tried again on next use).
+        """
+        return name in self._instances
+
+    def _warm_up(self, loaders):
+        for name, load in loaders:
+            try:
+                load()
+            except Exception as unexpected_exception:
+                self.logger.error("Could not warm up %s: %s" % (name, str(unexpected_exception)))
+
+    def warm_up(self, loaders):
+        """
+        Calls (name, load) loaders one by one in background thread.
+        """
+        if loaders:
+            self._warm_up_thread = threading.Thread(target=self._warm_up, args=(loaders,),
+                                                    name="Astro-Bot warm up", daemon=True)
+            self._warm_up_thread.start()
+
+    def get_stats(self):
+        return {'loaded': len(set(self.timings) - self._failed), 'failed': len(self._failed),
+                'init_seconds': dict(self.timings)}
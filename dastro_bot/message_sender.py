@@ -0,0 +1,157 @@
+import queue
+import re
+import threading
+import time
+
+
+class ChannelBucket:
+    """
+    Token bucket of single channel. Tokens are refilled with constant rate and corrected
+    with rate limit headers returned by Discord.
+    """
+    def __init__(self, capacity=5, period=5.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def update(self, remaining, reset_after):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining < 1:
+                self.blocked_until = max(self.blocked_until, now + reset_after)
+
+    def get_wait_time(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait_time = self.get_wait_time()
+        while wait_time:
+            time.sleep(wait_time)
+            wait_time = self.get_wait_time()
+
+
+class MessageSender:
+    """
+    Sends messages of each channel in order from a queue, within channel rate limit. Queue worker of a channel
+    is started on first message and stops after 'idle_timeout' seconds without messages.
+    """
+    channel_messages_path = re.compile(r"/channels/(\d+)/messages")
+
+    def __init__(self, logger, max_characters=2000, max_messages=5, attachment_message="",
+                 attachment_name="reply.txt", bucket_capacity=5, bucket_period=5.0, idle_timeout=60):
+        self.logger = logger
+        self.max_characters = max_characters
+        self.max_messages = max_messages
+        self.attachment_message = attachment_message
+        self.attachment_name = attachment_name
+        self.bucket_capacity = bucket_capacity
+        self.bucket_period = bucket_period
+        self.idle_timeout = idle_timeout
+        self._buckets = {}
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def watch(self, http_client):
+        after_request = http_client.after_request
+
+        def update_and_forward(response):
+            self.update_rate_limits(response.response)
+            if after_request:
+                after_request(response)
+
+        http_client.after_request = update_and_forward
+
+    def _get_bucket(self, channel_id):
+        with self._lock:
+            if channel_id not in self._buckets:
+                self._buckets[channel_id] = ChannelBucket(self.bucket_capacity, self.bucket_period)
+            return self._buckets[channel_id]
+
+    def update_rate_limits(self, response):
+        if response is None or 'X-RateLimit-Remaining' not in response.headers:
+            return
+        match = self.channel_messages_path.search(response.url)
+        if match:
+            remaining = int(response.headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Reset-After' in response.headers:
+                reset_after = float(response.headers['X-RateLimit-Reset-After'])
+            else:
+                reset_after = float(response.headers.get('X-RateLimit-Reset', 0)) - time.time()
+            self._get_bucket(int(match.group(1))).update(remaining, max(reset_after, 0.0))
+
+    def coalesce(self, messages):
+        result = []
+        for message in messages:
+            if result and len(result[-1]) + len(message) + 1 <= self.max_characters:
+                result[-1] = "%s\n%s" % (result[-1], message)
+            else:
+                result.append(message)
+        return result
+
+    @staticmethod
+    def get_attachment_text(messages):
+        return "\n\n".join(message.replace("```", "").strip("\n") for message in messages)
+
+    def get_payloads(self, messages):
+        messages = self.coalesce(messages)
+        if len(messages) > self.max_messages:
+            attachment = (self.attachment_name, self.get_attachment_text(messages))
+            return [(self.attachment_message, [attachment])]
+        return [(message, []) for message in messages]
+
+    def send(self, channel, messages):
+        payloads = self.get_payloads(list(messages))
+        with self._lock:
+            channel_queue = self._queues.get(channel.id)
+            if channel_queue is None:
+                channel_queue = self._queues[channel.id] = queue.Queue()
+                worker = threading.Thread(target=self._send_from_queue, args=(channel, channel_queue),
+                                          name="Astro-Bot sender %s" % channel.id, daemon=True)
+                worker.start()
+            for payload in payloads:
+                channel_queue.put(payload)
+
+    def _get_next_payload(self, channel, channel_queue):
+        try:
+            return channel_queue.get(timeout=self.idle_timeout)
+        except queue.Empty:
+            with self._lock:
+                if channel_queue.empty():
+                    del self._queues[channel.id]
+                    return None
+            return channel_queue.get()
+
+    def _send_from_queue(self, channel, channel_queue):
+        bucket = self._get_bucket(channel.id)
+        while True:
+            payload = self._get_next_payload(channel, channel_queue)
+            if payload is None:
+                return
+            content, attachments = payload
+            bucket.acquire()
+            try:
+                channel.send_message(content, attachments=attachments)
+            except Exception as unexpected_exception:
+                self.logger.error("Could not send message to channel %s: %s" % (channel.id, str(unexpected_exception)))
+
+    def get_stats(self):
+        with self._lock:
+            return {'workers': len(self._queues),
+                    'queued': sum(channel_queue.qsize() for channel_queue in self._queues.values())}
@@ -0,0 +1,202 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, value, error=False):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+        self.count += 1
+        self.sum += value
+        if error:
+            self.errors += 1
+
+
+class MetricsRegistry:
+    """
+    Latency histograms with call and error counts, labelled per command or dependency. Stats of other bot
+    parts are added as collectors and exported as gauges. Everything is rendered in Prometheus text format.
+    """
+    prefix = "astro_bot"
+    invalid_characters = re.compile(r"[^a-zA-Z0-9_]")
+
+    def __init__(self, buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, seconds, error=False, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds, error)
+
+    @contextmanager
+    def timed(self, metric, **labels):
+        started = time.monotonic()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(metric, time.monotonic() - started, error, **labels)
+
+    def wrap(self, function, metric, **labels):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.timed(metric, **labels):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def instrument(self, instance, metric, label, names):
+        """
+        Replaces given methods of the instance with timed ones, labelled with method name.
+        """
+        for name in names:
+            setattr(instance, name, self.wrap(getattr(instance, name), metric, **{label: name}))
+
+    def add_collector(self, name, get_stats, item_labels=None):
+        """
+        Adds numbers from 'get_stats' dict as gauges. 'item_labels' maps paths of dicts keyed by item names
+        (e.g. ('jobs',) for dispatcher jobs, () for the whole dict) to label names used for those items.
+        """
+        self._collectors[name] = (get_stats, item_labels or {})
+
+    @classmethod
+    def get_metric_name(cls, *parts):
+        return cls.invalid_characters.sub("_", "_".join((cls.prefix,) + parts))
+
+    @staticmethod
+    def format_labels(labels):
+        if not labels:
+            return ""
+        return "{%s}" % ",".join('%s="%s"' % (name, str(value).replace('"', "'")) for name, value in labels)
+
+    def _iterate_histogram_lines(self):
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        for (metric, labels), histogram in histograms:
+            name = self.get_metric_name(metric, "duration_seconds")
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                yield "%s_bucket%s %d" % (name, self.format_labels(labels + (('le', bound),)), count)
+            yield "%s_bucket%s %d" % (name, self.format_labels(labels + (('le', "+Inf"),)), histogram.count)
+            yield "%s_sum%s %f" % (name, self.format_labels(labels), histogram.sum)
+            yield "%s_count%s %d" % (name, self.format_labels(labels), histogram.count)
+            yield "%s%s %d" % (self.get_metric_name(metric, "errors_total"), self.format_labels(labels),
+                               histogram.errors)
+
+    def _iterate_gauges(self, parts, path, stats, item_labels, labels=()):
+        item_label = item_labels.get(path)
+        for key, value in sorted(stats.items(), key=lambda item: str(item[0])):
+            if item_label is not None and isinstance(value, dict):
+                for gauge in self._iterate_gauges(parts, path + (None,), value, item_labels,
+                                                  labels + ((item_label, key),)):
+                    yield gauge
+            elif isinstance(value, (bool, int, float)):
+                yield self.get_metric_name(*(parts + (str(key),))), labels, float(value)
+            elif isinstance(value, dict):
+                for gauge in self._iterate_gauges(parts + (str(key),), path + (key,), value, item_labels, labels):
+                    yield gauge
+
+    def _iterate_collector_lines(self):
+        for name, (get_stats, item_labels) in sorted(self._collectors.items()):
+            try:
+                stats = get_stats()
+            except Exception as unexpected_exception:
+                yield "# %s collector failed: %s" % (name, str(unexpected_exception))
+                continue
+            for metric_name, labels, value in self._iterate_gauges((name,), (), stats, item_labels):
+                yield "%s%s %s" % (metric_name, self.format_labels(labels), repr(value))
+
+    def render(self):
+        lines = list(self._iterate_histogram_lines()) + list(self._iterate_collector_lines())
+        return "\n".join(lines) + "\n"
+
+
+class CommandProfiler:
+    """
+    Profiles randomly sampled command runs. Profiles of runs slower than 'slow_threshold' seconds are saved
+    to 'directory' as '<command>-<timestamp>.prof' files (readable with pstats or snakeviz).
+    """
+    def __init__(self, sample_rate=0.0, slow_threshold=2.0, directory="profiles"):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.directory = directory
+
+    def run(self, name, function, *args, **kwargs):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return function(*args, **kwargs)
+        profile = cProfile.Profile()
+        started = time.monotonic()
+        profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            if time.monotonic() - started >= self.slow_threshold:
+                os.makedirs(self.directory, exist_ok=True)
+                profile.dump_stats(os.path.join(self.directory, "%s-%d.prof" % (name, time.time() * 1000)))
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    """
+    Local HTTP server answering 'GET /metrics' with rendered metrics.
+    """
+    def __init__(self, registry, host="127.0.0.1", port=9464):
+        self.registry = registry
+        self.address = (host, port)
+        self._server = None
+
+    def get_handler_class(self):
+        registry = self.registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, message_format, *args):
+                pass
+
+        return MetricsHandler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(self.address, self.get_handler_class())
+        threading.Thread(target=self._server.serve_forever, name="Astro-Bot metrics", daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+UNITS_PER_SCU = 100
+
+
+class MiningValueTable:
+    """
+    Value per SCU of every resource at every refinery (location buying any resource), kept in a numpy
+    matrix of resources x locations (NaN where the resource is not bought), together with values of full
+    cargo of ships given as (ship, SCU) pairs. Reported prices update single cells, so queries are lookups
+    and ranking of table rows.
+    """
+    def __init__(self, resources, cargo_sizes=()):
+        self.resources = [resource for resource in resources.values()]
+        self.resource_indexes = {resource.id: index for index, resource in enumerate(self.resources)}
+        self.cargo_sizes = list(cargo_sizes)
+        self.locations = []
+        self._location_indexes = {}
+        self._cells = {}
+        self._cell_prices = {}
+        for resource_index, resource in enumerate(self.resources):
+            for price in resource.sell_prices:
+                if price.location:
+                    self._add_price(resource_index, price)
+
+        self.location_strings = [location.short_string for location in self.locations]
+        self.values = np.full((len(self.resources), len(self.locations)), np.nan)
+        self.projections = np.full(self.values.shape + (len(self.cargo_sizes),), np.nan)
+        self._cargo = np.array([size for _, size in self.cargo_sizes], dtype=float)
+        for cell in self._cell_prices:
+            self._update_cell(cell)
+
+    def _add_price(self, resource_index, price):
+        if price.location_id not in self._location_indexes:
+            self._location_indexes[price.location_id] = len(self.locations)
+            self.locations.append(price.location)
+        cell = resource_index, self._location_indexes[price.location_id]
+        self._cells[id(price)] = cell
+        self._cell_prices.setdefault(cell, []).append(price)
+
+    def _update_cell(self, cell):
+        value = max(price.value for price in self._cell_prices[cell]) * UNITS_PER_SCU
+        self.values[cell] = value
+        self.projections[cell] = value * self._cargo
+
+    def update_price(self, price):
+        """
+        Updates cell of reported price. Returns False if the price is not in the table (table has to be rebuilt).
+        """
+        cell = self._cells.get(id(price))
+        if cell is None:
+            return False
+        self._update_cell(cell)
+        return True
+
+    def get_projection_headers(self):
+        return ["%s (%d SCU)" % (ship, size) for ship, size in self.cargo_sizes]
+
+    def _get_row(self, resource_index, location_index, *first_columns):
+        value = float(self.values[resource_index, location_index])
+        row = OrderedDict(first_columns)
+        row['aUEC/unit'] = round(value / UNITS_PER_SCU, 3)
+        row['aUEC/SCU'] = round(value, 2)
+        for header, projection in zip(self.get_projection_headers(),
+                                      self.projections[resource_index, location_index]):
+            row[header] = int(projection)
+        return row
+
+    def get_resource_table(self, resource_id):
+        """
+        Returns rows of all refineries buying given resource, best value first.
+        """
+        resource_index = self.resource_indexes.get(resource_id)
+        if resource_index is None:
+            return []
+        values = self.values[resource_index]
+        locations = np.nonzero(~np.isnan(values))[0]
+        rows = []
+        for location_index in locations[np.argsort(-values[locations], kind='mergesort')]:
+            row = self._get_row(resource_index, location_index)
+            row['Locations'] = self.location_strings[location_index]
+            rows.append(row)
+        return rows
+
+    def get_best_values_table(self):
+        """
+        Returns best value of each resource bought anywhere, with refineries offering it.
+        """
+        rows = []
+        for resource_index, resource in enumerate(self.resources):
+            values = self.values[resource_index]
+            if np.isnan(values).all():
+                continue
+            best = np.nanmax(values)
+            locations = np.nonzero(values == best)[0]
+            row = self._get_row(resource_index, locations[0], ('Resource', resource.name))
+            row['Locations'] = "\n".join(self.location_strings[index] for index in locations)
+            rows.append(row)
+        return rows
+
+    def get_best_refineries(self, load, cargo, max_locations=5):
+        """
+        Ranks refineries by value of given load - (resource id, percent of cargo) pairs - for cargo size in SCU.
+        Resources not bought by a refinery are listed for it and do not count to its value.
+        """
+        indexes = [self.resource_indexes[resource_id] for resource_id, _ in load]
+        amounts = np.array([percent / 100.0 * cargo for _, percent in load], dtype=float)
+        values = self.values[indexes]
+        totals = np.nansum(values * amounts[:, np.newaxis], axis=0)
+        bought = ~np.isnan(values)
+        ranked = [index for index in np.argsort(-totals, kind='mergesort') if bought[:, index].any()]
+        return [
+            OrderedDict([
+                ('Location', self.location_strings[location_index]),
+                ('aUEC', int(totals[location_index])),
+                ('Not bought', ", ".join(self.resources[resource_index].name
+                                         for resource_index, is_bought in zip(indexes, bought[:, location_index])
+                                         if not is_bought)),
+            ])
+            for location_index in ranked[:max_locations]
+        ]
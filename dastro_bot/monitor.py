@@ -0,0 +1,143 @@
+import asyncio
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CircuitBreaker:
+    """
+    Stops polling of a source after 'failure_threshold' consecutive failures. After 'reset_timeout'
+    seconds one trial poll is allowed - its success closes the breaker, failure opens it again.
+    """
+    def __init__(self, failure_threshold=3, reset_timeout=1200):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = None
+
+    @property
+    def state(self):
+        if self.opened is None:
+            return "closed"
+        if time.monotonic() - self.opened >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.opened is not None:
+            self.opened = time.monotonic()
+
+
+class MonitoredSource:
+    """
+    Polled source. 'poll' function returns True when it found (and announced) something new. Polling
+    interval shrinks after changes and grows while source stays the same, within given limits.
+    """
+    def __init__(self, name, poll, interval=300, min_interval=60, max_interval=3600, timeout=60,
+                 failure_threshold=3, reset_timeout=1200, history_size=50):
+        self.name = name
+        self.poll = poll
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.polls = 0
+        self.changes = 0
+        self.last_polled = None
+        self.running = None
+        self.latencies = deque(maxlen=history_size)
+
+    def record_change(self, started, finished):
+        """
+        Upstream change happened after previous poll, so time since then is the upper bound of delay
+        between the change and its announcement.
+        """
+        self.changes += 1
+        self.latencies.append(finished - (self.last_polled or started))
+        self.interval = max(self.min_interval, self.interval / 2)
+
+    def record_no_change(self):
+        self.interval = min(self.max_interval, self.interval * 1.5)
+
+    def get_delay(self):
+        if self.breaker.failures:
+            delay = min(self.max_interval, self.interval * 2 ** self.breaker.failures)
+        else:
+            delay = self.interval
+        return delay * random.uniform(0.8, 1.2)
+
+    def get_stats(self):
+        latencies = list(self.latencies)
+        return {
+            'polls': self.polls,
+            'changes': self.changes,
+            'failures': self.breaker.failures,
+            'breaker': self.breaker.state,
+            'interval': round(self.interval, 1),
+            'announcement_latency_avg': round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            'announcement_latency_max': round(max(latencies), 1) if latencies else 0.0,
+        }
+
+
+class SourceMonitor:
+    """
+    Polls all sources concurrently. Every source has its own task on the async loop and its blocking
+    poll function runs in a thread pool, so a slow source does not delay the others.
+    """
+    def __init__(self, async_loop, logger, sources):
+        self.async_loop = async_loop
+        self.logger = logger
+        self.sources = sources
+        self._executor = ThreadPoolExecutor(max_workers=max(len(sources), 1))
+        self._tasks = []
+
+    def start(self):
+        for source in self.sources:
+            self._tasks.append(self.async_loop.submit(self._run_source(source)))
+
+    async def _poll(self, source):
+        started = time.monotonic()
+        source.polls += 1
+        source.running = self.async_loop.loop.run_in_executor(self._executor, source.poll)
+        try:
+            changed = await asyncio.wait_for(asyncio.shield(source.running), source.timeout)
+        except asyncio.TimeoutError:
+            source.breaker.record_failure()
+            self.logger.warning("Monitoring of %s timed out after %ss." % (source.name, source.timeout))
+        except asyncio.CancelledError:
+            # Subclass of Exception before Python 3.8, monitoring was stopped.
+            raise
+        except Exception as unexpected_exception:
+            source.breaker.record_failure()
+            self.logger.warning("Monitoring of %s failed: %s" % (source.name, str(unexpected_exception)))
+        else:
+            source.breaker.record_success()
+            if changed:
+                source.record_change(started, time.monotonic())
+            else:
+                source.record_no_change()
+        source.last_polled = started
+
+    async def _run_source(self, source):
+        while True:
+            if source.breaker.allow() and (source.running is None or source.running.done()):
+                await self._poll(source)
+            await asyncio.sleep(source.get_delay())
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self):
+        return {source.name: source.get_stats() for source in self.sources}
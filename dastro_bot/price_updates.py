@@ -0,0 +1,159 @@
+import threading
+from datetime import date
+
+from base_astro_bot.trade.data_structure import DataStructure
+from base_astro_bot.trade.data_structure.trade_classes import Commodity, CommodityPrice, Resource, ResourcePrice
+
+
+class ReportableItemMixin:
+    """
+    Commodity or resource taking reported prices: new prices are added to its price lists and best sell value
+    is updated after a price changes.
+    """
+    def get_prices(self, transaction_type):
+        return self.sell_prices if transaction_type == 'sell' else self.buy_prices
+
+    def add_price(self, price):
+        self.get_prices(price.type).append(price)
+
+    def update_best_sell(self):
+        # The only use of DataItem internals (base_astro_bot 1.3.6): best sell value is computed once, when
+        # the item is created, and kept in '_best_sell'.
+        self._best_sell = self._get_best_sell()
+
+
+class ReportableCommodity(ReportableItemMixin, Commodity):
+    pass
+
+
+class ReportableResource(ReportableItemMixin, Resource):
+    pass
+
+
+class ReportableDataStructure(DataStructure):
+    """
+    DataStructure of commodities or resources taking reported prices (other items are not changed).
+    """
+    item_classes = {Commodity: ReportableCommodity, Resource: ReportableResource}
+
+    def __init__(self, items_list, **kwargs):
+        super().__init__(items_list, **kwargs)
+        for item in self.values():
+            item.__class__ = self.get_item_class(type(item))
+
+    @classmethod
+    def get_item_class(cls, item_class):
+        """
+        Item class hook: DataStructure creates items of class chosen by module level 'choose_item_class',
+        which then get the class returned here. Reportable classes add only methods, so items keep their state.
+        """
+        return cls.item_classes.get(item_class, item_class)
+
+
+class PriceUpdater:
+    """
+    Applies successfully reported prices to in-memory trade and mining tables, trade routes index and
+    mining value table, so next queries see them without full data refresh. Changed parts are saved to
+    snapshot cache 'flush_delay' seconds after the first report, so a burst of reports ends up in a single
+    snapshot of changed prices. Reports are applied under the trade lock, which also guards saving the tables
+    and building the index, so they are never iterated while a report adds a price. Parts which could not be
+    saved are saved again after another 'flush_delay' seconds.
+    """
+    def __init__(self, trade, logger, flush_delay=30):
+        self.trade = trade
+        self.logger = logger
+        self.flush_delay = flush_delay
+        self.updates_count = 0
+        self.flushes_count = 0
+        self._dirty = set()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _find_price(prices, location):
+        for price in prices:
+            if price.location_id == location.id:
+                return price
+
+    def _set_price(self, item, prices, price_class, location, transaction_type, value):
+        price = self._find_price(item.get_prices(transaction_type), location)
+        created = price is None
+        if created:
+            price_id = "%s-%s-%s" % (item.id, location.id, transaction_type)
+            price = price_class({
+                'id': price_id,
+                'price_type': transaction_type,
+                'price_location': location.id,
+                'price_%s' % price_class.name_suffix: item.id,
+            }, locations=self.trade.locations)
+            prices[price_id] = price
+            item.add_price(price)
+        price['price_unit_price'] = value
+        price['price_date'] = date.today().isoformat()
+        item.update_best_sell()
+        self.updates_count += 1
+        return price, created
+
+    def apply_trade_report(self, commodity_name, value, transaction_type, location_name):
+        commodity = self.trade.commodities.match_one(commodity_name)
+        location = self.trade.locations.match_one(location_name)
+        if commodity and location and transaction_type in ('buy', 'sell'):
+            with self.trade.lock:
+                price, created = self._set_price(commodity, self.trade.commodity_prices, CommodityPrice,
+                                                 location, transaction_type, value)
+                if created:
+                    self.trade.invalidate()
+                else:
+                    self.trade.update_price(price)
+            self._schedule_flush('trade')
+
+    def apply_mining_report(self, resource_name, unit_price, location_name):
+        resource = self.trade.resources.match_one(resource_name)
+        location = self.trade.locations.match_one(location_name)
+        if resource and location:
+            with self.trade.lock:
+                price, created = self._set_price(resource, self.trade.resource_prices, ResourcePrice, location,
+                                                 'sell', unit_price)
+                if created:
+                    self.trade.invalidate_mining_table()
+                else:
+                    self.trade.update_resource_price(price)
+            self._schedule_flush('mining')
+
+    def _schedule_flush(self, part):
+        with self._lock:
+            self._dirty.add(part)
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty, self._dirty = self._dirty, set()
+        if not dirty or self.trade.snapshot_store is None:
+            return
+        saved = []
+        for part in sorted(dirty):
+            try:
+                if self.trade.save_snapshot(part):
+                    saved.append(part)
+                    continue
+                self.logger.error("Could not save '%s' prices cache, will retry." % part)
+            except Exception as unexpected_exception:
+                self.logger.error("Could not save '%s' prices cache, will retry: %s" %
+                                  (part, str(unexpected_exception)))
+            self._schedule_flush(part)
+        if saved:
+            self.flushes_count += 1
+            self.logger.debug("Saved reported prices to %s cache." % ", ".join(saved))
+
+    def get_stats(self):
+        return {
+            'updates': self.updates_count,
+            'flushes': self.flushes_count,
+            'pending': sorted(self._dirty),
+        }
@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    LRU cache of rendered replies. Whole cache is dropped when data version given with a query changes.
+    """
+    def __init__(self, max_entries=256, max_characters=500000):
+        self.max_entries = max_entries
+        self.max_characters = max_characters
+        self.hits = 0
+        self.misses = 0
+        self.characters = 0
+        self._version = None
+        self._replies = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query):
+        return " ".join(query.lower().split())
+
+    @classmethod
+    def normalize_list_query(cls, query):
+        return ",".join(cls.normalize_query(item) for item in query.split(",") if item.strip())
+
+    def _clear(self):
+        self._replies.clear()
+        self.characters = 0
+
+    def get(self, kind, query, version):
+        with self._lock:
+            if version != self._version:
+                self._clear()
+                self._version = version
+            messages = self._replies.get((kind, query))
+            if messages is None:
+                self.misses += 1
+            else:
+                self._replies.move_to_end((kind, query))
+                self.hits += 1
+            return messages
+
+    def set(self, kind, query, messages):
+        size = sum(len(message) for message in messages)
+        if size > self.max_characters:
+            return
+        with self._lock:
+            old_messages = self._replies.pop((kind, query), None)
+            if old_messages is not None:
+                self.characters -= sum(len(message) for message in old_messages)
+            self._replies[(kind, query)] = messages
+            self.characters += size
+            while len(self._replies) > self.max_entries or self.characters > self.max_characters:
+                _, removed_messages = self._replies.popitem(last=False)
+                self.characters -= sum(len(message) for message in removed_messages)
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    @property
+    def hit_ratio(self):
+        requests_count = self.hits + self.misses
+        return self.hits / requests_count if requests_count else 0.0
+
+    def get_stats(self):
+        return {
+            'entries': len(self._replies),
+            'characters': self.characters,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hit_ratio, 3),
+        }
@@ -0,0 +1,135 @@
+import re
+import threading
+import weakref
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+class RoadMapIndex:
+    """
+    Inverted index of road map cards. Tokens of card names, descriptions, release and category names
+    point to card numbers. Query words are matched exactly, as token prefixes or with one typo
+    (deletion neighbourhoods of tokens). Cards are also grouped per release and per category.
+    """
+    token_pattern = re.compile(r"[\w.]*\w")
+    fuzzy_min_length = 4
+
+    def __init__(self, road_map):
+        self.releases = road_map.releases
+        self.categories = road_map.categories
+        self.cards = []
+        self.postings = {}
+        self.by_release = OrderedDict()
+        self.by_category = OrderedDict((slug, OrderedDict()) for slug in self.categories)
+        category_slugs = {int(category['id']): slug for slug, category in self.categories.items()}
+
+        for release in self.releases:
+            release_name = release.get('name', "")
+            release_header = "%s %s" % (release_name, release.get('description', ""))
+            release_groups = self.by_release.setdefault(release_name, OrderedDict())
+            for card in release.get('cards', []):
+                slug = category_slugs.get(int(card['category_id']))
+                category_name = self.categories[slug]['name'] if slug else None
+                number = len(self.cards)
+                self.cards.append({
+                    'release_header': release_header,
+                    'category_name': category_name,
+                    'row': [road_map.split_long_string_to_lines(card['name']),
+                            road_map.split_long_string_to_lines(card['description'], 40),
+                            road_map._get_task_status(card)],
+                })
+                release_groups.setdefault(category_name, []).append(number)
+                if slug:
+                    self.by_category[slug].setdefault(release_header, []).append(number)
+                text = " ".join((card['name'], card['description'], release_header, category_name or ""))
+                for token in self.tokenize(text):
+                    self.postings.setdefault(token, set()).add(number)
+
+        self.tokens = sorted(self.postings)
+        self.deletions = {}
+        for token in self.tokens:
+            if len(token) >= self.fuzzy_min_length:
+                for variant in self.get_deletions(token):
+                    self.deletions.setdefault(variant, set()).add(token)
+
+    @classmethod
+    def tokenize(cls, text):
+        return cls.token_pattern.findall(text.lower())
+
+    @staticmethod
+    def get_deletions(word):
+        return set(word[:position] + word[position + 1:] for position in range(len(word)))
+
+    def _match_word(self, word):
+        tokens = set()
+        position = bisect_left(self.tokens, word)
+        while position < len(self.tokens) and self.tokens[position].startswith(word):
+            tokens.add(self.tokens[position])
+            position += 1
+        if not tokens and len(word) >= self.fuzzy_min_length:
+            for variant in self.get_deletions(word) | {word}:
+                tokens |= self.deletions.get(variant, set())
+                if variant in self.postings:
+                    tokens.add(variant)
+        if len(tokens) == 1:
+            return self.postings[tokens.pop()]
+        return set(number for token in tokens for number in self.postings[token])
+
+    def find(self, expression):
+        """
+        Returns numbers of cards matching all words of given expression.
+        """
+        found = None
+        for word in self.tokenize(expression):
+            matched = self._match_word(word)
+            found = matched if found is None else found & matched
+            if not found:
+                break
+        return found or set()
+
+    def _get_rows(self, groups, found=None):
+        result = OrderedDict()
+        for header, numbers in groups.items():
+            rows = [self.cards[number]['row'] for number in numbers if found is None or number in found]
+            if rows:
+                result[header] = rows
+        return result
+
+    def get_release_details(self, name, found=None):
+        groups = self.by_release.get(name)
+        if groups is not None:
+            return self._get_rows(groups, found)
+
+    def get_category_details(self, slug, found=None):
+        groups = self.by_category.get(slug)
+        if groups is not None:
+            return self._get_rows(groups, found)
+
+    def get_release_category_details(self, release_name, category_slug):
+        groups = self.by_release.get(release_name)
+        category = self.categories.get(category_slug)
+        if groups is not None and category is not None and groups.get(category['name']):
+            return self._get_rows({"%s %s" % (release_name, category['name']): groups[category['name']]})
+
+    def get_found_details(self, found):
+        result = OrderedDict()
+        for number in sorted(found):
+            card = self.cards[number]
+            header = " | ".join((card['release_header'], str(card['category_name'])))
+            result.setdefault(header, []).append(card['row'])
+        return result
+
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_road_map_index(road_map):
+    """
+    Returns index of given road map, rebuilt whenever road map data was reloaded.
+    """
+    with _indexes_lock:
+        index = _indexes.get(road_map)
+        if index is None or index.releases is not road_map.releases or index.categories is not road_map.categories:
+            index = _indexes[road_map] = RoadMapIndex(road_map)
+        return index
@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemberRolesCache:
+    def __init__(self, ttl=600, max_size=1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._members = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._members.get(user_id)
+            if item is not None:
+                roles, expires = item
+                if expires > time.monotonic():
+                    self._members.move_to_end(user_id)
+                    self.hits += 1
+                    return roles
+                del self._members[user_id]
+            self.misses += 1
+
+    def set(self, user_id, roles):
+        with self._lock:
+            self._members[user_id] = (list(roles), time.monotonic() + self.ttl)
+            self._members.move_to_end(user_id)
+            while len(self._members) > self.max_size:
+                self._members.popitem(last=False)
+
+    def remove(self, user_id):
+        with self._lock:
+            self._members.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._members.clear()
+
+    @property
+    def hit_ratio(self):
+        requests_count = self.hits + self.misses
+        return self.hits / requests_count if requests_count else 0.0
+
+    def get_stats(self):
+        return {
+            'size': len(self._members),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hit_ratio, 3),
+        }
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+
+import numpy as np
+
+
+MAGIC = b"ASTROSHP"
+PREFIX = struct.Struct("<8sQ")
+ALIGNMENT = 64
+
+
+def get_name_hash(name):
+    return zlib.crc32(name.encode())
+
+
+class ShipMatrixSnapshot(Mapping):
+    """
+    Read-only columnar view of ship matrix mapped from snapshot file. Arrays point directly into the mapped
+    file, so all processes mapping the same snapshot share one copy in page cache. Ship names are found
+    with an open addressing hash table stored in the file, searched columns are kept as lowercase fixed
+    width strings and numeric columns as float arrays (NaN if unknown).
+    It is also a mapping of lowercase ship names to ships data (decoded from the file on each access).
+    """
+    numeric_keys = ('length', 'beam', 'height', 'mass', 'cargocapacity', 'min_crew', 'max_crew', 'scm_speed',
+                    'afterburner_speed', 'price')
+    search_keys = ('name', 'manufacturer', 'manufacturer_code')
+
+    def __init__(self, path):
+        with open(path, "rb") as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        magic, header_length = PREFIX.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError("%s is not a ship matrix snapshot." % path)
+        header = json.loads(self._mmap[PREFIX.size:PREFIX.size + header_length].decode())
+        self.content_hash = header['content_hash']
+        self.rows = header['rows']
+        self.arrays = {
+            name: np.frombuffer(self._mmap, dtype=array['dtype'], count=array['count'], offset=array['offset'])
+            for name, array in header['arrays'].items()
+        }
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        return (str(name) for name in self.arrays['search_name'])
+
+    def __getitem__(self, name):
+        row = self.find_row(name)
+        if row is None:
+            raise KeyError(name)
+        return self.get_ship(row)
+
+    def find_row(self, name):
+        name = name.lower()
+        hashes, table_rows = self.arrays['index_hashes'], self.arrays['index_rows']
+        mask = len(hashes) - 1
+        name_hash = get_name_hash(name)
+        position = name_hash & mask
+        while table_rows[position] >= 0:
+            row = table_rows[position]
+            if hashes[position] == name_hash and self.arrays['search_name'][row] == name:
+                return int(row)
+            position = (position + 1) & mask
+
+    def get_ship(self, row):
+        offsets = self.arrays['ship_offsets']
+        return json.loads(self.arrays['ships'][offsets[row]:offsets[row + 1]].tobytes().decode())
+
+    def get_ships(self, rows):
+        return [self.get_ship(row) for row in rows]
+
+    def get_column(self, key):
+        return self.arrays['numeric_' + key]
+
+    def find_rows(self, query):
+        """
+        Returns rows with given query in ship name, manufacturer or manufacturer code, in matrix order.
+        """
+        query = query.lower()
+        found = np.zeros(self.rows, dtype=bool)
+        for key in self.search_keys:
+            found |= np.char.find(self.arrays['search_' + key], query) >= 0
+        return np.flatnonzero(found)
+
+    def sort_rows_by_price(self, rows, unknown_price=999999.0):
+        prices = self.get_column('price')[rows]
+        prices = np.where(np.isnan(prices), unknown_price, prices)
+        return rows[np.argsort(prices, kind='mergesort')]
+
+    def close(self):
+        self.arrays = {}
+        self._mmap.close()
+
+
+class ShipMatrixStore:
+    """
+    Ship matrix snapshots shared by bot processes. 'publish' writes snapshot of changed ships data to a new
+    file named after its content hash, and then replaces small pointer file 'path' naming the current one.
+    Snapshot files are never replaced while other processes may map them (which fails on Windows), and
+    only the current and the previous one are kept. 'snapshot' maps the file named by pointer file and
+    maps it again after another process published a new one, checking at most every 'check_interval' seconds.
+    """
+    replace_retries = 5
+    replace_retry_delay = 0.1
+
+    def __init__(self, path, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._pointer_id = None
+        self._checked = 0
+        self._lock = threading.Lock()
+        self._data_name = re.compile(re.escape(os.path.basename(path)) + r"\.[0-9a-f]{16}$")
+
+    @staticmethod
+    def get_content_hash(ships):
+        return hashlib.sha1(json.dumps(ships, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def get_number(value):
+        try:
+            return float(str(value).replace("$", "").replace(",", ""))
+        except ValueError:
+            return np.nan
+
+    @staticmethod
+    def get_search_array(values):
+        values = [str(value or "").lower() for value in values]
+        return np.array(values, dtype="<U%d" % max([len(value) for value in values] + [1]))
+
+    @staticmethod
+    def get_index_arrays(names):
+        size = 1
+        while size < 2 * max(len(names), 1):
+            size *= 2
+        hashes = np.zeros(size, dtype="<u4")
+        rows = np.full(size, -1, dtype="<i4")
+        for row, name in enumerate(names):
+            name_hash = get_name_hash(name)
+            position = name_hash & (size - 1)
+            while rows[position] >= 0:
+                position = (position + 1) & (size - 1)
+            hashes[position], rows[position] = name_hash, row
+        return hashes, rows
+
+    def get_arrays(self, ships):
+        names = list(ships)
+        ship_dicts = [ships[name] for name in names]
+        encoded = [json.dumps(ship).encode() for ship in ship_dicts]
+        arrays = {
+            'ships': np.frombuffer(b"".join(encoded), dtype="u1"),
+            'ship_offsets': np.cumsum([0] + [len(ship) for ship in encoded], dtype="<i8"),
+        }
+        arrays['index_hashes'], arrays['index_rows'] = self.get_index_arrays(names)
+        arrays['search_name'] = self.get_search_array(names)
+        for key in ShipMatrixSnapshot.search_keys[1:]:
+            arrays['search_' + key] = self.get_search_array([ship.get(key) for ship in ship_dicts])
+        for key in ShipMatrixSnapshot.numeric_keys:
+            arrays['numeric_' + key] = np.array([self.get_number(ship.get(key)) for ship in ship_dicts],
+                                                dtype="<f8")
+        return arrays
+
+    def get_data_path(self, content_hash):
+        return "%s.%s" % (self.path, content_hash[:16])
+
+    def _read_pointer(self):
+        try:
+            with open(self.path, "rb") as pointer_file:
+                name = pointer_file.read(256).decode().strip()
+        except (OSError, ValueError):
+            return None
+        if self._data_name.match(name):
+            return os.path.join(os.path.dirname(self.path), name)
+
+    def _replace(self, temporary_path, path):
+        """
+        Renames temporary file to 'path'. Replacing a file fails on Windows while another process reads it,
+        so it is retried a few times.
+        """
+        try:
+            for attempt in range(self.replace_retries):
+                try:
+                    os.replace(temporary_path, path)
+                    return
+                except PermissionError:
+                    if attempt + 1 == self.replace_retries:
+                        raise
+                    time.sleep(self.replace_retry_delay)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _write_data(self, ships, content_hash, path):
+        arrays = self.get_arrays(ships)
+        header = {'content_hash': content_hash, 'rows': len(ships), 'arrays': {}}
+        offset = 0
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'count': len(array), 'offset': offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        header_bytes = json.dumps(header).encode()
+        data_offset = -(-(PREFIX.size + len(header_bytes) + 1024) // ALIGNMENT) * ALIGNMENT
+        for array in header['arrays'].values():
+            array['offset'] += data_offset
+        header_bytes = json.dumps(header).encode()
+
+        temporary_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(PREFIX.pack(MAGIC, len(header_bytes)) + header_bytes)
+            for name, array in arrays.items():
+                snapshot_file.seek(header['arrays'][name]['offset'])
+                snapshot_file.write(array.tobytes())
+            snapshot_file.truncate(data_offset + offset)
+        self._replace(temporary_path, path)
+
+    def _remove_old_files(self, keep):
+        directory = os.path.dirname(self.path) or "."
+        for name in os.listdir(directory):
+            if self._data_name.match(name) and os.path.join(os.path.dirname(self.path), name) not in keep:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass  # still open by another process on Windows, removed after next publish
+
+    def _write(self, ships, content_hash):
+        previous_path = self._read_pointer()
+        path = self.get_data_path(content_hash)
+        if not os.path.exists(path):
+            self._write_data(ships, content_hash, path)
+        temporary_path = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(temporary_path, "wb") as pointer_file:
+            pointer_file.write(os.path.basename(path).encode())
+        self._replace(temporary_path, self.path)
+        self._remove_old_files({path, previous_path})
+
+    def publish(self, ships):
+        """
+        Writes snapshot of given ships dict, unless it is already published. Returns its content hash.
+        """
+        content_hash = self.get_content_hash(ships)
+        with self._lock:
+            current = self._get_snapshot()
+            if current is None or current.content_hash != content_hash:
+                self._write(ships, content_hash)
+                self._checked = 0
+        return content_hash
+
+    def _get_snapshot(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._snapshot = self._pointer_id = None
+                return None
+            pointer_id = (stat.st_ino, stat.st_mtime, stat.st_size)
+            if pointer_id != self._pointer_id:
+                path = self._read_pointer()
+                if path is None:
+                    self._snapshot = None
+                elif self._snapshot is None or self._snapshot.path != path:
+                    try:
+                        self._snapshot = ShipMatrixSnapshot(path)
+                    except FileNotFoundError:
+                        return self._snapshot  # already replaced by a newer one, mapped on next check
+                self._pointer_id = pointer_id
+        return self._snapshot
+
+    @property
+    def snapshot(self):
+        with self._lock:
+            return self._get_snapshot()
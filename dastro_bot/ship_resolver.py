@@ -0,0 +1,100 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+
+
+class ShipResolver:
+    """
+    Resolves free text ship names to ship matrix keys (lowercase ship names). Names are compared after
+    normalization, with optional manufacturer name or code prefix and through configured aliases. Queries
+    matching nothing fall back to trigram similarity. Results of seen queries are memoized, so resolver
+    is built again for every ship matrix version.
+    """
+    separators = re.compile(r"[^\w.]+")
+    fuzzy_threshold = 0.5
+    fuzzy_candidates = 5
+
+    def __init__(self, ships, aliases=None, memo_size=4096):
+        """
+        'ships' are (key, manufacturer, manufacturer code) tuples, 'aliases' map alternative names to ship names.
+        """
+        self.memo_size = memo_size
+        self.names = {}
+        self.trigrams = {}
+        self.trigrams_counts = {}
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        for key, manufacturer, manufacturer_code in ships:
+            name = self.normalize(key)
+            self.names.setdefault(name, key)
+            for prefix in (manufacturer, manufacturer_code):
+                if prefix:
+                    self.names.setdefault(self.normalize("%s %s" % (prefix, key)), key)
+            ship_trigrams = self.get_trigrams(name)
+            self.trigrams_counts[key] = len(ship_trigrams)
+            for trigram in ship_trigrams:
+                self.trigrams.setdefault(trigram, []).append(key)
+        for alias, ship_name in (aliases or {}).items():
+            key = self.names.get(self.normalize(ship_name))
+            if key is not None:
+                self.names.setdefault(self.normalize(alias), key)
+
+    @classmethod
+    def normalize(cls, name):
+        return " ".join(cls.separators.sub(" ", name.lower()).split())
+
+    @staticmethod
+    def get_trigrams(name):
+        padded = "  %s " % name
+        return set(padded[position:position + 3] for position in range(len(padded) - 2))
+
+    def _remember(self, query, result):
+        with self._lock:
+            self._memo[query] = result
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return result
+
+    def _recall(self, query):
+        with self._lock:
+            result = self._memo.get(query)
+            if result is not None:
+                self._memo.move_to_end(query)
+            return result
+
+    def find_exact(self, name):
+        """
+        Returns key of ship with given name (after normalization, manufacturer prefix or alias) or None.
+        """
+        return self.names.get(self.normalize(name))
+
+    def find_similar(self, name):
+        """
+        Returns keys of ships with trigram similarity above threshold, most similar first. When one ship
+        is clearly the most similar, only its key is returned.
+        """
+        query_trigrams = self.get_trigrams(name)
+        common = Counter(key for trigram in query_trigrams for key in self.trigrams.get(trigram, ()))
+        scores = sorted(
+            ((count / (len(query_trigrams) + self.trigrams_counts[key] - count), key) for key, count in common.items()),
+            key=lambda item: -item[0])
+        candidates = [(score, key) for score, key in scores[:self.fuzzy_candidates] if score >= self.fuzzy_threshold]
+        if len(candidates) > 1 and candidates[0][0] > candidates[1][0]:
+            candidates = candidates[:1]
+        return [key for score, key in candidates]
+
+    def resolve(self, query, search):
+        """
+        Returns list of keys of ships matching the query: exact match, otherwise keys found by 'search'
+        function (substring search of the parser), otherwise similar ships.
+        """
+        name = self.normalize(query)
+        result = self._recall(name)
+        if result is None:
+            key = self.names.get(name)
+            if key is not None:
+                result = [key]
+            else:
+                result = search(query) or self.find_similar(name)
+            self._remember(name, tuple(result))
+        return list(result)
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import namedtuple
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+
+class SnapshotDiff(namedtuple('SnapshotDiff', ['version', 'added', 'changed', 'removed'])):
+    __slots__ = ()
+
+    @property
+    def empty(self):
+        return not (self.added or self.changed or self.removed)
+
+
+class SnapshotGapError(ValueError):
+    pass
+
+
+SnapshotState = namedtuple('SnapshotState', ['number', 'full_number', 'version', 'hashes'])
+
+EMPTY_STATE = SnapshotState(-1, -1, None, {})
+
+
+def get_record_hash(record):
+    return hashlib.sha1(json.dumps(record, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def get_version(hashes):
+    return hashlib.sha1("".join("%s:%s\n" % item for item in sorted(hashes.items())).encode()).hexdigest()
+
+
+def encode_entry(entry):
+    return zlib.compress(json.dumps(entry, separators=(",", ":")).encode())
+
+
+def decode_entry(data):
+    return json.loads(zlib.decompress(data).decode())
+
+
+class FileSnapshotBackend:
+    """
+    Keeps snapshot entries of each source as numbered files in its own directory. Entry files are
+    created exclusively, so processes sharing the directory can not write the same entry number twice.
+    """
+    full_flag = b"F"
+    delta_flag = b"D"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _get_directory(self, source):
+        return os.path.join(self.directory, source)
+
+    def _get_path(self, source, number):
+        return os.path.join(self._get_directory(source), "%010d.snapshot" % number)
+
+    def _get_numbers(self, source):
+        try:
+            names = os.listdir(self._get_directory(source))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name.split(".")[0]) for name in names if name.endswith(".snapshot"))
+
+    def _read(self, source, number):
+        with open(self._get_path(source, number), "rb") as entry_file:
+            data = entry_file.read()
+        return data[:1] == self.full_flag, data[1:]
+
+    def put(self, source, number, full, data):
+        os.makedirs(self._get_directory(source), exist_ok=True)
+        path = self._get_path(source, number)
+        temporary_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary_path, "wb") as entry_file:
+            entry_file.write((self.full_flag if full else self.delta_flag) + data)
+        try:
+            os.link(temporary_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(temporary_path)
+
+    def iterate(self, source, start=0):
+        for number in self._get_numbers(source):
+            if number >= start:
+                full, data = self._read(source, number)
+                yield number, full, data
+
+    def get_latest_full(self, source):
+        for number in reversed(self._get_numbers(source)):
+            if self._read(source, number)[0]:
+                return number
+
+    def delete_before(self, source, number):
+        for old_number in self._get_numbers(source):
+            if old_number < number:
+                os.remove(self._get_path(source, old_number))
+
+
+class MongoSnapshotBackend:
+    """
+    Keeps snapshot entries of all sources in one MongoDB collection with unique (source, number) index.
+    """
+    def __init__(self, database, collection_name="snapshots"):
+        self.collection = database[collection_name]
+        self._indexed = False
+
+    def put(self, source, number, full, data):
+        if not self._indexed:
+            self.collection.create_index([('source', 1), ('number', 1)], unique=True)
+            self._indexed = True
+        try:
+            self.collection.insert_one({'source': source, 'number': number, 'full': full, 'data': data})
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def iterate(self, source, start=0):
+        for document in self.collection.find({'source': source, 'number': {'$gte': start}}).sort('number', 1):
+            yield document['number'], document['full'], document['data']
+
+    def get_latest_full(self, source):
+        document = self.collection.find_one({'source': source, 'full': True}, sort=[('number', -1)])
+        if document is not None:
+            return document['number']
+
+    def delete_before(self, source, number):
+        self.collection.delete_many({'source': source, 'number': {'$lt': number}})
+
+
+class SnapshotStore:
+    """
+    Versioned snapshots of data sources, each a dict of JSON records keyed by record key. Saving a snapshot
+    writes only records whose content hash changed since the previous one (and keys of removed records) as
+    a zlib compressed entry. Every 'checkpoint_interval' entries a full snapshot is written and older entries
+    are dropped, so the latest snapshot is rebuilt from one full entry and a few deltas. Only content hashes
+    of the latest snapshots are kept in memory. Entries written by other processes are picked up on next
+    save or load.
+    """
+    errors = (OSError, ValueError, PyMongoError)
+
+    def __init__(self, backend, logger, checkpoint_interval=50, retries=3):
+        self.backend = backend
+        self.logger = logger
+        self.checkpoint_interval = checkpoint_interval
+        self.retries = retries
+        self._states = {}
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _apply_entry(hashes, records, entry):
+        for key in entry['removed']:
+            hashes.pop(key, None)
+            if records is not None:
+                records.pop(key, None)
+        for key, (record_hash, record) in entry['records'].items():
+            hashes[key] = record_hash
+            if records is not None:
+                records[key] = record
+
+    def _read_entries(self, source, state, records=None):
+        if state.number < 0:
+            start = self.backend.get_latest_full(source)
+            if start is None:
+                return EMPTY_STATE
+        else:
+            start = state.number + 1
+        number, full_number, hashes = state.number, state.full_number, dict(state.hashes)
+        for entry_number, full, data in self.backend.iterate(source, start):
+            if entry_number != number + 1 and not full:
+                raise SnapshotGapError("Entry %d of '%s' snapshot is missing." % (number + 1, source))
+            if full:
+                full_number = entry_number
+                hashes = {}
+                if records is not None:
+                    records.clear()
+            number = entry_number
+            self._apply_entry(hashes, records, decode_entry(data))
+        if number == state.number:
+            return state
+        return SnapshotState(number, full_number, get_version(hashes), hashes)
+
+    def _read(self, source, state, records=None):
+        """
+        Returns state of the latest snapshot, reading only entries newer than given state when possible.
+        Records of read entries are applied to 'records' dict (if given). When entries following given state
+        were already dropped, snapshot is read once more from the latest full entry. SnapshotGapError is
+        raised if an entry is missing after it as well.
+        """
+        if records is None and state.number >= 0:
+            try:
+                return self._read_entries(source, state)
+            except SnapshotGapError:
+                pass
+        return self._read_entries(source, EMPTY_STATE, records)
+
+    def _get_state(self, source):
+        return self._states.get(source, EMPTY_STATE)
+
+    @staticmethod
+    def get_diff(old_hashes, new_hashes, version):
+        return SnapshotDiff(
+            version,
+            sorted(key for key in new_hashes if key not in old_hashes),
+            sorted(key for key, record_hash in new_hashes.items()
+                   if key in old_hashes and old_hashes[key] != record_hash),
+            sorted(key for key in old_hashes if key not in new_hashes),
+        )
+
+    def _write(self, source, state, hashes, records, diff):
+        number = state.number + 1
+        full = state.full_number < 0 or number - state.full_number >= self.checkpoint_interval
+        written = records.keys() if full else diff.added + diff.changed
+        data = encode_entry({
+            'version': diff.version,
+            'records': {key: (hashes[key], records[key]) for key in written},
+            'removed': [] if full else diff.removed,
+        })
+        if not self.backend.put(source, number, full, data):
+            return False
+        if full:
+            self.backend.delete_before(source, number)
+        self._states[source] = SnapshotState(number, number if full else state.full_number, diff.version, hashes)
+        stats = self._stats.setdefault(source, {'entries': 0, 'records_written': 0, 'bytes_written': 0})
+        stats['entries'] += 1
+        stats['records_written'] += len(written)
+        stats['bytes_written'] += len(data)
+        return True
+
+    def save(self, source, records):
+        """
+        Saves snapshot of given records and returns SnapshotDiff against the previous snapshot (None when
+        snapshot could not be saved). Nothing is written when no record changed.
+        """
+        hashes = {str(key): get_record_hash(record) for key, record in records.items()}
+        records = {str(key): record for key, record in records.items()}
+        version = get_version(hashes)
+        with self._lock:
+            try:
+                for _ in range(self.retries):
+                    state = self._read(source, self._get_state(source))
+                    self._states[source] = state
+                    diff = self.get_diff(state.hashes, hashes, version)
+                    if diff.empty or self._write(source, state, hashes, records, diff):
+                        return diff
+                self.logger.error("Could not save '%s' snapshot: entry number is taken." % source)
+            except self.errors as unexpected_exception:
+                self.logger.error("Could not save '%s' snapshot: %s" % (source, str(unexpected_exception)))
+
+    def load(self, source):
+        """
+        Returns records of the latest snapshot of given source, None if there is no snapshot.
+        """
+        records = {}
+        with self._lock:
+            try:
+                state = self._read(source, self._get_state(source), records)
+            except self.errors as unexpected_exception:
+                self.logger.error("Could not load '%s' snapshot: %s" % (source, str(unexpected_exception)))
+                return None
+            self._states[source] = state
+        if state.number >= 0:
+            return records
+
+    def get_version(self, source):
+        return self._get_state(source).version
+
+    def get_record_hash(self, source, key):
+        """
+        Returns content hash of given record in the last saved or loaded snapshot of given source.
+        """
+        return self._get_state(source).hashes.get(key)
+
+    def get_latest_version(self, source):
+        """
+        Returns version of the latest snapshot of given source (None if there is none), reading only entries
+        written since the last save or load, e.g. to tell if snapshot saved by another process changed.
+        """
+        with self._lock:
+            try:
+                self._states[source] = self._read(source, self._get_state(source))
+            except self.errors as unexpected_exception:
+                self.logger.error("Could not read '%s' snapshot: %s" % (source, str(unexpected_exception)))
+            return self.get_version(source)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                source: dict(self._stats.get(source, {}), version_number=state.number,
+                             records=len(state.hashes))
+                for source, state in self._states.items()
+            }
@@ -0,0 +1,202 @@
+import threading
+from functools import wraps
+
+import numpy as np
+
+from .mining_tables import MiningValueTable
+
+
+class TradeRoutesIndex:
+    """
+    Every possible (buy price, sell price) pair of each commodity kept in flat numpy arrays, ordered
+    the same way TradeAssistant iterates them, so equal incomes are ordered like in the original
+    search. Queries only mask and rank those arrays.
+    """
+    def __init__(self, commodities):
+        self.commodities = [commodity for commodity in commodities.values()]
+        self.prices = []
+        self.locations = []
+        self._price_indexes = {}
+        location_indexes = {}
+        pairs = []
+        for commodity_index, commodity in enumerate(self.commodities):
+            buy_prices = [self._add_price(price, location_indexes) for price in commodity.buy_prices
+                          if price.location]
+            sell_prices = [self._add_price(price, location_indexes) for price in commodity.sell_prices
+                           if price.location]
+            pairs += [(commodity_index, buy, sell) for buy in buy_prices for sell in sell_prices]
+
+        self.location_strings = [location.full_string.lower() for location in self.locations]
+        self.short_strings = [location.short_string for location in self.locations]
+        self.legal = np.array([bool(commodity.legal) for commodity in self.commodities], dtype=bool)
+        self.values = np.array([price.value for price in self.prices], dtype=float)
+        self.price_locations = np.array([location_indexes[price.location_id] for price in self.prices], dtype=int)
+
+        pairs = np.array(pairs, dtype=int).reshape(-1, 3)
+        self.pair_commodities, self.pair_buys, self.pair_sells = pairs[:, 0], pairs[:, 1], pairs[:, 2]
+
+    def _add_price(self, price, location_indexes):
+        if price.location_id not in location_indexes:
+            location_indexes[price.location_id] = len(self.locations)
+            self.locations.append(price.location)
+        self._price_indexes[id(price)] = len(self.prices)
+        self.prices.append(price)
+        return len(self.prices) - 1
+
+    def update_price(self, price):
+        price_index = self._price_indexes.get(id(price))
+        if price_index is None:
+            return False
+        self.values[price_index] = price.value
+        return True
+
+    def _get_locations_mask(self, query, avoid):
+        mask = np.array([all(item.lower() not in location for item in avoid) for location in self.location_strings],
+                        dtype=bool)
+        if query:
+            mask &= np.array([query.lower() in location for location in self.location_strings], dtype=bool)
+        return mask[self.price_locations]
+
+    def _get_commodity_routes(self, pairs, units, spent, income, max_routes):
+        routes = []
+        routes_by_prices = {}
+        for pair in pairs[np.argsort(-income[pairs], kind='mergesort')]:
+            buy, sell = self.pair_buys[pair], self.pair_sells[pair]
+            buy_location = self.short_strings[self.price_locations[buy]]
+            sell_location = self.short_strings[self.price_locations[sell]]
+            route = routes_by_prices.get((self.values[buy], self.values[sell]))
+            if route is not None:
+                if buy_location not in route['buy locations']:
+                    route['buy locations'] += "\n%s" % buy_location
+                if sell_location not in route['sell locations']:
+                    route['sell locations'] += "\n%s" % sell_location
+            elif len(routes) < max_routes:
+                route = {
+                    'invested money': spent[pair].item(),
+                    'income': income[pair].item(),
+                    'bought units': int(units[pair]),
+                    'buy price': self.prices[buy].value,
+                    'buy locations': buy_location,
+                    'sell price': self.prices[sell].value,
+                    'sell locations': sell_location
+                }
+                routes_by_prices[(self.values[buy], self.values[sell])] = route
+                routes.append(route)
+            elif income[pair] < routes[-1]['income']:
+                break
+        return routes
+
+    def get_trade_routes(self, cargo=576, money=50000, start_location=None, end_location=None, avoid=(),
+                         allow_illegal=True, max_commodities=3, max_routes=3):
+        valid = self._get_locations_mask(start_location, avoid)[self.pair_buys]
+        valid &= self._get_locations_mask(end_location, avoid)[self.pair_sells]
+        if not allow_illegal:
+            valid &= self.legal[self.pair_commodities]
+        if not valid.any():
+            return []
+
+        buy_values = self.values[self.pair_buys]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            units = np.full(buy_values.shape, float(cargo * 100))
+            spent = units * buy_values
+            over_budget = spent > money
+            units[over_budget] = np.floor(money / buy_values[over_budget])
+            spent[over_budget] = money
+            income = np.round(self.values[self.pair_sells] * units - spent, 2)
+
+        valid_pairs = np.nonzero(valid)[0]
+        best_income = np.zeros(len(self.commodities))
+        np.maximum.at(best_income, self.pair_commodities[valid_pairs], income[valid_pairs])
+        candidates = list(np.unique(self.pair_commodities[valid_pairs]))
+        candidates.sort(key=lambda index: best_income[index], reverse=True)
+
+        result = []
+        for commodity_index in candidates[:max_commodities]:
+            pairs = valid_pairs[self.pair_commodities[valid_pairs] == commodity_index]
+            routes = self._get_commodity_routes(pairs, units, spent, income, max_routes)
+            table = [[key] + [route[key] for route in routes] for key in routes[0].keys()]
+            result.append((self.commodities[commodity_index].name, table))
+        return result
+
+
+def built_property(build):
+    """
+    Property built from trade assistant data. AttributeError raised while building it is re-raised as
+    RuntimeError, otherwise it would end in '__getattr__' of the proxy and be reported as a missing attribute.
+    """
+    @wraps(build)
+    def get(self):
+        try:
+            return build(self)
+        except AttributeError as error:
+            raise RuntimeError("Could not build %s: %s" % (build.__name__, str(error))) from error
+    return property(get)
+
+
+class IndexedTradeAssistant:
+    """
+    Proxy of TradeAssistant answering trade routes queries from TradeRoutesIndex and mining queries from
+    MiningValueTable. Both are rebuilt when their data is reloaded (prices structure is replaced) or
+    explicitly invalidated. Data is not reloaded at all when cached data clients report no changes (asked only
+    when trade assistant fetches sources). Index and table are built under 'lock' of trade assistant (when it
+    has one), which price reports hold while they change prices. Tables are loaded before taking the lock, as
+    loading a part saves it under the same lock.
+    """
+    def __init__(self, trade_assistant, cargo_sizes=()):
+        self.trade_assistant = trade_assistant
+        self.cargo_sizes = cargo_sizes
+        self._index = None
+        self._index_source = None
+        self._mining_table = None
+        self._mining_table_source = None
+        self.lock = getattr(trade_assistant, 'lock', None) or threading.RLock()
+
+    def __getattr__(self, name):
+        return getattr(self.trade_assistant, name)
+
+    @built_property
+    def routes_index(self):
+        prices, commodities = self.trade_assistant.commodity_prices, self.trade_assistant.commodities
+        with self.lock:
+            if self._index is None or self._index_source is not prices:
+                self._index = TradeRoutesIndex(commodities or {})
+                self._index_source = prices
+            return self._index
+
+    @built_property
+    def mining_table(self):
+        prices, resources = self.trade_assistant.resource_prices, self.trade_assistant.resources
+        with self.lock:
+            if self._mining_table is None or self._mining_table_source is not prices:
+                self._mining_table = MiningValueTable(resources or {}, self.cargo_sizes)
+                self._mining_table_source = prices
+            return self._mining_table
+
+    def update_data(self):
+        clients = (self.trade_assistant.trade_data_client, self.trade_assistant.mining_data_client)
+        if self.commodities and getattr(self.trade_assistant, 'fetch_sources', True) and \
+                all(hasattr(client, 'has_changes') for client in clients) and \
+                not any(client.has_changes() for client in clients):
+            return True
+        return self.trade_assistant.update_data()
+
+    def update_price(self, price):
+        with self.lock:
+            if self._index is not None and not self._index.update_price(price):
+                self._index = None
+
+    def invalidate(self):
+        with self.lock:
+            self._index = None
+
+    def update_resource_price(self, price):
+        with self.lock:
+            if self._mining_table is not None and not self._mining_table.update_price(price):
+                self._mining_table = None
+
+    def invalidate_mining_table(self):
+        with self.lock:
+            self._mining_table = None
+
+    def get_trade_routes(self, *args, **kwargs):
+        return self.routes_index.get_trade_routes(*args, **kwargs)
@@ -44,7 +44,7 @@ setup(
             'gevent>=1.3.6'
         ]
     },
-    packages=find_packages(exclude=('tests',)),
+    packages=find_packages(exclude=('tests', 'benchmarks')),
     package_data={'_default_settings': ['discord_bot.json', 'discord_bot.service']},
     include_package_data=True,
     python_requires='~=3.5',
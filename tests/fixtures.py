@@ -0,0 +1,59 @@
+import random
+
+from base_astro_bot.trade.data_structure import DataStructure
+
+
+PLANETS = ("Crusader", "Hurston", "ArcCorp", "microTech")
+MOONS = ("Yela", "Daymar", "Cellin", "Arial", "Aberdeen", "Lyria", "Wala", "Calliope")
+OUTPOSTS = ("Mining Area", "Research Outpost", "Trade Post", "Storage Facility", "Station")
+COMMODITIES = ("Medical Supplies", "Agricium", "Laranite", "Titanium", "Diamond", "Gold", "Hydrogen", "Scrap",
+               "Widow", "Astatine")
+RESOURCES = ("Quantanium", "Bexalite", "Taranite", "Borase", "Laranite", "Agricium", "Titanium", "Gold")
+
+
+def get_prices(generator, items, locations, item_type, count, price_types):
+    prices = []
+    for item in items:
+        base_price = generator.uniform(1, 60)
+        for location in generator.sample(locations, count):
+            prices.append({
+                'id': "%s-price-%d" % (item_type, len(prices)),
+                'price_type': generator.choice(price_types),
+                'price_location': location['id'],
+                'price_date': "2019-05-01",
+                'price_%s' % item_type: item['id'],
+                'price_unit_price': round(base_price * generator.uniform(0.7, 1.3), 2),
+            })
+    return prices
+
+
+def get_trade_tables(locations_count=40, seed=0):
+    """
+    Returns SCM data structures (as loaded by TradeAssistant) of generated containers, locations, commodities,
+    resources and their prices.
+    """
+    generator = random.Random(seed)
+    containers = [{'id': "system-0", 'container_name': "Stanton", 'container_parent': None}]
+    containers += [{'id': "planet-%d" % number, 'container_name': planet, 'container_parent': "system-0"}
+                   for number, planet in enumerate(PLANETS)]
+    containers += [{'id': "moon-%d" % number, 'container_name': moon,
+                    'container_parent': "planet-%d" % (number % len(PLANETS))}
+                   for number, moon in enumerate(MOONS)]
+    locations = [{'id': "location-%d" % number,
+                  'location_name': "%s %s %d" % (MOONS[number % len(MOONS)], OUTPOSTS[number % len(OUTPOSTS)], number),
+                  'location_container': "moon-%d" % (number % len(MOONS))}
+                 for number in range(locations_count)]
+    commodities = [{'id': "commodity-%d" % number, 'commodity_name': name, 'commodity_illegal': name == "Widow"}
+                   for number, name in enumerate(COMMODITIES)]
+    resources = [{'id': "resource-%d" % number, 'resource_name': name, 'resource_type': "ore"}
+                 for number, name in enumerate(RESOURCES)]
+
+    tables = {'celestial_bodies': DataStructure(containers)}
+    tables['locations'] = DataStructure(locations, parents=tables['celestial_bodies'])
+    tables['commodity_prices'] = DataStructure(get_prices(generator, commodities, locations, 'commodity', 12,
+                                                          ("buy", "sell")), locations=tables['locations'])
+    tables['commodities'] = DataStructure(commodities, prices=tables['commodity_prices'])
+    tables['resource_prices'] = DataStructure(get_prices(generator, resources, locations, 'resource', 6, ("sell",)),
+                                              locations=tables['locations'])
+    tables['resources'] = DataStructure(resources, prices=tables['resource_prices'])
+    return tables
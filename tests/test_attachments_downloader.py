@@ -0,0 +1,51 @@
+import json
+import unittest
+
+from dastro_bot.attachments_downloader import JsonListParser
+
+
+class TestJsonListParser(unittest.TestCase):
+
+    def setUp(self):
+        self.ships = [{'name': "Cutlass Black", 'manufacturer': "Drake", 'lti': True},
+                      {'name': "Gladius", 'manufacturer': "Aegis", 'package_id': 1234},
+                      {'name': "Żuk \"Śmiały\"", 'manufacturer': "Anvil"}]
+        self.content = json.dumps(self.ships, indent=2).encode()
+
+    def feed_chunks(self, parser, content, chunk_size):
+        items = []
+        for start in range(0, len(content), chunk_size):
+            items += parser.feed(content[start:start + chunk_size])
+        return items
+
+    def test_whole_list(self):
+        parser = JsonListParser()
+        self.assertEqual(parser.feed(self.content), self.ships)
+        parser.close()
+
+    def test_streamed_list(self):
+        for chunk_size in (1, 2, 3, 7, 64):
+            parser = JsonListParser()
+            self.assertEqual(self.feed_chunks(parser, self.content, chunk_size), self.ships)
+            parser.close()
+
+    def test_items_returned_before_list_ends(self):
+        parser = JsonListParser()
+        items = parser.feed(self.content[:self.content.index(b'"Gladius"')])
+        self.assertEqual(items, self.ships[:1])
+        self.assertFalse(parser.finished)
+
+    def test_empty_list(self):
+        parser = JsonListParser()
+        self.assertEqual(parser.feed(b" \n[ ]\n"), [])
+        parser.close()
+
+    def test_truncated_list(self):
+        parser = JsonListParser()
+        items = self.feed_chunks(parser, self.content[:-10], 5)
+        self.assertEqual(items, self.ships[:2])
+        self.assertRaises(ValueError, parser.close)
+
+    def test_not_a_list(self):
+        parser = JsonListParser()
+        self.assertRaises(ValueError, parser.feed, b'{"name": "Gladius"}')
@@ -0,0 +1,60 @@
+import tempfile
+import unittest
+
+from dastro_bot.cached_sources import CachedRsiDataParser
+from dastro_bot.snapshot_store import FileSnapshotBackend, SnapshotStore
+
+
+class FakeRoadMap:
+    source = 'road_map'
+
+    def __init__(self, snapshot_store):
+        self.snapshot_store = snapshot_store
+        self.current_versions = {}
+
+    def update_database(self):
+        self.snapshot_store.save(self.source, {'categories': {}, 'current_versions': self.current_versions})
+        return True
+
+
+class FakeRsiDataParser:
+    check_new_version = CachedRsiDataParser.check_new_version
+
+    def __init__(self, snapshot_store):
+        self.snapshot_store = snapshot_store
+        self.road_map = FakeRoadMap(snapshot_store)
+
+
+class TestNewVersionCheck(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.rsi_data = self.get_rsi_data()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_rsi_data(self):
+        return FakeRsiDataParser(SnapshotStore(FileSnapshotBackend(self.directory.name), None))
+
+    def test_first_versions_only_stored(self):
+        self.assertFalse(self.rsi_data.check_new_version())
+        self.rsi_data.road_map.current_versions = {'live': "3.5.0", 'ptu': "3.6.0"}
+        self.assertFalse(self.rsi_data.check_new_version())
+        self.assertFalse(self.rsi_data.check_new_version())
+
+    def test_changed_versions(self):
+        self.rsi_data.road_map.current_versions = {'live': "3.5.0", 'ptu': "3.6.0"}
+        self.rsi_data.check_new_version()
+        self.rsi_data.road_map.current_versions = {'live': "3.5.0", 'ptu': "3.6.1"}
+        self.assertTrue(self.rsi_data.check_new_version())
+        self.assertFalse(self.rsi_data.check_new_version())
+
+    def test_versions_saved_before_check(self):
+        self.rsi_data.road_map.current_versions = {'live': "3.5.0", 'ptu': "3.6.0"}
+        self.rsi_data.check_new_version()
+        other_rsi_data = self.get_rsi_data()
+        other_rsi_data.road_map.current_versions = {'live': "3.6.0", 'ptu': "3.6.0"}
+        other_rsi_data.road_map.update_database()
+        self.rsi_data.road_map.current_versions = other_rsi_data.road_map.current_versions
+        self.assertTrue(self.rsi_data.check_new_version())
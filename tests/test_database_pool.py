@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from base_astro_bot.database.database_models import Member
+
+from dastro_bot.database_pool import PooledDatabaseManager
+
+
+class TestWriteQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_manager = PooledDatabaseManager(os.path.join(self.directory.name, "fleet.sqlite"),
+                                                      os.path.join(self.directory.name, "database.log"),
+                                                      batch_delay=0.5)
+
+    def tearDown(self):
+        self.database_manager.close()
+        self.directory.cleanup()
+
+    @staticmethod
+    def add_member(discord_id, fail=False):
+        def operation(session):
+            session.add(Member(discord_id=discord_id, name="member_%d" % discord_id))
+            session.flush()
+            if fail:
+                raise ValueError("operation %d failed" % discord_id)
+            return discord_id
+        return operation
+
+    def get_member_ids(self):
+        return sorted(member.discord_id for member in self.database_manager.get_all_members())
+
+    def test_failing_operation_in_batch(self):
+        write_queue = self.database_manager.write_queue
+        futures = [write_queue.submit(self.add_member(1)), write_queue.submit(self.add_member(2, fail=True)),
+                   write_queue.submit(self.add_member(3))]
+        self.assertEqual(futures[0].result(), 1)
+        self.assertRaises(ValueError, futures[1].result)
+        self.assertEqual(futures[2].result(), 3)
+        self.assertEqual(write_queue.get_stats()['batches'], 1)
+        self.assertEqual(write_queue.get_stats()['errors'], 1)
+        self.assertEqual(self.get_member_ids(), ['1', '3'])
+
+    def test_failing_single_operation(self):
+        self.assertRaises(ValueError, self.database_manager.write, self.add_member(1, fail=True))
+        self.assertEqual(self.database_manager.write(self.add_member(2)), 2)
+        self.assertEqual(self.get_member_ids(), ['2'])
+
+
+class TestPooledDatabaseManagerWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_manager = PooledDatabaseManager(os.path.join(self.directory.name, "data.sqlite"),
+                                                      os.path.join(self.directory.name, "database.log"))
+
+    def tearDown(self):
+        self.database_manager.close()
+        self.directory.cleanup()
+
+    def test_update_versions(self):
+        self.assertFalse(self.database_manager.update_versions({'live': "3.5.0", 'ptu': "3.6.0"}))
+        self.assertFalse(self.database_manager.update_versions({'live': "3.5.0", 'ptu': "3.6.0"}))
+        self.assertTrue(self.database_manager.update_versions({'live': "3.5.0", 'ptu': "3.6.1"}))
+        self.assertEqual(self.database_manager.write_queue.get_stats()['operations'], 3)
+
+    def test_saved_data(self):
+        self.database_manager.save_road_map([{'name': "3.5"}], {'1': "Ships"}, {'live': "3.5.0"})
+        self.database_manager.save_road_map([{'name': "3.6"}], {'1': "Ships"}, {'live': "3.6.0"})
+        self.assertEqual(self.database_manager.get_road_map(), [[{'name': "3.6"}], {'1': "Ships"}, {'live': "3.6.0"}])
+        self.database_manager.save_rsi_data({'gladius': {'price': 90}})
+        self.assertEqual(self.database_manager.get_rsi_data(), {'gladius': {'price': 90}})
+        self.database_manager.save_trade_data([], [{'id': 1}], [], [{'id': 2}])
+        self.assertEqual(self.database_manager.get_trade_data(), [[{'id': 1}], [{'id': 2}]])
+
+    def test_announced_threads_and_videos(self):
+        self.assertTrue(self.database_manager.thread_is_new(1, "Patch 3.6", "https://example.com/1"))
+        self.assertFalse(self.database_manager.thread_is_new(1, "Patch 3.6", "https://example.com/1"))
+        self.assertTrue(self.database_manager.rsi_video_is_new("https://example.com/video"))
+        self.assertFalse(self.database_manager.rsi_video_is_new("https://example.com/video"))
+        self.assertEqual(self.database_manager.write_queue.get_stats()['errors'], 0)
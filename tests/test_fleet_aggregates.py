@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+from collections import namedtuple
+
+from base_astro_bot.fleet.fleet_mixin import FleetMixin
+
+from dastro_bot.database_pool import PooledDatabaseManager
+from dastro_bot.fleet_aggregates import FleetAggregates
+
+
+User = namedtuple('User', ['id', 'username'])
+
+ALICE = User("1", "Alice")
+BOB = User("2", "Bob")
+CAROL = User("3", "Carol")
+
+
+def get_ship(name, manufacturer, lti=""):
+    return {'name': name, 'manufacturer': manufacturer, 'lti': lti}
+
+
+class BaseFleet:
+    """
+    Base FleetMixin tables without formatting, to compare rows returned by FleetView queries.
+    """
+    get_fleet_tables = FleetMixin.get_fleet_tables
+    print_dict_table = None
+
+    def __init__(self, database_manager):
+        self.database_manager = database_manager
+
+    @staticmethod
+    def split_data_and_get_messages(items, get_message_function):
+        return items
+
+
+class TestFleetAggregates(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_manager = PooledDatabaseManager(os.path.join(self.directory.name, "fleet.sqlite"),
+                                                      os.path.join(self.directory.name, "database.log"))
+        self.database_manager.update_member_ships([
+            get_ship("Cutlass Black", "DRAK", "LTI"), get_ship("Gladius", "AEGS"), get_ship("Gladius", "AEGS"),
+        ], ALICE)
+        self.database_manager.update_member_ships([
+            get_ship("Avenger Titan", "AEGS", "LTI"), get_ship("Cutlass Black", "DRAK"),
+        ], BOB)
+        self.database_manager.update_member_ships([get_ship("Mustang Alpha", "CNOU")], CAROL)
+        self.aggregates = FleetAggregates(self.database_manager)
+        self.aggregates.get_view('all')
+
+    def tearDown(self):
+        self.database_manager.close()
+        self.directory.cleanup()
+
+    @staticmethod
+    def get_sorted(rows):
+        return sorted(sorted(row.items()) for row in rows)
+
+    def assert_same_as_loaded(self):
+        loaded = FleetAggregates(self.database_manager)
+        for kind in ('summary', 'all', 'manufacturers'):
+            self.assertEqual(self.get_sorted(self.aggregates.get_view(kind).rows),
+                             self.get_sorted(loaded.get_view(kind).rows))
+        self.assertEqual(self.aggregates.get_stats()['ships'], loaded.get_stats()['ships'])
+
+    def test_views(self):
+        self.assertEqual(self.get_sorted(self.aggregates.get_view('all').rows),
+                         self.get_sorted(self.database_manager.get_all_ships_dicts()))
+        self.assertEqual(self.get_sorted(self.aggregates.get_view('member', "bob").rows),
+                         self.get_sorted(self.database_manager.get_ships_dicts_by_member_name("bob")))
+        summary = {row['name']: row for row in self.aggregates.get_view('summary').rows}
+        for row in self.database_manager.get_ships_summary():
+            self.assertEqual(summary[row['name']]['count'], row['count'])
+            self.assertEqual(summary[row['name']]['owners'].split(", "), sorted(row['owners'].split(", ")))
+        manufacturers = {row['manufacturer']: row for row in self.aggregates.get_view('manufacturers').rows}
+        self.assertEqual(manufacturers['AEGS'], {'manufacturer': "AEGS", 'name': "Avenger Titan, Gladius", 'count': 3})
+        self.assertIsNone(self.aggregates.get_view('member', "nobody"))
+
+    def test_added_ship(self):
+        self.database_manager.add_one_ship(get_ship("Gladius", "AEGS", "LTI"), BOB)
+        self.aggregates.refresh_member(BOB.id)
+        self.assert_same_as_loaded()
+        self.assertEqual(len(self.aggregates.get_view('member', "bob").rows), 3)
+
+    def test_removed_ship(self):
+        self.database_manager.remove_one_ship(get_ship("Gladius", "AEGS", ""), ALICE)
+        self.aggregates.refresh_member(ALICE.id)
+        self.assert_same_as_loaded()
+        self.assertEqual(self.aggregates.models['Gladius']['owners']['Alice'], 1)
+
+    def test_cleared_fleet(self):
+        self.database_manager.update_member_ships([], CAROL)
+        self.aggregates.refresh_member(CAROL.id)
+        self.assert_same_as_loaded()
+        self.assertNotIn('Mustang Alpha', self.aggregates.models)
+        self.assertNotIn('CNOU', self.aggregates.manufacturers)
+
+    def test_deleted_member(self):
+        self.database_manager.delete_member(self.database_manager.get_member_by_name("bob"))
+        self.aggregates.refresh_member(BOB.id)
+        self.assert_same_as_loaded()
+        self.assertEqual(self.aggregates.models['Cutlass Black']['owners'], {'Alice': 1})
+
+    def test_queries(self):
+        base_fleet = BaseFleet(self.database_manager)
+        for filters, order_by, descending in [
+            (None, None, False),
+            ("manufacturer=aegs", None, False),
+            ("manufacturer=a,lti=lti", "owner", True),
+            (None, "manufacturer,owner,name", False),
+            (None, "lti,name", True),
+        ]:
+            args = Namespace(all_ships=True, member=None, flight_ready=False, filter=filters, order_by=order_by,
+                             descending=descending)
+            expected = base_fleet.get_fleet_tables(args)
+            columns = order_by.split(",") if order_by else ["manufacturer", "name"]
+            rows = self.aggregates.get_view('all').query(
+                [item.split("=") for item in filters.split(",")] if filters else [], columns, descending)
+            self.assertEqual([[row[column] for column in columns] for row in rows],
+                             [[row[column] for column in columns] for row in expected])
+            self.assertEqual(self.get_sorted(rows), self.get_sorted(expected))
@@ -0,0 +1,47 @@
+import unittest
+from collections import namedtuple
+
+from dastro_bot.fleet_import import FleetImporter
+
+
+StoredShip = namedtuple('StoredShip', ['id', 'manufacturer', 'name', 'lti', 'package_id'])
+
+
+class TestFleetImporterChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.importer = FleetImporter(None, None)
+        self.uploaded = [
+            {'manufacturer': "DRAK", 'name': "Cutlass Black", 'lti': True, 'package_id': 1234567},
+            {'manufacturer': "AEGS", 'name': "Gladius", 'lti': "LTI", 'package_id': 7654321},
+            {'manufacturer': "AEGS", 'name': "Gladius", 'lti': False, 'package_id': 7654321},
+            {'manufacturer': "ANVL", 'name': "Hornet", 'lti': False},
+        ]
+        self.stored = [
+            StoredShip(1, "DRAK", "Cutlass Black", True, "1234567"),
+            StoredShip(2, "AEGS", "Gladius", True, "7654321"),
+            StoredShip(3, "AEGS", "Gladius", False, "7654321"),
+            StoredShip(4, "ANVL", "Hornet", False, None),
+        ]
+
+    def test_int_package_ids_match_stored_strings(self):
+        self.assertEqual(self.importer._get_changes(self.uploaded, self.stored), ([], []))
+
+    def test_changed_ships(self):
+        uploaded = self.uploaded[:2] + [dict(self.uploaded[3], lti=True)]
+        to_insert, to_delete = self.importer._get_changes(uploaded, self.stored)
+        self.assertEqual(to_insert, [("ANVL", "Hornet", True, None)])
+        self.assertEqual([ship.id for ship in to_delete], [3, 4])
+
+    def test_duplicated_ships(self):
+        uploaded = self.uploaded + [self.uploaded[0]]
+        to_insert, to_delete = self.importer._get_changes(uploaded, self.stored)
+        self.assertEqual(to_insert, [("DRAK", "Cutlass Black", True, "1234567")])
+        self.assertEqual(to_delete, [])
+
+    def test_content_hash_ignores_package_id_type(self):
+        keys = [self.importer.get_ship_key(ship_data) for ship_data in self.uploaded]
+        string_keys = [self.importer.get_ship_key(dict(ship_data, package_id=str(ship_data['package_id'])))
+                       if 'package_id' in ship_data else self.importer.get_ship_key(ship_data)
+                       for ship_data in self.uploaded]
+        self.assertEqual(self.importer.get_content_hash(keys), self.importer.get_content_hash(string_keys))
@@ -0,0 +1,38 @@
+import unittest
+
+from dastro_bot.guilds import GuildRegistry
+
+
+class FakeDatabaseManager:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestGuildRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.main_database = FakeDatabaseManager(None)
+        guilds = {
+            1: {'channels': {'main': 11}, 'database_name': None},
+            2: {'channels': {'main': 22}},
+        }
+        self.guilds = GuildRegistry.from_settings(guilds, 1, {'main': 11}, ["Member"], ["Officer"])
+        self.guilds.bind(None, lambda guild: self.main_database if guild.database_name is None else
+                         FakeDatabaseManager(guild.database_name))
+
+    def test_contexts(self):
+        self.assertEqual(self.guilds.main.guild_id, 1)
+        self.assertIs(self.guilds.get_for_command(None), self.guilds.main)
+        self.assertEqual(self.guilds.get_for_command(2).database_name, "guild_2.sqlite")
+        self.assertIsNone(self.guilds.get_for_command(3))
+
+    def test_close_only_owned_databases(self):
+        guild_database = self.guilds.get(2).database_manager
+        self.assertIs(self.guilds.get(1).database_manager, self.main_database)
+        self.guilds.close()
+        self.assertTrue(guild_database.closed)
+        self.assertFalse(self.main_database.closed)
@@ -0,0 +1,98 @@
+import json
+import unittest
+
+from dastro_bot.http_cache import HttpCache
+
+
+class FakeServer:
+
+    def __init__(self, content, etag='"1"'):
+        self.content = content
+        self.etag = etag
+        self.status_code = 200
+        self.requests = []
+
+    def send(self, headers):
+        self.requests.append(headers)
+        if self.status_code != 200:
+            return self.status_code, {}, b""
+        if self.etag and headers.get('If-None-Match') == self.etag:
+            return 304, {'ETag': self.etag}, b""
+        return 200, {'ETag': self.etag} if self.etag else {}, self.content
+
+
+def parse(content):
+    return json.loads(content.decode())
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = HttpCache()
+        self.server = FakeServer(b'{"ships": 1}')
+        self.parsed = []
+
+    def parse(self, content):
+        self.parsed.append(content)
+        return parse(content)
+
+    def fetch(self):
+        return self.cache.fetch('source', "http://example.com", self.server.send, self.parse)
+
+    def test_first_fetch_is_changed(self):
+        result = self.fetch()
+        self.assertEqual(result.value, {'ships': 1})
+        self.assertTrue(result.changed)
+        self.assertFalse(result.from_cache)
+        self.assertEqual(self.server.requests, [{}])
+
+    def test_not_modified(self):
+        self.fetch()
+        result = self.fetch()
+        self.assertEqual(self.server.requests[-1], {'If-None-Match': '"1"'})
+        self.assertEqual((result.value, result.changed, result.status_code), ({'ships': 1}, False, 304))
+        self.assertEqual(len(self.parsed), 1)
+        self.assertEqual(self.cache.stats['not_modified'], 1)
+
+    def test_unchanged_content_hash(self):
+        self.server.etag = None
+        self.fetch()
+        result = self.fetch()
+        self.assertEqual((result.value, result.changed, result.from_cache), ({'ships': 1}, False, True))
+        self.assertEqual(len(self.parsed), 1)
+        self.assertEqual(self.cache.stats['unchanged'], 1)
+
+    def test_changed_content(self):
+        self.fetch()
+        self.server.content, self.server.etag = b'{"ships": 2}', '"2"'
+        result = self.fetch()
+        self.assertEqual((result.value, result.changed), ({'ships': 2}, True))
+
+    def test_parse_error_keeps_cached_value(self):
+        self.fetch()
+        self.server.content, self.server.etag = b"<html>Maintenance</html>", '"2"'
+        result = self.fetch()
+        self.assertEqual((result.value, result.changed, result.from_cache), ({'ships': 1}, False, True))
+        self.assertEqual(self.cache.stats['errors'], 1)
+        self.server.content, self.server.etag = b'{"ships": 1}', '"1"'
+        self.assertEqual(self.fetch().status_code, 304)
+
+    def test_parse_error_without_cached_value(self):
+        self.server.content = b"<html>Maintenance</html>"
+        result = self.fetch()
+        self.assertEqual((result.value, result.changed, result.status_code), (None, False, 200))
+        self.assertEqual(self.cache.get_stats()['entries'], 0)
+
+    def test_error_status(self):
+        self.fetch()
+        self.server.status_code = 503
+        result = self.fetch()
+        self.assertEqual((result.value, result.status_code), (None, 503))
+        self.assertEqual(self.cache.stats['errors'], 1)
+
+    def test_fresh_entry_is_not_requested(self):
+        self.cache.freshness = {'source': 60}
+        self.fetch()
+        result = self.fetch()
+        self.assertEqual((result.value, result.from_cache), ({'ships': 1}, True))
+        self.assertEqual(len(self.server.requests), 1)
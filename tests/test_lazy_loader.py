@@ -0,0 +1,56 @@
+import unittest
+
+from dastro_bot.lazy_loader import LazyLoader
+
+
+class FakeLogger:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.append(message)
+
+    error = info
+
+
+class TestLazyLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.lazy = LazyLoader(FakeLogger())
+        self.calls = []
+
+    def build(self, value):
+        def factory():
+            self.calls.append(value)
+            return value
+        return factory
+
+    def fail(self):
+        self.calls.append("failed")
+        raise RuntimeError("not available")
+
+    def test_built_once(self):
+        self.assertEqual(self.lazy.get('part', self.build(1)), 1)
+        self.assertEqual(self.lazy.get('part', self.build(2)), 1)
+        self.assertEqual(self.calls, [1])
+        self.assertTrue(self.lazy.is_loaded('part'))
+
+    def test_none_is_cached(self):
+        self.assertIsNone(self.lazy.get('part', self.build(None)))
+        self.assertIsNone(self.lazy.get('part', self.build(2)))
+        self.assertEqual(self.calls, [None])
+
+    def test_failed_build(self):
+        self.assertRaises(RuntimeError, self.lazy.get, 'part', self.fail)
+        self.assertFalse(self.lazy.is_loaded('part'))
+        self.assertEqual(self.lazy.get_stats()['loaded'], 0)
+        self.assertEqual(self.lazy.get('part', self.build(1)), 1)
+        self.assertEqual(self.calls, ["failed", 1])
+        self.assertEqual(self.lazy.get_stats()['loaded'], 1)
+        self.assertEqual(self.lazy.get_stats()['failed'], 0)
+
+    def test_timed_parts_are_not_built(self):
+        with self.lazy.timed('ship_matrix'):
+            pass
+        self.assertFalse(self.lazy.is_loaded('ship_matrix'))
+        self.assertEqual(self.lazy.get_stats()['loaded'], 1)
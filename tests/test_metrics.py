@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from dastro_bot.metrics import CommandProfiler, MetricsRegistry, MetricsServer
+
+
+class Database:
+    def get_member(self, name):
+        return name
+
+    def delete_member(self, name):
+        raise ValueError(name)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry(buckets=(0.1, 1))
+
+    def test_histograms(self):
+        for seconds, error in ((0.05, False), (0.5, False), (2.0, True)):
+            self.registry.observe('command', seconds, error, command="fleet")
+        self.registry.observe('external_fetch', 0.1, source="road_map")
+        self.assertEqual(self.registry.render(), "\n".join([
+            'astro_bot_command_duration_seconds_bucket{command="fleet",le="0.1"} 1',
+            'astro_bot_command_duration_seconds_bucket{command="fleet",le="1"} 2',
+            'astro_bot_command_duration_seconds_bucket{command="fleet",le="+Inf"} 3',
+            'astro_bot_command_duration_seconds_sum{command="fleet"} 2.550000',
+            'astro_bot_command_duration_seconds_count{command="fleet"} 3',
+            'astro_bot_command_errors_total{command="fleet"} 1',
+            'astro_bot_external_fetch_duration_seconds_bucket{source="road_map",le="0.1"} 1',
+            'astro_bot_external_fetch_duration_seconds_bucket{source="road_map",le="1"} 1',
+            'astro_bot_external_fetch_duration_seconds_bucket{source="road_map",le="+Inf"} 1',
+            'astro_bot_external_fetch_duration_seconds_sum{source="road_map"} 0.100000',
+            'astro_bot_external_fetch_duration_seconds_count{source="road_map"} 1',
+            'astro_bot_external_fetch_errors_total{source="road_map"} 0',
+        ]) + "\n")
+
+    def test_instrumented_methods(self):
+        database = Database()
+        self.registry.instrument(database, 'database', 'method', ('get_member', 'delete_member'))
+        self.assertEqual(database.get_member("Bob"), "Bob")
+        self.assertRaises(ValueError, database.delete_member, "Bob")
+        lines = self.registry.render().splitlines()
+        self.assertIn('astro_bot_database_duration_seconds_count{method="delete_member"} 1', lines)
+        self.assertIn('astro_bot_database_errors_total{method="delete_member"} 1', lines)
+        self.assertIn('astro_bot_database_errors_total{method="get_member"} 0', lines)
+
+    def test_gauges(self):
+        self.registry.add_collector('dispatcher', lambda: {
+            'queue_depth': 2,
+            'running': True,
+            'name': "dispatcher",
+            'jobs': {'fleet': {'runs': 3, 'latency_avg': 0.5}, 'trade': {'runs': 1, 'latency_avg': 0.25}},
+            'pool': {'size': 4},
+        }, {('jobs',): 'command'})
+        self.registry.add_collector('monitor', lambda: {'forum': {'polls': 5}, 'road_map': {'polls': 2}},
+                                    {(): 'source'})
+        self.assertEqual(self.registry.render(), "\n".join([
+            'astro_bot_dispatcher_jobs_latency_avg{command="fleet"} 0.5',
+            'astro_bot_dispatcher_jobs_runs{command="fleet"} 3.0',
+            'astro_bot_dispatcher_jobs_latency_avg{command="trade"} 0.25',
+            'astro_bot_dispatcher_jobs_runs{command="trade"} 1.0',
+            'astro_bot_dispatcher_pool_size 4.0',
+            'astro_bot_dispatcher_queue_depth 2.0',
+            'astro_bot_dispatcher_running 1.0',
+            'astro_bot_monitor_polls{source="forum"} 5.0',
+            'astro_bot_monitor_polls{source="road_map"} 2.0',
+        ]) + "\n")
+
+    def test_failed_collector(self):
+        self.registry.add_collector('broken', lambda: {}['missing'])
+        self.registry.add_collector('cache', lambda: {'hit ratio': 0.5})
+        self.assertEqual(self.registry.render(),
+                         "# broken collector failed: 'missing'\nastro_bot_cache_hit_ratio 0.5\n")
+
+
+class TestMetricsServer(unittest.TestCase):
+
+    def test_metrics_endpoint(self):
+        registry = MetricsRegistry()
+        registry.add_collector('cache', lambda: {'size': 1})
+        server = MetricsServer(registry, port=0)
+        server.start()
+        try:
+            url = "http://127.0.0.1:%d" % server._server.server_address[1]
+            with urlopen(url + "/metrics") as response:
+                self.assertEqual(response.read().decode(), "astro_bot_cache_size 1.0\n")
+            with self.assertRaises(HTTPError):
+                urlopen(url + "/other")
+        finally:
+            server.stop()
+
+
+class TestCommandProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_profiles(self):
+        return os.listdir(self.directory.name)
+
+    def test_slow_runs_saved(self):
+        profiler = CommandProfiler(sample_rate=1.0, slow_threshold=0, directory=self.directory.name)
+        self.assertEqual(profiler.run("fleet", sum, [1, 2]), 3)
+        self.assertEqual(len(self.get_profiles()), 1)
+        self.assertTrue(self.get_profiles()[0].startswith("fleet-"))
+
+    def test_fast_runs_not_saved(self):
+        profiler = CommandProfiler(sample_rate=1.0, slow_threshold=60, directory=self.directory.name)
+        self.assertEqual(profiler.run("fleet", sum, [1, 2]), 3)
+        self.assertEqual(self.get_profiles(), [])
+
+    def test_not_sampled(self):
+        profiler = CommandProfiler(sample_rate=0.0, slow_threshold=0, directory=self.directory.name)
+        self.assertEqual(profiler.run("fleet", sum, [1, 2]), 3)
+        self.assertEqual(self.get_profiles(), [])
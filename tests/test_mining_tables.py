@@ -0,0 +1,67 @@
+import unittest
+
+from dastro_bot.mining_tables import MiningValueTable, UNITS_PER_SCU
+from tests.fixtures import get_trade_tables
+
+
+class TestMiningValueTable(unittest.TestCase):
+
+    def setUp(self):
+        self.resources = get_trade_tables(seed=0)['resources']
+        self.cargo_sizes = [("Prospector", 32), ("Mole", 96)]
+        self.table = MiningValueTable(self.resources, self.cargo_sizes)
+
+    @staticmethod
+    def get_location_values(resource):
+        values = {}
+        for price in resource.sell_prices:
+            if price.location:
+                location = price.location.short_string
+                values[location] = max(values.get(location, price.value), price.value)
+        return values
+
+    def test_resource_tables(self):
+        for resource in self.resources.values():
+            rows = self.table.get_resource_table(resource.id)
+            values = self.get_location_values(resource)
+            self.assertEqual({row['Locations']: row['aUEC/unit'] for row in rows},
+                             {location: round(value, 3) for location, value in values.items()})
+            self.assertEqual([row['aUEC/SCU'] for row in rows],
+                             sorted((round(value * UNITS_PER_SCU, 2) for value in values.values()), reverse=True))
+            for row in rows:
+                self.assertEqual(row['Prospector (32 SCU)'], int(values[row['Locations']] * UNITS_PER_SCU * 32))
+
+    def test_best_values_table(self):
+        rows = {row['Resource']: row for row in self.table.get_best_values_table()}
+        self.assertTrue(rows)
+        for resource in self.resources.values():
+            values = self.get_location_values(resource)
+            if not resource.best_sell or not values:
+                self.assertNotIn(resource.name, rows)
+                continue
+            row = rows[resource.name]
+            self.assertEqual(row['aUEC/unit'], round(resource.best_sell, 3))
+            self.assertEqual(set(row['Locations'].split("\n")),
+                             {location for location, value in values.items() if value == resource.best_sell})
+
+    def test_best_refineries(self):
+        resources = [resource for resource in self.resources.values() if resource.sell_prices][:2]
+        load = [(resources[0].id, 60), (resources[1].id, 40)]
+        totals = {}
+        for (resource_id, percent), resource in zip(load, resources):
+            for location, value in self.get_location_values(resource).items():
+                totals[location] = totals.get(location, 0) + value * UNITS_PER_SCU * percent / 100.0 * 32
+        rows = self.table.get_best_refineries(load, 32)
+        self.assertTrue(rows)
+        expected = sorted(totals.values(), reverse=True)[:len(rows)]
+        self.assertEqual([row['aUEC'] for row in rows], [int(total) for total in expected])
+
+    def test_updated_price(self):
+        resource = next(resource for resource in self.resources.values() if resource.sell_prices)
+        price = next(price for price in resource.sell_prices if price.location)
+        price['price_unit_price'] = max(price.value for price in resource.sell_prices) + 10
+        self.assertTrue(self.table.update_price(price))
+        row = self.table.get_resource_table(resource.id)[0]
+        self.assertEqual(row['Locations'], price.location.short_string)
+        self.assertEqual(row['aUEC/unit'], round(price.value, 3))
+        self.assertFalse(self.table.update_price(dict(price)))
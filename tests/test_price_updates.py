@@ -0,0 +1,101 @@
+import threading
+import unittest
+
+from base_astro_bot.trade.data_structure import DataStructure
+
+from dastro_bot.price_updates import PriceUpdater, ReportableCommodity, ReportableDataStructure
+from dastro_bot.trade_index import IndexedTradeAssistant
+
+
+class FakeLogger:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, message):
+        self.errors.append(message)
+
+    def debug(self, message):
+        pass
+
+
+class FakeTradeAssistant:
+    snapshot_store = object()
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.saves = []
+        self.failing_saves = 0
+        containers = DataStructure([{'id': "moon-0", 'container_name': "Yela", 'container_parent': None}])
+        self.locations = DataStructure([
+            {'id': "location-%d" % number, 'location_name': "Yela Outpost %d" % number,
+             'location_container': "moon-0"}
+            for number in range(2)
+        ], parents=containers)
+        self.commodity_prices = DataStructure([
+            {'id': "price-0", 'price_type': "buy", 'price_location': "location-0", 'price_commodity': "commodity-0",
+             'price_unit_price': 10.0},
+            {'id': "price-1", 'price_type': "sell", 'price_location': "location-1", 'price_commodity': "commodity-0",
+             'price_unit_price': 12.0},
+        ], locations=self.locations)
+        self.commodities = ReportableDataStructure([
+            {'id': "commodity-0", 'commodity_name': "Agricium", 'commodity_illegal': False},
+        ], prices=self.commodity_prices)
+
+    def save_snapshot(self, part):
+        self.saves.append(part)
+        if self.failing_saves:
+            self.failing_saves -= 1
+            return False
+        return True
+
+
+class TestPriceUpdater(unittest.TestCase):
+
+    def setUp(self):
+        self.trade_assistant = FakeTradeAssistant()
+        self.trade = IndexedTradeAssistant(self.trade_assistant)
+        self.logger = FakeLogger()
+        self.price_updater = PriceUpdater(self.trade, self.logger, flush_delay=3600)
+        self.commodity = self.trade_assistant.commodities['commodity-0']
+
+    def tearDown(self):
+        self.price_updater.flush()
+
+    def test_reportable_items(self):
+        self.assertIsInstance(self.commodity, ReportableCommodity)
+        self.assertEqual([price.id for price in self.commodity.buy_prices], ["price-0"])
+        self.assertEqual(self.commodity.best_sell, 12.0)
+
+    def test_changed_price(self):
+        index = self.trade.routes_index
+        self.price_updater.apply_trade_report("Agricium", 15.0, 'sell', "Yela Outpost 1")
+        self.assertEqual(self.trade_assistant.commodity_prices['price-1'].value, 15.0)
+        self.assertEqual(self.commodity.best_sell, 15.0)
+        self.assertIs(self.trade.routes_index, index)
+        self.assertEqual(self.trade.get_trade_routes()[0][1][1][1], 50000.0 / 10 * 15 - 50000)
+
+    def test_new_price(self):
+        self.trade.routes_index
+        self.price_updater.apply_trade_report("Agricium", 16.0, 'sell', "Yela Outpost 0")
+        price = self.trade_assistant.commodity_prices["commodity-0-location-0-sell"]
+        self.assertIn(price, self.commodity.sell_prices)
+        self.assertEqual(self.commodity.best_sell, 16.0)
+        self.assertEqual(self.trade.get_trade_routes()[0][1][1][1], 50000.0 / 10 * 16 - 50000)
+
+    def test_flush(self):
+        self.price_updater.apply_trade_report("Agricium", 15.0, 'sell', "Yela Outpost 1")
+        self.price_updater.apply_trade_report("Agricium", 9.0, 'buy', "Yela Outpost 0")
+        self.assertEqual(self.price_updater.get_stats()['pending'], ['trade'])
+        self.price_updater.flush()
+        self.assertEqual(self.trade_assistant.saves, ['trade'])
+        self.assertEqual(self.price_updater.get_stats(), {'updates': 2, 'flushes': 1, 'pending': []})
+
+    def test_failed_flush_retried(self):
+        self.trade_assistant.failing_saves = 1
+        self.price_updater.apply_trade_report("Agricium", 15.0, 'sell', "Yela Outpost 1")
+        self.price_updater.flush()
+        self.assertEqual(self.price_updater.get_stats()['pending'], ['trade'])
+        self.assertEqual(len(self.logger.errors), 1)
+        self.price_updater.flush()
+        self.assertEqual(self.trade_assistant.saves, ['trade', 'trade'])
+        self.assertEqual(self.price_updater.get_stats()['pending'], [])
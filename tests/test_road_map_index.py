@@ -0,0 +1,95 @@
+import unittest
+
+from base_astro_bot.rsi_data.road_map import RoadMap
+
+from dastro_bot.road_map_index import RoadMapIndex, get_road_map_index
+
+
+def get_card(name, description, category_id, completed=1, tasks=2):
+    return {'name': name, 'description': description, 'category_id': category_id, 'completed': completed,
+            'tasks': tasks}
+
+
+class FakeRoadMap(RoadMap):
+    def __init__(self):
+        self.categories = {
+            'ships': {'id': "1", 'name': "Ships and Vehicles"},
+            'gameplay': {'id': "2", 'name': "Gameplay"},
+        }
+        self.releases = [
+            {'name': "3.5.0", 'description': "Released", 'cards': [
+                get_card("Origin 890 Jump", "Luxury yacht with a hangar", 1, 2, 2),
+                get_card("Ship Armor", "Armor reduces physical damage of ships", 2, 0),
+                get_card("Mining Gadgets", "Tools boosting mining of rare ores", 2),
+            ]},
+            {'name': "3.6.0", 'description': "Scheduled", 'cards': [
+                get_card("Banu Defender", "Alien fighter ship", 1),
+                get_card("Law System", "Crime stat and armistice zones", 2, 3, 3),
+            ]},
+        ]
+
+
+class TestRoadMapIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.road_map = FakeRoadMap()
+        self.index = RoadMapIndex(self.road_map)
+
+    def get_card_names(self, found):
+        return sorted(self.index.cards[number]['row'][0] for number in found)
+
+    def test_tokenize(self):
+        self.assertEqual(RoadMapIndex.tokenize("Origin 890-Jump, v3.5.0!"), ["origin", "890", "jump", "v3.5.0"])
+
+    def test_exact_words(self):
+        self.assertEqual(self.get_card_names(self.index.find("armor")), ["Ship Armor"])
+        self.assertEqual(self.get_card_names(self.index.find("3.6.0")), ["Banu Defender", "Law System"])
+        self.assertEqual(self.index.find("missing"), set())
+
+    def test_prefixes(self):
+        self.assertEqual(self.get_card_names(self.index.find("gadg")), ["Mining Gadgets"])
+        self.assertEqual(self.get_card_names(self.index.find("shi")),
+                         ["Banu Defender", "Origin 890 Jump", "Ship Armor"])
+
+    def test_one_typo(self):
+        self.assertEqual(self.get_card_names(self.index.find("defnder")), ["Banu Defender"])
+        self.assertEqual(self.get_card_names(self.index.find("yatch")), ["Origin 890 Jump"])
+        self.assertEqual(self.get_card_names(self.index.find("yachts")), ["Origin 890 Jump"])
+        self.assertEqual(self.get_card_names(self.index.find("armpr")), ["Ship Armor"])
+        self.assertEqual(self.index.find("lwa"), set())
+
+    def test_words_intersection(self):
+        self.assertEqual(self.get_card_names(self.index.find("ships gameplay")), ["Ship Armor"])
+        self.assertEqual(self.get_card_names(self.index.find("alien fightr 3.6")), ["Banu Defender"])
+        self.assertEqual(self.index.find("alien armor"), set())
+
+    def test_release_details(self):
+        self.assertEqual(self.index.get_release_details("3.5.0"), self.road_map.get_release_details("3.5.0"))
+        self.assertIsNone(self.index.get_release_details("4.0"))
+        details = self.index.get_release_details("3.5.0", self.index.find("mining"))
+        self.assertEqual(list(details), ["Gameplay"])
+        self.assertEqual([row[0] for row in details["Gameplay"]], ["Mining Gadgets"])
+
+    def test_category_details(self):
+        self.assertEqual(self.index.get_category_details("ships"), self.road_map.get_category_details("ships"))
+        self.assertIsNone(self.index.get_category_details("social"))
+        details = self.index.get_category_details("gameplay", self.index.find("zones"))
+        self.assertEqual(list(details), ["3.6.0 Scheduled"])
+        self.assertEqual(details["3.6.0 Scheduled"][0][2], "✔ 3/3")
+
+    def test_release_category_details(self):
+        self.assertEqual(self.index.get_release_category_details("3.6.0", "ships"),
+                         self.road_map.get_release_category_details("3.6.0", "ships"))
+        self.assertIsNone(self.index.get_release_category_details("3.6.0", "social"))
+
+    def test_found_details(self):
+        details = self.index.get_found_details(self.index.find("ship"))
+        self.assertEqual(list(details), ["3.5.0 Released | Ships and Vehicles", "3.5.0 Released | Gameplay",
+                                         "3.6.0 Scheduled | Ships and Vehicles"])
+
+    def test_index_rebuilt_after_reload(self):
+        index = get_road_map_index(self.road_map)
+        self.assertIs(get_road_map_index(self.road_map), index)
+        self.road_map.releases = self.road_map.releases[1:]
+        index = get_road_map_index(self.road_map)
+        self.assertEqual(list(index.by_release), ["3.6.0"])
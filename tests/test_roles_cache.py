@@ -0,0 +1,130 @@
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+from dastro_bot.bot import DiscordBot
+from dastro_bot.guilds import GuildRegistry
+from dastro_bot.roles_cache import MemberRolesCache
+
+
+Role = namedtuple('Role', ['id', 'name'])
+GuildMember = namedtuple('GuildMember', ['id', 'roles'])
+User = namedtuple('User', ['id'])
+Event = namedtuple('Event', ['guild_id', 'member', 'user'])
+
+
+class TestMemberRolesCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = MemberRolesCache(ttl=60, max_size=2)
+
+    def test_hits_and_misses(self):
+        self.assertIsNone(self.cache.get(1))
+        self.cache.set(1, (10, 11))
+        self.assertEqual(self.cache.get(1), [10, 11])
+        self.assertEqual(self.cache.get(1), [10, 11])
+        self.assertEqual(self.cache.get_stats(), {'size': 1, 'hits': 2, 'misses': 1, 'hit_ratio': 0.667})
+
+    @mock.patch('dastro_bot.roles_cache.time.monotonic')
+    def test_ttl(self, monotonic):
+        monotonic.return_value = 100
+        self.cache.set(1, [10])
+        monotonic.return_value = 159
+        self.assertEqual(self.cache.get(1), [10])
+        monotonic.return_value = 160
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(self.cache.get_stats()['size'], 0)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.set(1, [10])
+        self.cache.set(2, [20])
+        self.cache.get(1)
+        self.cache.set(3, [30])
+        self.assertIsNone(self.cache.get(2))
+        self.assertEqual(self.cache.get(1), [10])
+        self.assertEqual(self.cache.get(3), [30])
+
+    def test_invalidation(self):
+        self.cache.set(1, [10])
+        self.cache.set(2, [20])
+        self.cache.remove(1)
+        self.cache.remove(3)
+        self.assertIsNone(self.cache.get(1))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(2))
+
+
+class FakeApi:
+    def __init__(self):
+        self.roles = [Role(10, "Member"), Role(20, "Officer")]
+        self.members = {1: GuildMember(1, [10]), 2: GuildMember(2, [10, 20])}
+        self.members_requests = 0
+
+    def guilds_members_get(self, guild_id, user_id):
+        self.members_requests += 1
+        return self.members[user_id]
+
+    def guilds_roles_list(self, guild_id):
+        return self.roles
+
+
+class FakeLogger:
+    def debug(self, message):
+        pass
+
+
+class FakeBot:
+    _get_user_roles = DiscordBot._get_user_roles
+    _get_member_roles = DiscordBot._get_member_roles
+    _get_privileged_roles = DiscordBot._get_privileged_roles
+    user_is_member = DiscordBot.user_is_member
+    user_is_privileged = DiscordBot.user_is_privileged
+    on_guild_member_update = DiscordBot.on_guild_member_update
+    on_guild_member_remove = DiscordBot.on_guild_member_remove
+    on_guild_role_change = DiscordBot.on_guild_role_change
+
+    def __init__(self):
+        self.client = namedtuple('Client', ['api'])(FakeApi())
+        self.logger = FakeLogger()
+        self.guilds = GuildRegistry.from_settings({}, 5, {'main': 50}, ["Member"], ["Officer"])
+
+
+class TestRolesListeners(unittest.TestCase):
+
+    def setUp(self):
+        self.bot = FakeBot()
+        self.api = self.bot.client.api
+        self.guild = self.bot.guilds.main
+
+    def test_roles_cached(self):
+        self.assertTrue(self.bot.user_is_member(User(1)))
+        self.assertFalse(self.bot.user_is_privileged(User(1)))
+        self.assertTrue(self.bot.user_is_privileged(User(2)))
+        self.assertEqual(self.api.members_requests, 2)
+        self.assertEqual(self.guild.roles_cache.get_stats()['hits'], 1)
+
+    def test_member_update(self):
+        self.assertFalse(self.bot.user_is_privileged(User(1)))
+        self.bot.on_guild_member_update(Event(5, GuildMember(1, [10, 20]), None))
+        self.assertTrue(self.bot.user_is_privileged(User(1)))
+        self.assertEqual(self.api.members_requests, 1)
+
+    def test_member_update_in_other_guild(self):
+        self.bot.user_is_member(User(1))
+        self.bot.on_guild_member_update(Event(6, GuildMember(1, []), None))
+        self.assertTrue(self.bot.user_is_member(User(1)))
+
+    def test_member_remove(self):
+        self.assertTrue(self.bot.user_is_member(User(1)))
+        self.api.members[1] = GuildMember(1, [])
+        self.bot.on_guild_member_remove(Event(5, None, User(1)))
+        self.assertFalse(self.bot.user_is_member(User(1)))
+        self.assertEqual(self.api.members_requests, 2)
+
+    def test_role_update(self):
+        self.assertTrue(self.bot.user_is_member(User(1)))
+        self.api.roles = [Role(11, "Member"), Role(10, "Guest"), Role(20, "Officer")]
+        self.bot.on_guild_role_change(Event(5, None, None))
+        self.assertEqual(self.guild.member_roles, [11])
+        self.assertFalse(self.bot.user_is_member(User(1)))
+        self.assertEqual(self.api.members_requests, 1)
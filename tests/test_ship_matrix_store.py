@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from dastro_bot.ship_matrix_store import ShipMatrixStore
+
+
+def get_ships(price=190):
+    return {
+        'cutlass black': {'name': "Cutlass Black", 'manufacturer': "Drake Interplanetary",
+                          'manufacturer_code': "DRAK", 'price': "100", 'max_crew': 2},
+        'gladius': {'name': "Gladius", 'manufacturer': "Aegis Dynamics", 'manufacturer_code': "AEGS",
+                    'price': "90", 'max_crew': 1},
+        'hammerhead': {'name': "Hammerhead", 'manufacturer': "Aegis Dynamics", 'manufacturer_code': "AEGS",
+                       'price': str(price), 'max_crew': None},
+    }
+
+
+class TestShipMatrixStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ship_matrix.snapshot")
+        self.store = ShipMatrixStore(self.path, check_interval=0)
+
+    def tearDown(self):
+        self.store = None
+        self.directory.cleanup()
+
+    def get_data_files(self):
+        return sorted(name for name in os.listdir(self.directory.name) if name != "ship_matrix.snapshot")
+
+    def test_nothing_published(self):
+        self.assertIsNone(self.store.snapshot)
+
+    def test_publish(self):
+        content_hash = self.store.publish(get_ships())
+        snapshot = self.store.snapshot
+        self.assertEqual(snapshot.content_hash, content_hash)
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(dict(snapshot.items()), get_ships())
+        self.assertEqual(snapshot['Gladius']['manufacturer'], "Aegis Dynamics")
+        self.assertNotIn('avenger', snapshot)
+
+    def test_searches(self):
+        self.store.publish(get_ships())
+        snapshot = self.store.snapshot
+        rows = snapshot.sort_rows_by_price(snapshot.find_rows("aegs"))
+        self.assertEqual([ship['name'] for ship in snapshot.get_ships(rows)], ["Gladius", "Hammerhead"])
+        self.assertEqual(list(snapshot.get_column('max_crew'))[:2], [2.0, 1.0])
+
+    def test_unchanged_publish(self):
+        content_hash = self.store.publish(get_ships())
+        pointer_stat = os.stat(self.path)
+        self.assertEqual(self.store.publish(get_ships()), content_hash)
+        self.assertEqual(os.stat(self.path).st_ino, pointer_stat.st_ino)
+        self.assertEqual(len(self.get_data_files()), 1)
+
+    def test_reload_in_other_process(self):
+        other_store = ShipMatrixStore(self.path, check_interval=0)
+        self.store.publish(get_ships())
+        first = other_store.snapshot
+        content_hash = self.store.publish(get_ships(price=200))
+        self.assertEqual(other_store.snapshot.content_hash, content_hash)
+        self.assertEqual(other_store.snapshot['hammerhead']['price'], "200")
+        self.assertEqual(first['hammerhead']['price'], "190")
+
+    def test_old_snapshots_removed(self):
+        for price in (200, 210, 220, 230):
+            self.store.publish(get_ships(price))
+        self.assertEqual(self.get_data_files(), sorted(os.path.basename(self.store.get_data_path(
+            ShipMatrixStore.get_content_hash(get_ships(price)))) for price in (220, 230)))
+        self.assertEqual(self.store.snapshot['hammerhead']['price'], "230")
+
+    def test_invalid_pointer(self):
+        with open(self.path, "wb") as pointer_file:
+            pointer_file.write(b"ASTROSHP\x00\xff")
+        self.assertIsNone(self.store.snapshot)
+        self.store.publish(get_ships())
+        self.assertEqual(len(self.store.snapshot), 3)
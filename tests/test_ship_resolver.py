@@ -0,0 +1,77 @@
+import unittest
+
+from dastro_bot.ship_resolver import ShipResolver
+
+
+SHIPS = [
+    ("cutlass black", "Drake Interplanetary", "DRAK"),
+    ("cutlass red", "Drake Interplanetary", "DRAK"),
+    ("gladius", "Aegis Dynamics", "AEGS"),
+    ("mercury star runner", "Crusader Industries", "CRUS"),
+    ("c2 hercules", "Crusader Industries", "CRUS"),
+    ("85x", "Origin Jumpworks", "ORIG"),
+]
+ALIASES = {'MSR': "Mercury Star Runner", 'hercules c2': "C2 Hercules", 'unknown': "Avenger Titan"}
+
+
+class FakeSearch:
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.queries = []
+
+    def __call__(self, query):
+        self.queries.append(query)
+        return self.results.get(query, [])
+
+
+class TestShipResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.resolver = ShipResolver(iter(SHIPS), ALIASES, memo_size=2)
+
+    def test_normalize(self):
+        self.assertEqual(ShipResolver.normalize("  Cutlass-Black "), "cutlass black")
+        self.assertEqual(ShipResolver.normalize("Mercury  Star_Runner!"), "mercury star_runner")
+        self.assertEqual(ShipResolver.normalize("C2.Hercules"), "c2.hercules")
+
+    def test_exact_names(self):
+        self.assertEqual(self.resolver.find_exact("Cutlass  BLACK"), "cutlass black")
+        self.assertEqual(self.resolver.find_exact("85X"), "85x")
+        self.assertIsNone(self.resolver.find_exact("cutlass"))
+
+    def test_manufacturer_prefixes(self):
+        self.assertEqual(self.resolver.find_exact("Aegis Dynamics Gladius"), "gladius")
+        self.assertEqual(self.resolver.find_exact("AEGS gladius"), "gladius")
+        self.assertEqual(self.resolver.find_exact("drak cutlass red"), "cutlass red")
+        self.assertIsNone(self.resolver.find_exact("DRAK gladius"))
+
+    def test_aliases(self):
+        self.assertEqual(self.resolver.find_exact("msr"), "mercury star runner")
+        self.assertEqual(self.resolver.find_exact("Hercules C2"), "c2 hercules")
+        self.assertIsNone(self.resolver.find_exact("unknown"))
+
+    def test_resolve(self):
+        search = FakeSearch({'cutlass': ["cutlass black", "cutlass red"]})
+        self.assertEqual(self.resolver.resolve("Gladius", search), ["gladius"])
+        self.assertEqual(self.resolver.resolve("cutlass", search), ["cutlass black", "cutlass red"])
+        self.assertEqual(search.queries, ["cutlass"])
+
+    def test_fuzzy_fallback(self):
+        search = FakeSearch()
+        self.assertEqual(self.resolver.find_similar("gladus"), ["gladius"])
+        self.assertEqual(self.resolver.resolve("gladiuss", search), ["gladius"])
+        self.assertEqual(self.resolver.resolve("mercury star runer", search), ["mercury star runner"])
+        self.assertEqual(self.resolver.find_similar("cutlass blak"), ["cutlass black"])
+        self.assertEqual(self.resolver.find_similar("cutlass"), ["cutlass red"])
+        self.assertEqual(self.resolver.resolve("hornet", search), [])
+
+    def test_memo(self):
+        search = FakeSearch({'Cutlass': ["cutlass black", "cutlass red"]})
+        self.resolver.resolve("Cutlass", search)
+        search.results = {}
+        self.assertEqual(self.resolver.resolve(" cutlass", search), ["cutlass black", "cutlass red"])
+        self.assertEqual(search.queries, ["Cutlass"])
+        self.resolver.resolve("gladius", search)
+        self.resolver.resolve("85x", search)
+        self.assertEqual(list(self.resolver._memo), ["gladius", "85x"])
+        self.assertEqual(self.resolver.resolve("cutlass", search), ["cutlass red"])
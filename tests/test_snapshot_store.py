@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from dastro_bot.snapshot_store import FileSnapshotBackend, SnapshotStore, encode_entry, get_record_hash, \
+    get_version
+
+
+class FakeLogger:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, message):
+        self.errors.append(message)
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.backend = FileSnapshotBackend(self.directory.name)
+        self.logger = FakeLogger()
+        self.store = SnapshotStore(self.backend, self.logger, checkpoint_interval=3)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_other_store(self):
+        return SnapshotStore(FileSnapshotBackend(self.directory.name), self.logger, checkpoint_interval=3)
+
+    @staticmethod
+    def get_records(version):
+        records = {'gladius': {'price': 90}, 'cutlass': {'price': 100 + version}}
+        if version % 2:
+            records['hammerhead'] = {'price': 700}
+        return records
+
+    def get_entry_numbers(self):
+        return sorted(int(name.split(".")[0]) for name in os.listdir(os.path.join(self.directory.name, 'ships')))
+
+    def remove_entry(self, number):
+        os.remove(os.path.join(self.directory.name, 'ships', "%010d.snapshot" % number))
+
+    def put_full_entry(self, number, records):
+        hashes = {key: get_record_hash(record) for key, record in records.items()}
+        data = encode_entry({'version': get_version(hashes),
+                             'records': {key: (hashes[key], record) for key, record in records.items()},
+                             'removed': []})
+        self.assertTrue(self.backend.put('ships', number, True, data))
+
+    def test_save_and_load(self):
+        self.assertIsNone(self.store.load('ships'))
+        diff = self.store.save('ships', self.get_records(0))
+        self.assertEqual(diff.added, ['cutlass', 'gladius'])
+        self.assertEqual(self.get_other_store().load('ships'), self.get_records(0))
+
+    def test_diff(self):
+        self.store.save('ships', self.get_records(0))
+        diff = self.store.save('ships', self.get_records(1))
+        self.assertEqual((diff.added, diff.changed, diff.removed), (['hammerhead'], ['cutlass'], []))
+        diff = self.store.save('ships', self.get_records(2))
+        self.assertEqual((diff.added, diff.changed, diff.removed), ([], ['cutlass'], ['hammerhead']))
+        self.assertEqual(self.get_other_store().load('ships'), self.get_records(2))
+
+    def test_unchanged_snapshot(self):
+        self.store.save('ships', self.get_records(0))
+        self.assertTrue(self.store.save('ships', self.get_records(0)).empty)
+        self.assertEqual(self.get_entry_numbers(), [0])
+        self.assertEqual(self.store.get_stats()['ships']['entries'], 1)
+
+    def test_checkpoints(self):
+        for version in range(7):
+            self.store.save('ships', self.get_records(version))
+        self.assertEqual(self.get_entry_numbers(), [6])
+        self.store.save('ships', self.get_records(7))
+        self.assertEqual(self.get_entry_numbers(), [6, 7])
+        self.assertEqual(self.get_other_store().load('ships'), self.get_records(7))
+
+    def test_other_store_catches_up(self):
+        other_store = self.get_other_store()
+        self.store.save('ships', self.get_records(0))
+        self.assertEqual(other_store.load('ships'), self.get_records(0))
+        self.store.save('ships', self.get_records(1))
+        self.store.save('ships', self.get_records(2))
+        self.assertEqual(other_store.get_latest_version('ships'), self.store.get_version('ships'))
+        diff = other_store.save('ships', self.get_records(3))
+        self.assertEqual(diff.added, ['hammerhead'])
+        self.assertEqual(self.get_entry_numbers(), [3])
+        self.assertEqual(self.store.load('ships'), self.get_records(3))
+
+    def test_dropped_entries_read_from_full_entry(self):
+        other_store = self.get_other_store()
+        self.store.save('ships', self.get_records(0))
+        self.store.save('ships', self.get_records(1))
+        other_store.load('ships')
+        self.store.save('ships', self.get_records(2))
+        self.remove_entry(1)
+        self.remove_entry(2)
+        self.put_full_entry(3, self.get_records(4))
+        self.assertEqual(other_store.get_latest_version('ships'), get_version(
+            {key: get_record_hash(record) for key, record in self.get_records(4).items()}))
+        self.assertEqual(other_store.load('ships'), self.get_records(4))
+        self.assertEqual(self.logger.errors, [])
+
+    def test_missing_entry(self):
+        other_store = self.get_other_store()
+        self.store.save('ships', self.get_records(0))
+        other_store.load('ships')
+        version = other_store.get_version('ships')
+        self.store.save('ships', self.get_records(1))
+        self.store.save('ships', self.get_records(2))
+        self.remove_entry(1)
+        self.assertEqual(other_store.get_latest_version('ships'), version)
+        self.assertIsNone(other_store.load('ships'))
+        self.assertEqual(len(self.logger.errors), 2)
+        self.assertIn("Entry 1 of 'ships' snapshot is missing.", self.logger.errors[0])
@@ -0,0 +1,63 @@
+import unittest
+
+from base_astro_bot.trade.trade_assistant import TradeAssistant
+
+from dastro_bot.trade_index import IndexedTradeAssistant
+from tests.fixtures import get_trade_tables
+
+
+class FakeTradeAssistant:
+    def __init__(self, seed=0):
+        self.load(seed)
+
+    def load(self, seed):
+        self.__dict__.update(get_trade_tables(seed=seed))
+
+    def get_base_routes(self, *args, **kwargs):
+        return TradeAssistant.get_trade_routes(self, *args, **kwargs)
+
+
+class TestIndexedTradeAssistant(unittest.TestCase):
+
+    def setUp(self):
+        self.trade_assistant = FakeTradeAssistant()
+        self.trade = IndexedTradeAssistant(self.trade_assistant)
+
+    def assert_same_routes(self, *args, **kwargs):
+        routes = self.trade.get_trade_routes(*args, **kwargs)
+        self.assertEqual(routes, self.trade_assistant.get_base_routes(*args, **kwargs))
+        return routes
+
+    def test_trade_routes(self):
+        self.assertTrue(self.assert_same_routes())
+        self.assert_same_routes(cargo=46, money=5000)
+        self.assert_same_routes(cargo=10000, money=10 ** 9, max_commodities=10)
+        self.assert_same_routes(allow_illegal=False)
+
+    def test_locations(self):
+        self.assert_same_routes(start_location="Yela")
+        self.assert_same_routes(start_location="daymar", end_location="Cellin")
+        self.assert_same_routes(avoid=("Aberdeen", "Arial"))
+        self.assertEqual(self.assert_same_routes(start_location="Nowhere"), [])
+
+    def test_updated_price(self):
+        self.trade.get_trade_routes()
+        commodity = next(commodity for commodity in self.trade_assistant.commodities.values()
+                         if commodity.sell_prices)
+        price = next(price for price in commodity.sell_prices if price.location)
+        price['price_unit_price'] = 1000
+        self.trade.update_price(price)
+        routes = self.assert_same_routes()
+        self.assertEqual(routes[0][0], commodity.name)
+
+    def test_reloaded_prices(self):
+        index = self.trade.routes_index
+        self.assertIs(self.trade.routes_index, index)
+        self.trade_assistant.load(seed=1)
+        self.assertIsNot(self.trade.routes_index, index)
+        self.assert_same_routes()
+
+    def test_failed_index_build(self):
+        del self.trade_assistant.commodity_prices
+        with self.assertRaises(RuntimeError):
+            self.trade.get_trade_routes()